@@ -0,0 +1,197 @@
+from __future__ import annotations
+"""
+Pub/sub backends behind WSManager.broadcast.
+
+A bus receives every room event published by this process and hands each
+event to the local WSManager of every process subscribed to it.
+InMemoryBus keeps everything in the current process. SQLiteBus appends events to
+the ws_events table of the shared database and tails it from each process,
+which lets `uvicorn --workers N` (or several API processes on one host) fan
+room events out to sockets held by any worker.
+
+Events carry a per-room "seq". Without a shared bus WSManager numbers them
+itself; SQLiteBus numbers them in the database so all workers agree and can
+replay missed events from the table. Each process hands a room's events to
+its sockets in seq order (clients drop frames older than the last one seen).
+"""
+import asyncio
+import logging
+import sqlite3
+import uuid
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from api import serialization
+from database import db as dbmod
+from database.pool import DEFAULT_PRAGMAS, open_connection
+
+logger = logging.getLogger(__name__)
+
+Deliver = Callable[[int, dict], Awaitable[None]]
+
+class EventBus(ABC):
+    """Base for bus backends; one that does not implement publish() cannot be created."""
+    # Identifies the sequence space; None means "numbered per process"
+    epoch: Optional[str] = None
+
+    async def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+
+    @abstractmethod
+    async def publish(self, room_id: int, message: dict) -> None:
+        """Send an event to the deliver callback of every subscribed process."""
+
+    async def latest_seq(self, room_id: int) -> Optional[int]:
+        return None
+
+    async def replay(self, room_id: int, since: int) -> Optional[List[Tuple[int, dict]]]:
+        """Events with seq > since, or None if the bus cannot tell."""
+        return None
+
+    async def close(self) -> None:
+        pass
+
+class InMemoryBus(EventBus):
+    async def publish(self, room_id: int, message: dict) -> None:
+        await self._deliver(room_id, message)
+
+class SQLiteBus(EventBus):
+    epoch = "sqlite"
+
+    def __init__(self, path: str, poll_interval: float = 0.02, retention: float = 300.0,
+                 pragmas: Optional[Dict[str, object]] = None):
+        self.path = path
+        # The pool's storage profile; a publish whose event is already committed
+        # must wait for a busy database rather than fail
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self.pragmas.setdefault("busy_timeout", 5000)
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.origin = uuid.uuid4().hex
+        self._last_id = 0
+        # Events up to this id predate the bus; after it, every one is delivered here once
+        self._start_id = 0
+        # room_id -> last seq handed to the local WSManager
+        self._delivered: Dict[int, int] = {}
+        self._order = asyncio.Lock()
+        self._db = None
+        self._poller: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: Deliver) -> None:
+        await super().start(deliver)
+        self._db = await open_connection(self.path, self.pragmas)
+        cur = await self._db.execute("SELECT COALESCE(MAX(id), 0) FROM ws_events")
+        self._last_id = self._start_id = (await cur.fetchone())[0]
+        self._poller = asyncio.create_task(self._poll_loop())
+
+    async def publish(self, room_id: int, message: dict) -> None:
+        body = serialization.dumps_str(message)
+        async with dbmod._connect(write=True) as db:
+            # The write lock makes MAX(seq)+1 safe across processes
+            cur = await db.execute("""
+                INSERT INTO ws_events (room_id, seq, origin, body)
+                SELECT ?, COALESCE(MAX(seq), 0) + 1, ?, ? FROM ws_events WHERE room_id=?
+                RETURNING seq
+            """, (room_id, self.origin, body, room_id))
+            seq = (await cur.fetchone())[0]
+            await db.commit()
+        # Local sockets need not wait for the poll, but lower seqs other workers
+        # took before us may not have been polled yet: they go out first. They
+        # were committed before our insert could take the write lock.
+        async with self._order:
+            last = self._delivered.get(room_id, 0)
+            if seq > last + 1:
+                try:
+                    cur = await self._db.execute(
+                        "SELECT seq, body FROM ws_events WHERE room_id=? AND seq > ? AND seq < ? AND id > ? ORDER BY seq",
+                        (room_id, last, seq, self._start_id),
+                    )
+                    gap = await cur.fetchall()
+                except sqlite3.OperationalError:
+                    # The event is committed: the poller delivers it, in order, instead of failing the caller
+                    logger.warning("Event bus: leaving room %s seq %s to the poller", room_id, seq, exc_info=True)
+                    return
+                for earlier, earlier_body in gap:
+                    await self._deliver_in_order(room_id, earlier, serialization.loads(earlier_body))
+            await self._deliver_in_order(room_id, seq, message)
+
+    async def _deliver_in_order(self, room_id: int, seq: int, message: dict) -> None:
+        # Whichever of publish() and poll() gets to an event first delivers it
+        if seq <= self._delivered.get(room_id, 0):
+            return
+        self._delivered[room_id] = seq
+        await self._deliver(room_id, {**message, "seq": seq})
+
+    async def _poll_loop(self) -> None:
+        ticks = 0
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.poll()
+                ticks += 1
+                if ticks * self.poll_interval >= self.retention / 10:
+                    ticks = 0
+                    await self.prune()
+            except Exception:
+                logger.exception("Event bus poll failed")
+
+    async def poll(self) -> int:
+        """Deliver events published by other processes since the last poll."""
+        cur = await self._db.execute(
+            "SELECT id, room_id, seq, body FROM ws_events WHERE id > ? ORDER BY id LIMIT 1000",
+            (self._last_id,),
+        )
+        rows = await cur.fetchall()
+        # ids follow seqs within a room: both are taken under the write lock
+        async with self._order:
+            for event_id, room_id, seq, body in rows:
+                self._last_id = event_id
+                if seq > self._delivered.get(room_id, 0):
+                    await self._deliver_in_order(room_id, seq, serialization.loads(body))
+        return len(rows)
+
+    async def latest_seq(self, room_id: int) -> Optional[int]:
+        cur = await self._db.execute("SELECT COALESCE(MAX(seq), 0) FROM ws_events WHERE room_id=?", (room_id,))
+        return (await cur.fetchone())[0]
+
+    async def replay(self, room_id: int, since: int) -> Optional[List[Tuple[int, dict]]]:
+        cur = await self._db.execute(
+            "SELECT seq, body FROM ws_events WHERE room_id=? AND seq > ? ORDER BY seq",
+            (room_id, since),
+        )
+        rows = await cur.fetchall()
+        # Pruned history: the oldest missed event is gone
+        if rows and rows[0][0] != since + 1:
+            return None
+        if not rows and since > (await self.latest_seq(room_id)):
+            return None
+        return [(seq, {**serialization.loads(body), "seq": seq}) for seq, body in rows]
+
+    async def prune(self) -> None:
+        async with dbmod._connect(write=True) as db:
+            # Keep each room's newest event so its seq never restarts
+            await db.execute("""
+                DELETE FROM ws_events
+                WHERE created_at < datetime('now', ?)
+                  AND id NOT IN (SELECT MAX(id) FROM ws_events GROUP BY room_id)
+            """, (f"-{int(self.retention)} seconds",))
+            await db.commit()
+
+    async def close(self) -> None:
+        if self._poller is not None:
+            self._poller.cancel()
+            try:
+                await self._poller
+            except asyncio.CancelledError:
+                pass
+            self._poller = None
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+def make_bus(kind: str, path: str, pragmas: Optional[Dict[str, object]] = None) -> EventBus:
+    if kind == "memory":
+        return InMemoryBus()
+    if kind == "sqlite":
+        return SQLiteBus(path, pragmas=pragmas)
+    raise ValueError(f"Unknown event bus: {kind!r}")
@@ -1,5 +1,11 @@
 from __future__ import annotations
 from fastapi import Depends, Request
 
+from database import db as dbmod
+
 def get_ws_manager(request: Request):
     return request.app.state.ws_manager
+
+def get_store(request: Request):
+    """Room engine when enabled, otherwise the plain database helpers (same coroutine names)."""
+    return getattr(request.app.state, "room_engine", None) or dbmod
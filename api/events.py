@@ -0,0 +1,43 @@
+from __future__ import annotations
+"""
+Room events sent over the WebSocket.
+
+Every event is {"type", "v", "payload"} (plus "seq", stamped on delivery) and
+carries everything the client renders, so webapp/scripts/state.js applies it
+in place instead of re-listing answers over REST. Answer payloads have the
+same fields as GET /rooms/{id}/answers rows, plus round_id.
+
+Bump SCHEMA_VERSION on incompatible payload changes; clients that see a newer
+version reload the room snapshot.
+"""
+from typing import Any, Dict
+
+SCHEMA_VERSION = 1
+
+def event(kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {"type": kind, "v": SCHEMA_VERSION, "payload": payload}
+
+def player_joined(user_id: int, name: str) -> Dict[str, Any]:
+    return event("player_joined", {"user_id": user_id, "name": name})
+
+def question_set(rd: Dict[str, Any]) -> Dict[str, Any]:
+    return event("question_set", {"round_id": rd["id"], "text": rd["question"], "status": rd["status"]})
+
+def round_closed() -> Dict[str, Any]:
+    # Applies to the room's current round
+    return event("round_closed", {"status": "discussion"})
+
+def answer_added(ans: Dict[str, Any]) -> Dict[str, Any]:
+    return event("answer_added", {
+        "round_id": ans["round_id"], "answer_id": ans["id"], "text": ans["text"],
+        "revealed": 0, "author_display": None,
+    })
+
+def answer_revealed(round_id: int, result: Dict[str, Any], actor_id: int) -> Dict[str, Any]:
+    return event("answer_revealed", {
+        "round_id": round_id, "answer_id": result["answer_id"], "revealed": 1,
+        "author_display": result["author_display"], "revealed_by": actor_id,
+    })
+
+def room_closed(room_id: int) -> Dict[str, Any]:
+    return event("room_closed", {"room_id": room_id})
@@ -0,0 +1,99 @@
+from __future__ import annotations
+"""
+HTTP side of metrics.py: per-route latency middleware, process gauges and the
+GET /metrics endpoint (Prometheus text format).
+"""
+import time
+from typing import Any, Dict, List, Tuple
+
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import PlainTextResponse
+
+import metrics
+from database import db as dbmod
+
+router = APIRouter()
+
+_HTTP = metrics.histogram("http_request_seconds", "HTTP request handling time per route", ("method", "route"))
+_HTTP_ERRORS = metrics.counter("http_request_errors", "HTTP responses with a 4xx/5xx status (or no response)", ("method", "route", "class"))
+# Sockets in one room
+_ROOM_SOCKET_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+class _StatusSend:
+    """ASGI send wrapper that remembers the response status; pooled by MetricsMiddleware."""
+    __slots__ = ("send", "status")
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            self.status = message["status"]
+        await self.send(message)
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: one histogram observation per HTTP request, labelled by route template."""
+
+    def __init__(self, app):
+        self.app = app
+        # id(route) -> (histogram, 4xx counter, 5xx counter), filled once per route;
+        # routes compare by value and are unhashable, but live as long as the app
+        self._children: Dict[int, Tuple[Any, Any, Any]] = {}
+        # Send wrappers of finished requests, reused instead of a closure per request
+        self._free: List[_StatusSend] = []
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        t0 = time.perf_counter()
+        wrapper = self._free.pop() if self._free else _StatusSend()
+        wrapper.send, wrapper.status = send, 500
+        try:
+            await self.app(scope, receive, wrapper)
+        finally:
+            status = wrapper.status
+            wrapper.send = None
+            self._free.append(wrapper)
+            # The router puts the matched route into the scope; anything else is "other"
+            route = scope.get("route")
+            children = self._children.get(id(route))
+            if children is None:
+                children = self._children[id(route)] = self._route_children(scope, route)
+            children[0].observe(time.perf_counter() - t0)
+            if status >= 500:
+                children[2].inc()
+            elif status >= 400:
+                children[1].inc()
+
+    @staticmethod
+    def _route_children(scope, route) -> Tuple[Any, Any, Any]:
+        if route is None:
+            method, path = "any", "other"
+        else:
+            methods = getattr(route, "methods", None)
+            method, path = ",".join(sorted(methods)) if methods else scope["method"], route.path
+        return _HTTP.labels(method, path), _HTTP_ERRORS.labels(method, path, "4xx"), _HTTP_ERRORS.labels(method, path, "5xx")
+
+def register_gauges(app: FastAPI) -> None:
+    """Scrape-time gauges for the WS manager, the connection pool and the caches."""
+    mgr = lambda: app.state.ws_manager
+    metrics.gauge("ws_rooms", "Rooms with at least one local socket", lambda: len(mgr().rooms))
+    metrics.gauge("ws_sockets", "Open WebSocket connections", lambda: len(mgr().outboxes))
+    # A distribution rather than one series per room: room ids are unbounded
+    metrics.histogram_gauge("ws_room_sockets", "Local sockets per room, over rooms with any",
+                            lambda: [len(sockets) for sockets in list(mgr().rooms.values())], _ROOM_SOCKET_BUCKETS)
+    metrics.gauge("ws_evicted_sockets_total", "Sockets dropped for being slow or overflowing", lambda: mgr().evicted, kind="counter")
+    metrics.gauge("ws_dropped_frames_total", "Frames dropped or folded by the overflow policy", lambda: mgr().dropped, kind="counter")
+    pool = lambda: dbmod._pool
+    metrics.gauge("db_pool_write_waits_total", "Writers that waited for the write lock",
+                  lambda: pool().write_waits if pool() else 0, kind="counter")
+    metrics.gauge("db_pool_write_wait_seconds_total", "Total time writers waited for the write lock",
+                  lambda: pool().write_wait_time if pool() else 0.0, kind="counter")
+    for field in ("size", "hits", "misses"):
+        metrics.gauge(f"db_cache_{field}", f"In-process cache {field} (database/cache.py)",
+                      lambda f=field: [((name,), s[f]) for name, s in dbmod.cache_stats().items()], ("cache",))
+
+def install(app: FastAPI) -> None:
+    app.add_middleware(MetricsMiddleware)
+    register_gauges(app)
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics_api() -> PlainTextResponse:
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
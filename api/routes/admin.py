@@ -0,0 +1,30 @@
+from __future__ import annotations
+import asyncio
+import hmac
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+
+import profiling
+
+router = APIRouter()
+
+# One profile at a time: concurrent samplers would only slow each other down
+_profiling = asyncio.Lock()
+
+def _check_token(request: Request, token: str) -> None:
+    expected = getattr(request.app.state, "admin_token", "")
+    if not expected or not hmac.compare_digest(token.encode(), expected.encode()):
+        raise HTTPException(status_code=403, detail="Нет доступа")
+
+@router.get("/admin/profile", include_in_schema=False)
+async def profile_api(request: Request, seconds: float = Query(10.0, gt=0, le=120), interval_ms: float = Query(5.0, ge=1, le=1000),
+                      x_admin_token: str = Header("")) -> PlainTextResponse:
+    """Sample all threads for `seconds` and return folded stacks for a flamegraph."""
+    _check_token(request, x_admin_token)
+    if _profiling.locked():
+        raise HTTPException(status_code=409, detail="Профилирование уже идёт")
+    async with _profiling:
+        counts = await asyncio.to_thread(profiling.sample_stacks, seconds, interval_ms / 1000)
+    return PlainTextResponse(profiling.folded(counts), headers={
+        "Content-Disposition": f'attachment; filename="{profiling.default_output_name()}"',
+    })
@@ -1,10 +1,10 @@
 from __future__ import annotations
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
 from pydantic import BaseModel
-from typing import Any, Dict, List
 
-from database.db import submit_answer, get_answers
-from api.deps import get_ws_manager
+from api import events
+from api.serialization import json_response, raw_json_response
+from api.deps import get_ws_manager, get_store
 from api.ws import WSManager
 
 router = APIRouter()
@@ -15,14 +15,14 @@ class AnswerBody(BaseModel):
     author_id: int
 
 @router.post("/rooms/{room_id}/answers")
-async def post_answer_api(room_id: int, body: AnswerBody, ws: WSManager = Depends(get_ws_manager)) -> Dict[str, Any]:
+async def post_answer_api(room_id: int, body: AnswerBody, ws: WSManager = Depends(get_ws_manager), store=Depends(get_store)) -> Response:
     try:
-        ans = await submit_answer(body.round_id, body.author_id, body.text)
+        ans = await store.submit_answer(body.round_id, body.author_id, body.text)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    await ws.broadcast(room_id, {"type": "answer_added", "payload": {"answer_id": ans["id"], "text": ans["text"]}})
-    return {"answer_id": ans["id"]}
+    await ws.broadcast(room_id, events.answer_added(ans))
+    return json_response({"answer_id": ans["id"]})
 
 @router.get("/rooms/{room_id}/answers")
-async def list_answers_api(room_id: int, round_id: int) -> List[Dict[str, Any]]:
-    return await get_answers(round_id)
+async def list_answers_api(room_id: int, round_id: int, store=Depends(get_store)) -> Response:
+    return raw_json_response(await store.get_answers_json(round_id))
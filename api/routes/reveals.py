@@ -1,10 +1,10 @@
 from __future__ import annotations
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
 from pydantic import BaseModel
-from typing import Any, Dict
 
-from database.db import reveal_answer
-from api.deps import get_ws_manager
+from api import events
+from api.serialization import json_response
+from api.deps import get_ws_manager, get_store
 from api.ws import WSManager
 
 router = APIRouter()
@@ -15,10 +15,10 @@ class RevealBody(BaseModel):
     actor_id: int
 
 @router.post("/rooms/{room_id}/reveal")
-async def reveal_api(room_id: int, body: RevealBody, ws: WSManager = Depends(get_ws_manager)) -> Dict[str, Any]:
+async def reveal_api(room_id: int, body: RevealBody, ws: WSManager = Depends(get_ws_manager), store=Depends(get_store)) -> Response:
     try:
-        result = await reveal_answer(body.round_id, body.answer_id, body.actor_id)
+        result = await store.reveal_answer(body.round_id, body.answer_id, body.actor_id)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    await ws.broadcast(room_id, {"type": "answer_revealed", "payload": result})
-    return result
+    await ws.broadcast(room_id, events.answer_revealed(body.round_id, result, body.actor_id))
+    return json_response(result)
@@ -1,10 +1,12 @@
 from __future__ import annotations
-from fastapi import APIRouter, HTTPException, Depends
+import re
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from pydantic import BaseModel
-from typing import Any, Dict
 
-from database.db import create_room, join_room, get_room_state
-from api.deps import get_ws_manager
+from database.db import create_room
+from api import events
+from api.serialization import json_response, raw_json_response
+from api.deps import get_ws_manager, get_store
 from api.ws import WSManager
 
 router = APIRouter()
@@ -15,7 +17,7 @@ class JoinBody(BaseModel):
     name: str
 
 @router.post("/rooms")
-async def create_room_api(data: JoinBody, ws: WSManager = Depends(get_ws_manager)) -> Dict[str, Any]:
+async def create_room_api(data: JoinBody, ws: WSManager = Depends(get_ws_manager)) -> Response:
     """
     Creates room owned by provided user (user must exist client-side first).
     """
@@ -23,27 +25,64 @@ async def create_room_api(data: JoinBody, ws: WSManager = Depends(get_ws_manager
     user = await get_or_create_user(data.tg_user_id, data.name)
     room = await create_room(user["id"])
     # Owner joins already inside create_room
-    return {"room_id": room["id"], "room_code": room["code"]}
+    return json_response({"room_id": room["id"], "room_code": room["code"]})
 
 @router.post("/rooms/join")
-async def join_room_api(body: JoinBody, ws: WSManager = Depends(get_ws_manager)) -> Dict[str, Any]:
+async def join_room_api(body: JoinBody, ws: WSManager = Depends(get_ws_manager), store=Depends(get_store)) -> Response:
     from database.db import get_or_create_user
     user = await get_or_create_user(body.tg_user_id, body.name)
     try:
-        result = await join_room(body.room_code, user["id"])
+        result = await store.join_room(body.room_code, user["id"])
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    await ws.broadcast(result["room"]["id"], {"type": "player_joined", "payload": {"user_id": user["id"], "name": user["name"]}})
-    return {
+    await ws.broadcast(result["room"]["id"], events.player_joined(user["id"], user["name"]))
+    return json_response({
         "room_id": result["room"]["id"],
-        "player_id": result["player"]["id"],
+        "player_id": result["player"]["player_id"],
         "super_cards": result["player"]["super_cards"]
-    }
+    })
 
 @router.get("/rooms/{room_id}")
-async def get_room_api(room_id: int) -> Dict[str, Any]:
+async def get_room_api(room_id: int, store=Depends(get_store)) -> Response:
     try:
-        state = await get_room_state(room_id)
+        body = await store.get_room_state_json(room_id)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
-    return state
+    return raw_json_response(body)
+
+@router.get("/rooms/{room_id}/summary")
+async def get_room_summary_api(room_id: int, store=Depends(get_store)) -> Response:
+    """Status and counters for polling, without reading players or answers."""
+    summary = await store.get_room_summary(room_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Комната не найдена")
+    return json_response(summary)
+
+# One entity-tag of an If-None-Match list: optional weak prefix, then the quoted opaque tag
+_ENTITY_TAG = re.compile(r'(?:W/)?("[^"]*")')
+
+def _etag(room_id: int, version: int) -> str:
+    return f'"r{room_id}v{version}"'
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match per RFC 9110 13.1.2: "*", or a comma-separated list compared weakly (W/ ignored)."""
+    if if_none_match.strip() == "*":
+        return True
+    return etag in _ENTITY_TAG.findall(if_none_match)
+
+@router.get("/rooms/{room_id}/snapshot")
+async def get_room_snapshot_api(room_id: int, request: Request, store=Depends(get_store)) -> Response:
+    """
+    Players, current round and answers in one response. Revalidate with
+    If-None-Match: an unchanged room costs one primary-key lookup and a 304.
+    """
+    inm = request.headers.get("if-none-match")
+    if inm:
+        version = await store.get_room_version(room_id)
+        if version is not None and _etag_matches(inm, _etag(room_id, version)):
+            return Response(status_code=304, headers={"ETag": _etag(room_id, version), "Cache-Control": "no-cache"})
+    try:
+        version, body = await store.get_room_snapshot_json(room_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return raw_json_response(body, headers={"ETag": _etag(room_id, version), "Cache-Control": "no-cache"})
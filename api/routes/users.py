@@ -1,8 +1,8 @@
 from __future__ import annotations
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
 from pydantic import BaseModel
-from typing import Any, Dict
 
+from api.serialization import json_response
 from database.db import get_or_create_user, get_user_by_id
 
 router = APIRouter()
@@ -12,13 +12,13 @@ class UserBody(BaseModel):
     name: str
 
 @router.post("/users")
-async def upsert_user_api(body: UserBody) -> Dict[str, Any]:
+async def upsert_user_api(body: UserBody) -> Response:
     user = await get_or_create_user(body.tg_user_id, body.name)
-    return {"user_id": user["id"], "name": user["name"]}
+    return json_response({"user_id": user["id"], "name": user["name"]})
 
 @router.get("/users/{user_id}")
-async def get_user_api(user_id: int) -> Dict[str, Any]:
+async def get_user_api(user_id: int) -> Response:
     u = await get_user_by_id(user_id)
     if not u:
-        return {"exists": False}
-    return {"exists": True, "user_id": u["id"], "name": u["name"]}
+        return json_response({"exists": False})
+    return json_response({"exists": True, "user_id": u["id"], "name": u["name"]})
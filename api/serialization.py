@@ -0,0 +1,60 @@
+from __future__ import annotations
+"""
+JSON encoding for REST responses and WebSocket frames.
+
+orjson when it is installed (several times faster than the stdlib on the
+list-of-rows payloads the routes return), otherwise the stdlib json with the
+same output: compact separators and UTF-8 text rather than \\u escapes.
+Records from database/records.py are encoded field by field (natively by
+orjson, through `as_dict()` by the fallback), with no dict per row.
+
+Routes return `json_response(data)`: a Response is passed through by FastAPI
+as is, so the payload skips jsonable_encoder and response-model validation;
+database rows are already plain JSON types or records.
+"""
+import json
+from typing import Any, Mapping, Optional, Union
+
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+def _default(obj: Any) -> Any:
+    # Records (database/records.py) for the stdlib encoder
+    as_dict = getattr(obj, "as_dict", None)
+    if as_dict is None:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return as_dict()
+
+if orjson is not None:
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+    def dumps_str(obj: Any) -> str:
+        return orjson.dumps(obj).decode()
+
+    loads = orjson.loads
+else:
+    def dumps_str(obj: Any) -> str:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_default)
+
+    def dumps(obj: Any) -> bytes:
+        return dumps_str(obj).encode()
+
+    loads = json.loads
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def json_response(content: Any, status_code: int = 200, headers: Optional[Mapping[str, str]] = None) -> FastJSONResponse:
+    return FastJSONResponse(content, status_code=status_code, headers=headers)
+
+def raw_json_response(body: Union[str, bytes], status_code: int = 200, headers: Optional[Mapping[str, str]] = None) -> Response:
+    """JSON text that is already encoded, e.g. by SQLite's JSON functions (database/db.py *_json)."""
+    return Response(body, status_code=status_code, headers=headers, media_type="application/json")
@@ -1,16 +1,119 @@
 from __future__ import annotations
-from typing import Dict, Set
+import asyncio
+import time
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
+import metrics
+from api import events, serialization
+from api.bus import EventBus
+
 router = APIRouter()
 
+# What to do when a socket's outbound queue is full
+OVERFLOW_POLICIES = ("drop_oldest", "coalesce", "disconnect")
+# Events that "coalesce" may fold into a single answers_snapshot frame
+_ANSWER_EVENTS = ("answer_added", "answer_revealed", "answers_snapshot")
+
+# Encoding one event and queueing it for every socket in the room
+_FANOUT = metrics.histogram("ws_broadcast_fanout_seconds", "Time to encode an event and queue it for a room's sockets").labels()
+
+# Encoded once per event and shared by every socket in the room
+_encode = serialization.dumps_str
+
+class _Outbox:
+    """Bounded queue of pre-encoded frames for one socket, drained by its own writer task."""
+    __slots__ = ("ws", "room_id", "items", "ready", "idle", "task")
+
+    def __init__(self, ws: WebSocket, room_id: int):
+        self.ws = ws
+        self.room_id = room_id
+        # (event type, encoded frame, payload, seq)
+        self.items: Deque[Tuple[str, str, Any, int]] = deque()
+        self.ready = asyncio.Event()
+        self.idle = asyncio.Event()
+        self.idle.set()
+        self.task: Optional[asyncio.Task] = None
+
 class WSManager:
-    def __init__(self):
+    def __init__(self, send_timeout: float = 2.0, queue_size: int = 64, overflow: str = "coalesce",
+                 history_size: int = 256):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow!r}")
         self.rooms: Dict[int, Set[WebSocket]] = {}
+        self.outboxes: Dict[WebSocket, _Outbox] = {}
+        self.send_timeout = send_timeout
+        self.queue_size = max(1, queue_size)
+        self.overflow = overflow
+        self.evicted = 0
+        self.dropped = 0
+        self._closing: Set[asyncio.Task] = set()
+        self.bus: Optional[EventBus] = None
+        # Last seq and a ring buffer of recent (seq, frame) per room, for resuming clients
+        self.history_size = history_size
+        self.latest: Dict[int, int] = {}
+        self.history: Dict[int, Deque[Tuple[int, str]]] = {}
+        self.epoch = uuid.uuid4().hex[:12]
+
+    async def attach_bus(self, bus: EventBus):
+        """Route broadcasts through a pub/sub backend so other processes see them too."""
+        await bus.start(self.deliver)
+        self.bus = bus
+        if bus.epoch:
+            self.epoch = bus.epoch
+
+    def _from_history(self, room_id: int, since: int, latest: int) -> Optional[List[Tuple[int, str]]]:
+        if since >= latest:
+            return [] if since == latest else None
+        ring = self.history.get(room_id)
+        if not ring or ring[0][0] > since + 1:
+            return None
+        return [(seq, text) for seq, text in ring if seq > since]
 
-    async def connect(self, room_id: int, ws: WebSocket):
+    async def _missed(self, room_id: int, since: int, latest: int) -> Optional[List[Tuple[int, str]]]:
+        """Frames after `since`, or None when the client has to resync from REST."""
+        frames = self._from_history(room_id, since, latest)
+        if frames is not None or self.bus is None:
+            return frames
+        rows = await self.bus.replay(room_id, since)
+        if rows is None:
+            return None
+        frames = [(seq, _encode(msg)) for seq, msg in rows]
+        last = frames[-1][0] if frames else since
+        # Events delivered while we were reading the table
+        if last < self.latest.get(room_id, 0):
+            tail = self._from_history(room_id, last, self.latest[room_id])
+            if tail is None:
+                return None
+            frames += tail
+        return frames
+
+    async def connect(self, room_id: int, ws: WebSocket, since: Optional[int] = None, epoch: Optional[str] = None):
         await ws.accept()
+        latest = self.latest.get(room_id)
+        if latest is None and self.bus is not None:
+            latest = await self.bus.latest_seq(room_id)
+        missed: Optional[List[Tuple[int, str]]] = []
+        if since is not None:
+            missed = await self._missed(room_id, since, latest or 0) if epoch == self.epoch else None
+        # No awaits from here on: nothing can be delivered between replay and registration
+        latest = max(latest or 0, self.latest.get(room_id, 0), missed[-1][0] if missed else 0)
         self.rooms.setdefault(room_id, set()).add(ws)
+        box = _Outbox(ws, room_id)
+        box.task = asyncio.create_task(self._writer(box))
+        self.outboxes[ws] = box
+        hello = {"type": "hello", "payload": {"epoch": self.epoch, "seq": latest}}
+        box.items.append(("hello", _encode(hello), hello["payload"], 0))
+        if missed is None:
+            resync = {"type": "resync", "payload": {"epoch": self.epoch, "seq": latest}}
+            box.items.append(("resync", _encode(resync), resync["payload"], latest))
+        else:
+            for seq, text in missed:
+                box.items.append(("replay", text, None, seq))
+        box.idle.clear()
+        box.ready.set()
 
     def _discard(self, room_id: int, ws: WebSocket):
         try:
@@ -19,27 +122,156 @@ class WSManager:
                 self.rooms.pop(room_id, None)
         except Exception:
             pass
+        box = self.outboxes.pop(ws, None)
+        if box is not None:
+            box.idle.set()
+            if box.task is not None and box.task is not asyncio.current_task():
+                box.task.cancel()
 
     async def disconnect(self, room_id: int, ws: WebSocket):
         self._discard(room_id, ws)
 
-    async def broadcast(self, room_id: int, message: dict):
-        dead = []
-        for ws in list(self.rooms.get(room_id, set())):
-            try:
-                await ws.send_json(message)
-            except Exception:
-                dead.append(ws)
-        for ws in dead:
+    async def close(self):
+        if self.bus is not None:
+            await self.bus.close()
+            self.bus = None
+        tasks = [box.task for box in self.outboxes.values() if box.task is not None]
+        for ws, box in list(self.outboxes.items()):
+            self._discard(box.room_id, ws)
+        await asyncio.gather(*tasks, *self._closing, return_exceptions=True)
+
+    async def _send(self, ws: WebSocket, text: str) -> bool:
+        try:
+            await asyncio.wait_for(ws.send_text(text), self.send_timeout)
+            return True
+        except Exception:
+            return False
+
+    async def _close(self, ws: WebSocket, code: int = 1008):
+        try:
+            # Default is policy violation: the client could not keep up
+            await asyncio.wait_for(ws.close(code=code), self.send_timeout)
+        except Exception:
+            pass
+
+    async def _evict(self, room_id: int, ws: WebSocket):
+        self._discard(room_id, ws)
+        self.evicted += 1
+        await self._close(ws)
+
+    def _evict_later(self, room_id: int, ws: WebSocket):
+        self._discard(room_id, ws)
+        self.evicted += 1
+        task = asyncio.create_task(self._close(ws))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    def forget(self, room_id: int):
+        """Drop an archived room: close its sockets normally and free its replay history."""
+        for ws in list(self.rooms.get(room_id, ())):
             self._discard(room_id, ws)
+            task = asyncio.create_task(self._close(ws, 1000))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+        self.latest.pop(room_id, None)
+        self.history.pop(room_id, None)
+
+    async def _writer(self, box: _Outbox):
+        while True:
+            await box.ready.wait()
+            while box.items:
+                _, text, _, _ = box.items.popleft()
+                if not await self._send(box.ws, text):
+                    await self._evict(box.room_id, box.ws)
+                    return
+            box.ready.clear()
+            box.idle.set()
+
+    def _coalesce(self, box: _Outbox) -> bool:
+        """Fold every queued answer event into one answers_snapshot frame.
+
+        Its answers are the folded payloads in order; clients upsert them by answer_id.
+        The snapshot takes the place of the first folded event, so the queue stays
+        in seq order (clients drop frames whose seq is not above the last one seen).
+        """
+        folded = [it for it in box.items if it[0] in _ANSWER_EVENTS]
+        if len(folded) < 2:
+            return False
+        answers = []
+        for kind, _, payload, _ in folded:
+            answers.extend(payload["answers"] if kind == "answers_snapshot" else [payload])
+        pos = next(i for i, it in enumerate(box.items) if it[0] in _ANSWER_EVENTS)
+        rest = [it for it in box.items if it[0] not in _ANSWER_EVENTS]
+        # The newest folded seq, unless a frame queued behind the snapshot is older than
+        # that: then just below it. A client resuming from the lower seq gets the later
+        # answer events replayed, which upserting makes harmless.
+        seq = max(it[3] for it in folded)
+        if pos < len(rest):
+            seq = min(seq, rest[pos][3] - 1)
+        snapshot = {"type": "answers_snapshot", "v": events.SCHEMA_VERSION, "payload": {"answers": answers}, "seq": seq}
+        rest.insert(pos, ("answers_snapshot", _encode(snapshot), snapshot["payload"], seq))
+        box.items = deque(rest)
+        self.dropped += len(folded) - 1
+        return True
+
+    def _enqueue(self, box: _Outbox, item: Tuple[str, str, Any, int]) -> bool:
+        if len(box.items) >= self.queue_size:
+            if self.overflow == "disconnect":
+                return False
+            if self.overflow != "coalesce" or not self._coalesce(box):
+                box.items.popleft()
+                self.dropped += 1
+        box.items.append(item)
+        box.idle.clear()
+        box.ready.set()
+        return True
+
+    async def broadcast(self, room_id: int, message: dict):
+        """Publish a room event to every process; local sockets get it via deliver()."""
+        if self.bus is not None:
+            await self.bus.publish(room_id, message)
+        else:
+            await self.deliver(room_id, message)
+
+    async def deliver(self, room_id: int, message: dict):
+        """Queue an event for every local socket in the room; never waits for the network."""
+        t0 = time.perf_counter()
+        seq = message.get("seq")
+        if seq is None:
+            # No shared bus numbering: sequence per process
+            seq = self.latest.get(room_id, 0) + 1
+            message = {**message, "seq": seq}
+        # Encode once for the whole room
+        text = _encode(message)
+        if seq > self.latest.get(room_id, 0):
+            self.latest[room_id] = seq
+        ring = self.history.get(room_id)
+        if ring is None:
+            ring = self.history[room_id] = deque(maxlen=self.history_size)
+        ring.append((seq, text))
+        sockets = self.rooms.get(room_id)
+        if not sockets:
+            return
+        item = (message.get("type", ""), text, message.get("payload"), seq)
+        overflowed = [ws for ws in list(sockets) if ws in self.outboxes and not self._enqueue(self.outboxes[ws], item)]
+        for ws in overflowed:
+            self._evict_later(room_id, ws)
+        _FANOUT.observe(time.perf_counter() - t0)
+
+    async def drained(self):
+        """Wait until every queued frame has been written (tests, graceful shutdown)."""
+        await asyncio.gather(*(box.idle.wait() for box in list(self.outboxes.values())))
 
 @router.websocket("/ws/rooms/{room_id}")
-async def ws_room(websocket: WebSocket, room_id: int):
+async def ws_room(websocket: WebSocket, room_id: int, since: Optional[int] = None, epoch: Optional[str] = None):
     mgr: WSManager = websocket.app.state.ws_manager
-    await mgr.connect(room_id, websocket)
+    await mgr.connect(room_id, websocket, since=since, epoch=epoch)
     try:
         while True:
             # Keepalive / echo ping
             await websocket.receive_text()
-    except WebSocketDisconnect:
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: the socket was already closed by an eviction
+        pass
+    finally:
         await mgr.disconnect(room_id, websocket)
@@ -0,0 +1,59 @@
+"""
+Answer burst at round start: every player in every room submits at once.
+
+Compares one commit per submit_answer with the group-commit batcher
+(database/batcher.py) at a few window sizes.
+
+    python -m benchmarks.bench_answers --rooms 20 --players 25 --windows 0 2 5
+    python -m benchmarks.bench_answers --profile default   # rollback journal, fsync per commit
+
+Each line is the median of --repeat runs on fresh databases. The gain depends
+on what a commit costs: with WAL (no fsync per commit) it is about 3x, with
+the rollback journal about 10x (see the README for measured numbers).
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from database import db as dbmod
+
+async def run(rooms: int, players: int, window_ms: float, profile: str):
+    with tempfile.TemporaryDirectory() as td:
+        dbmod.set_db_path(os.path.join(td, "bench.db"))
+        await dbmod.ensure_initialized()
+        await dbmod.open_pool(4, profile)
+        try:
+            users = [await dbmod.get_or_create_user(f"b{i}", f"P{i}") for i in range(players)]
+            rounds = []
+            for _ in range(rooms):
+                room = await dbmod.create_room(users[0]["id"])
+                rounds.append((await dbmod.set_question(room["id"], "Go!"))["id"])
+            batcher = dbmod.open_answer_batcher(window_ms / 1000) if window_ms > 0 else None
+            t0 = time.perf_counter()
+            await asyncio.gather(*(dbmod.submit_answer(r, u["id"], "answer") for r in rounds for u in users))
+            dt = time.perf_counter() - t0
+            await dbmod.close_answer_batcher()
+            return rooms * players / dt, batcher.batches if batcher else rooms * players
+        finally:
+            await dbmod.close_pool()
+
+async def main(rooms: int, players: int, windows, profile: str, repeat: int):
+    print(f"{rooms} rooms x {players} players, profile={profile}, median of {repeat}")
+    for w in windows:
+        runs = [await run(rooms, players, w, profile) for _ in range(repeat)]
+        label = f"window {w:g} ms" if w > 0 else "per-call commit"
+        print(f"  {label:<16} {statistics.median(r for r, _ in runs):9.0f} answers/s  ({runs[-1][1]} commits)")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rooms", type=int, default=20)
+    ap.add_argument("--players", type=int, default=25)
+    ap.add_argument("--windows", type=float, nargs="+", default=[0, 2, 5])
+    ap.add_argument("--profile", default="wal")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+    asyncio.run(main(args.rooms, args.players, args.windows, args.profile, args.repeat))
@@ -0,0 +1,77 @@
+"""
+Room creation latency as the rooms table grows: id-derived codes vs. the old
+random code + SELECT probe + INSERT + re-SELECT flow.
+
+    python -m benchmarks.bench_codes --sizes 10000 100000 1000000 --iterations 500
+    python -m benchmarks.bench_codes --sizes 10000000 --iterations 200   # slow to fill
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import random
+import string
+import tempfile
+import time
+
+import aiosqlite
+
+from database import db as dbmod
+
+async def legacy_create(owner_user_id: int):
+    async with dbmod._connect(write=True) as db:
+        # The old flow read columns by name: aiosqlite.Row, the pool's former default
+        db.row_factory = aiosqlite.Row
+        try:
+            for _ in range(20):
+                code = "".join(random.choice(string.ascii_uppercase + string.digits) for _ in range(6))
+                cur = await db.execute("SELECT id FROM rooms WHERE code=?", (code,))
+                if not await cur.fetchone():
+                    break
+            await db.execute("INSERT INTO rooms (code, owner_user_id, status) VALUES (?,?, 'active')", (code, owner_user_id))
+            await db.commit()
+            cur = await db.execute("SELECT * FROM rooms WHERE code=?", (code,))
+            room = dict(await cur.fetchone())
+            await db.execute("INSERT OR IGNORE INTO room_players (room_id, user_id, super_cards) VALUES (?,?,3)",
+                             (room["id"], owner_user_id))
+            await db.commit()
+        finally:
+            db.row_factory = None
+
+async def _fill(rooms: int, owner: int):
+    async with dbmod._connect(write=True) as db:
+        await db.execute("""
+            WITH RECURSIVE s(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM s WHERE n < ?)
+            INSERT INTO rooms (id, code, owner_user_id) SELECT n, room_code(n), ? FROM s
+        """, (rooms, owner))
+        await db.commit()
+
+async def _time(label: str, fn, iterations: int):
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        await fn()
+    per_call = (time.perf_counter() - t0) / iterations * 1e6
+    print(f"  {label:<10} {per_call:9.1f} µs/room")
+
+async def main(sizes, iterations: int):
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as td:
+            dbmod.set_db_path(os.path.join(td, "bench.db"))
+            await dbmod.ensure_initialized()
+            await dbmod.open_pool(2, "wal")
+            try:
+                user = await dbmod.get_or_create_user("bench", "Bench")
+                t0 = time.perf_counter()
+                await _fill(size, user["id"])
+                print(f"{size:,} rooms (filled in {time.perf_counter() - t0:.1f}s)")
+                await _time("random", lambda: legacy_create(user["id"]), iterations)
+                await _time("encoded", lambda: dbmod.create_room(user["id"]), iterations)
+            finally:
+                await dbmod.close_pool()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ap.add_argument("--iterations", type=int, default=500)
+    args = ap.parse_args()
+    asyncio.run(main(args.sizes, args.iterations))
@@ -0,0 +1,52 @@
+"""
+Per-call latency of room reads and round actions: SQLite helpers vs. RoomEngine.
+
+    python -m benchmarks.bench_engine --players 30 --iterations 500
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from database import db as dbmod
+from database.engine import RoomEngine
+
+async def _time(label: str, fn, iterations: int):
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        await fn()
+    per_call = (time.perf_counter() - t0) / iterations * 1e6
+    print(f"  {label:<16} {per_call:9.1f} µs/call")
+
+async def main(players: int, iterations: int):
+    with tempfile.TemporaryDirectory() as td:
+        dbmod.set_db_path(os.path.join(td, "bench.db"))
+        await dbmod.ensure_initialized()
+        await dbmod.open_pool(4, "wal")
+        try:
+            users = [await dbmod.get_or_create_user(f"e{i}", f"P{i}") for i in range(players)]
+            room = await dbmod.create_room(users[0]["id"])
+            for u in users[1:]:
+                await dbmod.join_room(room["code"], u["id"])
+            rd = await dbmod.set_question(room["id"], "Bench?")
+            for u in users:
+                await dbmod.submit_answer(rd["id"], u["id"], f"answer {u['id']}")
+            engine = await RoomEngine().start()
+            try:
+                for name, store in (("sqlite", dbmod), ("engine", engine)):
+                    print(name)
+                    await _time("get_room_state", lambda: store.get_room_state(room["id"]), iterations)
+                    await _time("get_answers", lambda: store.get_answers(rd["id"]), iterations)
+            finally:
+                await engine.stop()
+        finally:
+            await dbmod.close_pool()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--players", type=int, default=30)
+    ap.add_argument("--iterations", type=int, default=500)
+    args = ap.parse_args()
+    asyncio.run(main(args.players, args.iterations))
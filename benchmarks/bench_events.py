@@ -0,0 +1,146 @@
+"""
+Database reads per round: clients that re-list answers vs clients applying deltas.
+
+One room with N connected players plays a round: the question goes out, every
+player answers, then `--reveals` answers are revealed. The requests go through
+the real routes (httpx ASGI transport, no server) and the sockets are fake
+WSManager subscribers that react to each event like a client would:
+
+- legacy: what the web app did before api/events.py: getQuestion on
+  question_set, listAnswers on every answer_added / answers_snapshot /
+  answer_revealed, plus a listAnswers after the client's own reveal;
+- delta: apply the event payload to the local store (webapp/scripts/state.js),
+  no requests.
+
+Every SQL statement on the pool connections is counted, along with the answer
+rows the listAnswers calls returned.
+
+    python -m benchmarks.bench_events --players 10,25,50 --reveals 5
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from api.routes.answers import router as answers_router
+from api.routes.prompts import router as prompts_router
+from api.routes.reveals import router as reveals_router
+from api.ws import WSManager
+from database import db as dbmod
+
+_RELIST = ("answer_added", "answers_snapshot", "answer_revealed")
+
+class Client:
+    """A player's browser tab: a fake socket plus the HTTP calls it makes."""
+
+    def __init__(self, http: httpx.AsyncClient, room_id: int, legacy: bool):
+        self.http = http
+        self.room_id = room_id
+        self.legacy = legacy
+        self.round_id = None
+        self.answers = {}
+        self.rows = 0
+        self.pending = set()
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+    async def send_text(self, text: str):
+        msg = json.loads(text)
+        p = msg.get("payload") or {}
+        if msg["type"] == "question_set":
+            self.round_id = p["round_id"]
+            self.answers = {}
+            if self.legacy:
+                self._spawn(self.http.get(f"/rooms/{self.room_id}/question"))
+        elif msg["type"] in _RELIST:
+            if self.legacy:
+                self._spawn(self.list_answers())
+            else:
+                for row in p["answers"] if msg["type"] == "answers_snapshot" else [p]:
+                    self.answers.setdefault(row["answer_id"], {}).update(row)
+
+    async def list_answers(self):
+        r = await self.http.get(f"/rooms/{self.room_id}/answers", params={"round_id": self.round_id})
+        self.rows += len(r.json())
+
+    def _spawn(self, coro):
+        # A browser does not block its socket while a fetch is in flight
+        task = asyncio.ensure_future(coro)
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+
+async def run(players: int, reveals: int, legacy: bool):
+    with tempfile.TemporaryDirectory() as td:
+        dbmod.set_db_path(os.path.join(td, "bench.db"))
+        await dbmod.ensure_initialized()
+        pool = await dbmod.open_pool(4, "wal")
+        app = FastAPI()
+        for router in (prompts_router, answers_router, reveals_router):
+            app.include_router(router)
+        app.state.ws_manager = mgr = WSManager(queue_size=4096)
+        app.state.room_engine = None
+        try:
+            users = [await dbmod.get_or_create_user(f"e{i}", f"P{i}") for i in range(players)]
+            room = await dbmod.create_room(users[0]["id"])
+            for u in users[1:]:
+                await dbmod.join_room(room["code"], u["id"])
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as http:
+                clients = [Client(http, room["id"], legacy) for _ in users]
+                for c in clients:
+                    await mgr.connect(room["id"], c)
+                await mgr.drained()
+
+                stmts = {"n": 0}
+                def trace(sql: str):
+                    stmts["n"] += 1
+                for conn in pool._all:
+                    await conn.set_trace_callback(trace)
+
+                t0 = time.perf_counter()
+                r = await http.post(f"/rooms/{room['id']}/question", json={"text": "Go!"})
+                round_id = r.json()["round_id"]
+                ids = []
+                for u in users:
+                    r = await http.post(f"/rooms/{room['id']}/answers", json={"round_id": round_id, "text": "answer", "author_id": u["id"]})
+                    ids.append(r.json()["answer_id"])
+                for i in range(min(reveals, players - 1)):
+                    # Player i+1 reveals player i's answer; the revealer's tab re-listed afterwards
+                    await http.post(f"/rooms/{room['id']}/reveal", json={"round_id": round_id, "answer_id": ids[i], "actor_id": users[i + 1]["id"]})
+                    if legacy:
+                        await clients[i + 1].list_answers()
+                await mgr.drained()
+                while any(c.pending for c in clients):
+                    await asyncio.gather(*(t for c in clients for t in list(c.pending)))
+                dt = time.perf_counter() - t0
+
+                for conn in pool._all:
+                    await conn.set_trace_callback(None)
+                rows = sum(c.rows for c in clients)
+                label = "legacy" if legacy else "delta"
+                print(f"  {label:<7} {stmts['n']:7d} SQL statements  {rows:8d} answer rows re-listed  {dt * 1000:8.1f} ms")
+        finally:
+            await mgr.close()
+            await dbmod.close_pool()
+
+async def main(players, reveals: int):
+    for n in players:
+        print(f"{n} players, {reveals} reveals")
+        await run(n, reveals, legacy=True)
+        await run(n, reveals, legacy=False)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--players", default="10,25,50")
+    ap.add_argument("--reveals", type=int, default=5)
+    args = ap.parse_args()
+    asyncio.run(main([int(x) for x in args.players.split(",")], args.reveals))
@@ -0,0 +1,81 @@
+"""
+JSON encoding cost of the largest payloads: get_room_state, get_answers and a
+WS answers_snapshot frame, for rooms of 10 to 1000 players.
+
+- fastapi: what a route returning a dict paid, jsonable_encoder plus
+  JSONResponse.render (stdlib json);
+- json: api/serialization.py's stdlib fallback on the raw rows;
+- orjson: api/serialization.py with orjson (when installed).
+
+    python -m benchmarks.bench_json --players 10,100,1000
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import timeit
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from api import events, serialization
+from database import db as dbmod
+
+def _stdlib(obj) -> bytes:
+    # db.py returns records; encode them the way api/serialization.py's fallback does
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=serialization._default).encode()
+
+def _encoders():
+    encoders = {
+        "fastapi": lambda obj: JSONResponse(jsonable_encoder(obj)).body,
+        "json": _stdlib,
+    }
+    if serialization.orjson is not None:
+        encoders["orjson"] = serialization.dumps
+    return encoders
+
+async def payloads(players: int):
+    with tempfile.TemporaryDirectory() as td:
+        dbmod.set_db_path(os.path.join(td, "bench.db"))
+        await dbmod.ensure_initialized()
+        await dbmod.open_pool(2, "wal")
+        try:
+            users = [await dbmod.get_or_create_user(f"j{i}", f"Игрок номер {i}") for i in range(players)]
+            room = await dbmod.create_room(users[0]["id"])
+            for u in users[1:]:
+                await dbmod.join_room(room["code"], u["id"])
+            rd = await dbmod.set_question(room["id"], "Какое ваше самое странное хобби?")
+            for i, u in enumerate(users):
+                await dbmod.submit_answer(rd["id"], u["id"], f"Собираю крышечки от бутылок, уже {i} штук")
+            state = await dbmod.get_room_state(room["id"])
+            answers = await dbmod.get_answers(rd["id"])
+        finally:
+            await dbmod.close_pool()
+    frame = {**events.event("answers_snapshot", {"answers": [{**a, "round_id": rd["id"]} for a in answers]}), "seq": 1}
+    return {"get_room_state": state, "get_answers": answers, "ws answers_snapshot": frame}
+
+def bench(obj, encode, budget: float) -> float:
+    """Microseconds per call."""
+    timer = timeit.Timer(lambda: encode(obj))
+    n, _ = timer.autorange()
+    n = max(1, int(n * budget / 0.2))
+    return min(timer.repeat(3, n)) / n * 1e6
+
+def main(players, budget: float):
+    encoders = _encoders()
+    print(f"backend: {serialization.BACKEND}")
+    print(f"  {'payload':<22} {'players':>7} {'bytes':>8} " + " ".join(f"{name + ' µs':>12}" for name in encoders))
+    for n in players:
+        for name, obj in asyncio.run(payloads(n)).items():
+            size = len(serialization.dumps(obj))
+            times = [bench(obj, enc, budget) for enc in encoders.values()]
+            print(f"  {name:<22} {n:7d} {size:8d} " + " ".join(f"{t:12.1f}" for t in times))
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--players", default="10,100,1000")
+    ap.add_argument("--budget", type=float, default=0.2, help="seconds per measurement")
+    args = ap.parse_args()
+    main([int(x) for x in args.players.split(",")], args.budget)
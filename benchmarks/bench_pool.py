@@ -0,0 +1,64 @@
+"""
+Requests/sec of typical read/write calls with and without the connection pool.
+
+    python -m benchmarks.bench_pool --requests 2000 --concurrency 50
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from database import db as dbmod
+
+async def _seed(players: int):
+    owner = await dbmod.get_or_create_user("bench-0", "Owner")
+    room = await dbmod.create_room(owner["id"])
+    users = [owner]
+    for i in range(1, players):
+        u = await dbmod.get_or_create_user(f"bench-{i}", f"P{i}")
+        await dbmod.join_room(room["code"], u["id"])
+        users.append(u)
+    rd = await dbmod.set_question(room["id"], "Bench?")
+    return room, rd, users
+
+async def _run(requests: int, concurrency: int, room, rd, users) -> float:
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with sem:
+            if i % 10 == 0:
+                u = users[i % len(users)]
+                await dbmod.get_or_create_user(u["tg_user_id"], u["name"])
+            elif i % 2:
+                await dbmod.get_room_state(room["id"])
+            else:
+                await dbmod.get_answers(rd["id"])
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return requests / (time.perf_counter() - t0)
+
+async def main(requests: int, concurrency: int, pool_size: int, players: int):
+    with tempfile.TemporaryDirectory() as td:
+        dbmod.set_db_path(os.path.join(td, "bench.db"))
+        await dbmod.ensure_initialized()
+        room, rd, users = await _seed(players)
+        before = await _run(requests, concurrency, room, rd, users)
+        await dbmod.open_pool(pool_size)
+        try:
+            after = await _run(requests, concurrency, room, rd, users)
+        finally:
+            await dbmod.close_pool()
+    print(f"per-call connections: {before:8.0f} req/s")
+    print(f"pool (size={pool_size}):      {after:8.0f} req/s  (x{after / before:.1f})")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--concurrency", type=int, default=50)
+    ap.add_argument("--pool-size", type=int, default=4)
+    ap.add_argument("--players", type=int, default=20)
+    args = ap.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.pool_size, args.players))
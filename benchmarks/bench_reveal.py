@@ -0,0 +1,92 @@
+"""
+Reveal contention: every player in a room fires a super-card at the same time.
+
+Compares the previous reveal flow (five SELECTs, two UPDATEs in a manual
+transaction, then a JOIN for the author name) with the conditional
+UPDATE ... RETURNING path in database/db.py.
+
+    python -m benchmarks.bench_reveal --players 100 --rounds 3
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import aiosqlite
+
+from database import db as dbmod
+
+async def legacy_reveal(round_id: int, answer_id: int, actor_user_id: int):
+    async with dbmod._connect(write=True) as db:
+        # The old flow read columns by name: aiosqlite.Row, the pool's former default
+        db.row_factory = aiosqlite.Row
+        try:
+            async with db.execute("BEGIN"):
+                cur = await db.execute("SELECT * FROM answers WHERE id=? AND round_id=?", (answer_id, round_id))
+                ans = await cur.fetchone()
+                if not ans or ans["revealed"] == 1:
+                    raise ValueError("answer")
+                cur = await db.execute("SELECT * FROM rounds WHERE id=?", (round_id,))
+                rd = await cur.fetchone()
+                if ans["user_id"] == actor_user_id:
+                    raise ValueError("self")
+                cur = await db.execute("SELECT rp.id, rp.super_cards FROM room_players rp WHERE rp.room_id=? AND rp.user_id=?",
+                                       (rd["room_id"], actor_user_id))
+                rp = await cur.fetchone()
+                if not rp or rp["super_cards"] <= 0:
+                    raise ValueError("cards")
+                await db.execute("UPDATE room_players SET super_cards=super_cards-1 WHERE id=? AND super_cards>0", (rp["id"],))
+                await db.execute("UPDATE answers SET revealed=1, revealed_by_user_id=? WHERE id=?", (actor_user_id, answer_id))
+                await dbmod._bump_version(db, rd["room_id"])
+                await db.commit()
+            cur = await db.execute("SELECT a.id as answer_id, u.name as author_display FROM answers a JOIN users u ON u.id = a.user_id WHERE a.id=?",
+                                   (answer_id,))
+            return dict(await cur.fetchone())
+        finally:
+            db.row_factory = None
+
+async def _timed(fn, *args):
+    t0 = time.perf_counter()
+    await fn(*args)
+    return time.perf_counter() - t0
+
+async def run(label: str, reveal, players: int, rounds: int):
+    with tempfile.TemporaryDirectory() as td:
+        dbmod.set_db_path(os.path.join(td, "bench.db"))
+        await dbmod.ensure_initialized()
+        await dbmod.open_pool(4, "wal")
+        try:
+            users = [await dbmod.get_or_create_user(f"r{i}", f"P{i}") for i in range(players)]
+            room = await dbmod.create_room(users[0]["id"])
+            for u in users[1:]:
+                await dbmod.join_room(room["code"], u["id"])
+            latencies, elapsed = [], 0.0
+            for _ in range(rounds):
+                rd = await dbmod.set_question(room["id"], "Who?")
+                answers = [await dbmod.submit_answer(rd["id"], u["id"], "text") for u in users]
+                t0 = time.perf_counter()
+                # Player i reveals player i+1's answer, all at once
+                latencies += await asyncio.gather(*(
+                    _timed(reveal, rd["id"], answers[(i + 1) % players]["id"], u["id"]) for i, u in enumerate(users)))
+                elapsed += time.perf_counter() - t0
+            latencies.sort()
+            p95 = latencies[int(len(latencies) * 0.95) - 1]
+            print(f"  {label:<8} {len(latencies) / elapsed:8.0f} reveals/s  "
+                  f"p50 {statistics.median(latencies) * 1e3:6.1f} ms  p95 {p95 * 1e3:6.1f} ms")
+        finally:
+            await dbmod.close_pool()
+
+async def main(players: int, rounds: int):
+    print(f"{players} players, {rounds} rounds of simultaneous reveals")
+    await run("legacy", legacy_reveal, players, rounds)
+    await run("returning", dbmod.reveal_answer, players, rounds)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--players", type=int, default=100)
+    ap.add_argument("--rounds", type=int, default=3)
+    args = ap.parse_args()
+    asyncio.run(main(args.players, args.rounds))
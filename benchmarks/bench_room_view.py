@@ -0,0 +1,87 @@
+"""
+Room views as the routes serve them, per call through the connection pool:
+
+- records: get_room_state / get_room_snapshot / get_answers (several
+  statements, rows mapped in Python) plus encoding with api/serialization.py;
+- sql json: the *_json variants, one statement with SQLite building the JSON;
+- status: counting players and answers with COUNT(*) versus reading the
+  room_summary counters kept by triggers.
+
+    python -m benchmarks.bench_room_view --players 10,100,1000
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from api import serialization
+from database import db as dbmod
+
+_COUNTS = """
+    SELECT (SELECT COUNT(*) FROM room_players WHERE room_id=:room),
+           (SELECT COUNT(*) FROM answers WHERE round_id=:round),
+           (SELECT COUNT(*) FROM answers WHERE round_id=:round AND revealed=1)
+"""
+
+async def _counts(room_id: int, round_id: int):
+    async with dbmod._connect() as db:
+        cur = await db.execute(_COUNTS, {"room": room_id, "round": round_id})
+        return await cur.fetchone()
+
+async def per_call(fn, iterations: int) -> float:
+    """Microseconds per awaited call."""
+    await fn()
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        await fn()
+    return (time.perf_counter() - t0) / iterations * 1e6
+
+async def run(players: int, iterations: int):
+    with tempfile.TemporaryDirectory() as td:
+        dbmod.set_db_path(os.path.join(td, "bench.db"))
+        await dbmod.ensure_initialized()
+        await dbmod.open_pool(2, "wal")
+        try:
+            users = [await dbmod.get_or_create_user(f"v{i}", f"Игрок номер {i}") for i in range(players)]
+            room = await dbmod.create_room(users[0]["id"])
+            for u in users[1:]:
+                await dbmod.join_room(room["code"], u["id"])
+            rd = await dbmod.set_question(room["id"], "Какое ваше самое странное хобби?")
+            for i, u in enumerate(users):
+                await dbmod.submit_answer(rd["id"], u["id"], f"Собираю крышечки от бутылок, уже {i} штук")
+            room_id, round_id = room["id"], rd["id"]
+
+            async def state():
+                return serialization.dumps(await dbmod.get_room_state(room_id))
+
+            async def snapshot():
+                return serialization.dumps(await dbmod.get_room_snapshot(room_id))
+
+            async def answers():
+                return serialization.dumps(await dbmod.get_answers(round_id))
+
+            cases = [
+                ("get_room_state", state, lambda: dbmod.get_room_state_json(room_id)),
+                ("get_room_snapshot", snapshot, lambda: dbmod.get_room_snapshot_json(room_id)),
+                ("get_answers", answers, lambda: dbmod.get_answers_json(round_id)),
+                ("status counters", lambda: _counts(room_id, round_id), lambda: dbmod.get_room_summary(room_id)),
+            ]
+            return [(name, await per_call(old, iterations), await per_call(new, iterations)) for name, old, new in cases]
+        finally:
+            await dbmod.close_pool()
+
+def main(players, iterations: int):
+    print(f"JSON backend: {serialization.BACKEND}")
+    print(f"  {'view':<18} {'players':>7} {'records µs':>11} {'sql json µs':>12} {'speedup':>8}")
+    for n in players:
+        for name, old, new in asyncio.run(run(n, iterations)):
+            print(f"  {name:<18} {n:7d} {old:11.1f} {new:12.1f} {old / new:7.1f}x")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--players", default="10,100,1000")
+    ap.add_argument("--iterations", type=int, default=200)
+    args = ap.parse_args()
+    main([int(x) for x in args.players.split(",")], args.iterations)
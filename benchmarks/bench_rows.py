@@ -0,0 +1,134 @@
+"""
+Row mapping cost of the two list queries that grow with the room: players
+(get_room_state / get_room_snapshot) and answers (get_answers), before and
+after database/records.py.
+
+- row→dict: aiosqlite.Row factory and `[dict(r) for r in rows]`, as db.py did;
+- records:  tuple rows turned into the slotted records by the cursor's row_factory;
+- dict-dc:  the same records as plain (dict-backed) dataclasses, as records.py
+  first had them: faster for orjson to encode, but larger.
+
+Per payload: time to fetch and map all rows (what runs on the aiosqlite
+thread plus the event loop), time to encode the list with
+api/serialization.py, and memory held by the mapped list and allocated at
+peak while building it (tracemalloc).
+
+    python -m benchmarks.bench_rows --players 100,1000,5000
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import sqlite3
+import tempfile
+import timeit
+import tracemalloc
+from dataclasses import fields, make_dataclass
+
+from api import serialization
+from database import db as dbmod
+from database.records import Answer, Player
+
+_OLD_PLAYERS = """
+    SELECT rp.id as player_id, u.id as user_id, u.name, rp.super_cards
+    FROM room_players rp JOIN users u ON u.id = rp.user_id
+    WHERE rp.room_id=?
+    ORDER BY rp.id ASC
+"""
+_OLD_ANSWERS = """
+    SELECT a.id as answer_id, a.text, a.revealed,
+           CASE WHEN a.revealed=1 THEN u.name ELSE NULL END as author_display
+    FROM answers a JOIN users u ON u.id = a.user_id
+    WHERE a.round_id=?
+    ORDER BY a.id ASC
+"""
+
+async def build(path: str, players: int):
+    dbmod.set_db_path(path)
+    await dbmod.ensure_initialized()
+    await dbmod.open_pool(2, "wal")
+    try:
+        users = [await dbmod.get_or_create_user(f"r{i}", f"Игрок номер {i}") for i in range(players)]
+        room = await dbmod.create_room(users[0]["id"])
+        for u in users[1:]:
+            await dbmod.join_room(room["code"], u["id"])
+        rd = await dbmod.set_question(room["id"], "Какое ваше самое странное хобби?")
+        for i, u in enumerate(users):
+            await dbmod.submit_answer(rd["id"], u["id"], f"Собираю крышечки от бутылок, уже {i} штук")
+        # Half revealed, so author_display is filled for some rows
+        async with dbmod._connect(write=True) as db:
+            await db.execute("UPDATE answers SET revealed=1 WHERE round_id=? AND id % 2 = 0", (rd["id"],))
+            await db.commit()
+    finally:
+        await dbmod.close_pool()
+    return room["id"], rd["id"]
+
+def _dict_backed(record: type) -> type:
+    cls = make_dataclass(f"Dict{record.__name__}", [(f.name, f.type) for f in fields(record)])
+    cls.from_row = classmethod(lambda cls, cursor, row: cls(*row))
+    return cls
+
+def _as_dicts(conn: sqlite3.Connection, sql: str, key: int) -> list:
+    cur = conn.execute(sql, (key,))
+    return [dict(r) for r in cur.fetchall()]
+
+def _as_records(conn: sqlite3.Connection, record: type, sql: str, key: int) -> list:
+    cur = conn.execute(sql, (key,))
+    cur.row_factory = record.from_row
+    return cur.fetchall()
+
+def timed(fn, budget: float) -> float:
+    """Microseconds per call."""
+    timer = timeit.Timer(fn)
+    n, _ = timer.autorange()
+    n = max(1, int(n * budget / 0.2))
+    return min(timer.repeat(3, n)) / n * 1e6
+
+def memory(fn):
+    """(bytes still held by the result, peak bytes allocated while building it)."""
+    tracemalloc.start()
+    try:
+        result = fn()
+        held, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return held, peak
+
+def main(players, budget: float):
+    print(f"JSON backend: {serialization.BACKEND}")
+    print(f"  {'payload':<8} {'rows':>6} {'mapping':<9} {'fetch µs':>10} {'encode µs':>10} {'held KiB':>9} {'peak KiB':>9}")
+    for n in players:
+        with tempfile.TemporaryDirectory() as td:
+            path = os.path.join(td, "bench.db")
+            room_id, round_id = asyncio.run(build(path, n))
+            rows_conn = sqlite3.connect(path)
+            rows_conn.row_factory = sqlite3.Row
+            tuple_conn = sqlite3.connect(path)
+            dict_player, dict_answer = _dict_backed(Player), _dict_backed(Answer)
+            cases = [
+                ("players", "row→dict", lambda: _as_dicts(rows_conn, _OLD_PLAYERS, room_id)),
+                ("players", "records", lambda: _as_records(tuple_conn, Player, dbmod._PLAYERS_SQL, room_id)),
+                ("players", "dict-dc", lambda: _as_records(tuple_conn, dict_player, dbmod._PLAYERS_SQL, room_id)),
+                ("answers", "row→dict", lambda: _as_dicts(rows_conn, _OLD_ANSWERS, round_id)),
+                ("answers", "records", lambda: _as_records(tuple_conn, Answer, dbmod._ANSWERS_SQL, round_id)),
+                ("answers", "dict-dc", lambda: _as_records(tuple_conn, dict_answer, dbmod._ANSWERS_SQL, round_id)),
+            ]
+            try:
+                for payload, mapping, fetch in cases:
+                    rows = fetch()
+                    fetch_us = timed(fetch, budget)
+                    encode_us = timed(lambda: serialization.dumps(rows), budget)
+                    held, peak = memory(fetch)
+                    print(f"  {payload:<8} {len(rows):6d} {mapping:<9} {fetch_us:10.1f} {encode_us:10.1f} "
+                          f"{held / 1024:9.1f} {peak / 1024:9.1f}")
+            finally:
+                rows_conn.close()
+                tuple_conn.close()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--players", default="100,1000,5000")
+    ap.add_argument("--budget", type=float, default=0.2, help="seconds per measurement")
+    args = ap.parse_args()
+    main([int(x) for x in args.players.split(",")], args.budget)
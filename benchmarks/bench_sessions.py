@@ -0,0 +1,310 @@
+"""
+Load generator: full game sessions against the API.
+
+Every simulated room goes through the real flow: players register
+(POST /users), the owner creates the room, the others join, every tab loads
+the snapshot and keeps a WebSocket listener open, the owner sets a question,
+all players answer at once, the round is closed and `--reveals` answers are
+revealed. Up to `--concurrency` rooms run at the same time.
+
+Targets:
+- default: run_api.app in-process through httpx's ASGI transport, with its real
+  lifespan (pool, batcher or room engine, caches) on a temporary database.
+  The ASGI transport has no WebSockets, so listeners are attached to
+  app.state.ws_manager directly;
+- --uvicorn: the same app served by a local uvicorn on --port and driven over
+  TCP (needs uvicorn, and the `websockets` package for listeners);
+- --url: an already running server (no lock statistics).
+
+Reports p50/p95/p99 latency and errors per endpoint, requests/sec, WS frames
+delivered and, in-process, how often and how long writers waited for the
+SQLite write lock (database/pool.py). --save writes the results as JSON;
+--compare checks them against an earlier file and exits with status 1 when an
+endpoint's p95 or the throughput is worse by more than --tolerance.
+
+    python -m benchmarks.bench_sessions --rooms 1000 --players 6 --save base.json
+    python -m benchmarks.bench_sessions --rooms 1000 --players 6 --compare base.json
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from database import db as dbmod
+
+class SessionFailed(Exception):
+    pass
+
+class Stats:
+    def __init__(self):
+        self.latency: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+        self.sessions = 0
+        self.failed = 0
+        self.frames = 0
+
+    async def call(self, http: httpx.AsyncClient, method: str, path: str, label: str, **kwargs) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        try:
+            r = await http.request(method, path, **kwargs)
+        except httpx.HTTPError as e:
+            self.errors[label] += 1
+            raise SessionFailed(f"{label}: {e!r}") from e
+        self.latency[label].append(time.perf_counter() - t0)
+        if r.status_code >= 400:
+            self.errors[label] += 1
+            raise SessionFailed(f"{label}: {r.status_code} {r.text[:200]}")
+        return r.json()
+
+def _pct(sorted_values: List[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))] if sorted_values else 0.0
+
+class Listener:
+    """In-process stand-in for a browser tab's WebSocket."""
+
+    def __init__(self, stats: Stats):
+        self.stats = stats
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        self.stats.frames += 1
+
+    async def close(self, code: int = 1000):
+        pass
+
+class Target:
+    def __init__(self, http: httpx.AsyncClient, stats: Stats, mgr=None, ws_url: Optional[str] = None):
+        self.http = http
+        self.stats = stats
+        self.mgr = mgr
+        self.ws_url = ws_url
+
+    async def listen(self, room_id: int):
+        if self.mgr is not None:
+            ws = Listener(self.stats)
+            await self.mgr.connect(room_id, ws)
+            return ws
+        if self.ws_url is not None:
+            return asyncio.create_task(self._tcp_listener(room_id))
+        return None
+
+    async def _tcp_listener(self, room_id: int):
+        import websockets
+        async with websockets.connect(f"{self.ws_url}/ws/rooms/{room_id}") as conn:
+            async for _ in conn:
+                self.stats.frames += 1
+
+    async def unlisten(self, room_id: int, handle) -> None:
+        if handle is None:
+            return
+        if self.mgr is not None:
+            await self.mgr.disconnect(room_id, handle)
+        else:
+            handle.cancel()
+            await asyncio.gather(handle, return_exceptions=True)
+
+async def session(t: Target, run_id: str, n: int, players: int, reveals: int) -> None:
+    call, http = t.stats.call, t.http
+    tg = [f"lg{run_id}-{n}-{p}" for p in range(players)]
+    users = await asyncio.gather(*(call(http, "POST", "/users", "POST /users", json={"tg_user_id": tg[p], "name": f"Player {p}"})
+                                   for p in range(players)))
+    uids = [u["user_id"] for u in users]
+    room = await call(http, "POST", "/rooms", "POST /rooms", json={"room_code": "", "tg_user_id": tg[0], "name": "Player 0"})
+    room_id = room["room_id"]
+    await asyncio.gather(*(call(http, "POST", "/rooms/join", "POST /rooms/join",
+                                json={"room_code": room["room_code"], "tg_user_id": tg[p], "name": f"Player {p}"})
+                           for p in range(1, players)))
+    handles = [await t.listen(room_id) for _ in range(players)]
+    try:
+        await asyncio.gather(*(call(http, "GET", f"/rooms/{room_id}/snapshot", "GET /rooms/{id}/snapshot") for _ in range(players)))
+        rd = await call(http, "POST", f"/rooms/{room_id}/question", "POST /rooms/{id}/question", json={"text": "Who said that?"})
+        answers = await asyncio.gather(*(call(http, "POST", f"/rooms/{room_id}/answers", "POST /rooms/{id}/answers",
+                                              json={"round_id": rd["round_id"], "text": f"answer {p}", "author_id": uids[p]})
+                                         for p in range(players)))
+        await call(http, "POST", f"/rooms/{room_id}/round/close", "POST /rooms/{id}/round/close")
+        for k in range(min(reveals, players - 1)):
+            # Player k+1 spends a super card on player k's answer
+            await call(http, "POST", f"/rooms/{room_id}/reveal", "POST /rooms/{id}/reveal",
+                       json={"round_id": rd["round_id"], "answer_id": answers[k]["answer_id"], "actor_id": uids[k + 1]})
+    finally:
+        for h in handles:
+            await t.unlisten(room_id, h)
+
+async def drive(t: Target, args) -> float:
+    run_id = uuid.uuid4().hex[:8]
+    sem = asyncio.Semaphore(args.concurrency)
+
+    async def one(n: int):
+        async with sem:
+            try:
+                await session(t, run_id, n, args.players, args.reveals)
+                t.stats.sessions += 1
+            except SessionFailed as e:
+                t.stats.failed += 1
+                if t.stats.failed <= 3:
+                    print(f"  session {n} failed: {e}", file=sys.stderr)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(n) for n in range(args.rooms)))
+    if t.mgr is not None:
+        await t.mgr.drained()
+    return time.perf_counter() - t0
+
+def _lock_stats() -> Dict[str, Any]:
+    pool = dbmod._pool
+    if pool is None:
+        return {}
+    return {"lock_waits": pool.write_waits, "lock_wait_ms": round(pool.write_wait_time * 1000, 1)}
+
+async def run_inprocess(args, stats: Stats) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as td:
+        path = os.path.join(td, "load.db")
+        # Before run_api reads the config, so an sqlite event bus uses the temporary file too
+        os.environ["DB_PATH"] = path
+        import run_api
+        dbmod.set_db_path(path)
+        app = run_api.app
+        if args.uvicorn:
+            return await _serve_uvicorn(app, args, stats)
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://loadgen", timeout=60) as http:
+                t = Target(http, stats, mgr=app.state.ws_manager if args.listeners else None)
+                seconds = await drive(t, args)
+            return {"seconds": seconds, **_lock_stats()}
+
+async def _serve_uvicorn(app, args, stats: Stats) -> Dict[str, Any]:
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("--uvicorn требует пакет uvicorn (pip install uvicorn)")
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            raise SystemExit(f"uvicorn не запустился на порту {args.port}")
+        await asyncio.sleep(0.05)
+    try:
+        result = await run_http(f"http://127.0.0.1:{args.port}", args, stats)
+        return {**result, **_lock_stats()}
+    finally:
+        server.should_exit = True
+        await task
+
+async def run_http(url: str, args, stats: Stats) -> Dict[str, Any]:
+    ws_url = None
+    if args.listeners:
+        try:
+            import websockets  # noqa: F401
+            ws_url = "ws" + url[len("http"):]
+        except ImportError:
+            print("  (no `websockets` package: running without WS listeners)", file=sys.stderr)
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as http:
+        seconds = await drive(Target(http, stats, ws_url=ws_url), args)
+    return {"seconds": seconds}
+
+def _commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+        return out.stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+def summarize(args, stats: Stats, run: Dict[str, Any]) -> Dict[str, Any]:
+    endpoints = {}
+    for label, values in sorted(stats.latency.items()):
+        values.sort()
+        endpoints[label] = {
+            "count": len(values), "errors": stats.errors[label],
+            "p50_ms": round(_pct(values, 0.50) * 1000, 2),
+            "p95_ms": round(_pct(values, 0.95) * 1000, 2),
+            "p99_ms": round(_pct(values, 0.99) * 1000, 2),
+        }
+    requests = sum(len(v) for v in stats.latency.values()) + sum(stats.errors.values())
+    return {
+        "meta": {
+            "commit": _commit(), "timestamp": int(time.time()),
+            "target": args.url or ("uvicorn" if args.uvicorn else "asgi"),
+            "rooms": args.rooms, "players": args.players, "reveals": args.reveals,
+            "concurrency": args.concurrency, "listeners": args.listeners,
+        },
+        "endpoints": endpoints,
+        "requests": requests,
+        "seconds": round(run["seconds"], 3),
+        "rps": round(requests / run["seconds"], 1) if run["seconds"] else 0.0,
+        "sessions": stats.sessions,
+        "sessions_failed": stats.failed,
+        "ws_frames": stats.frames,
+        **{k: v for k, v in run.items() if k != "seconds"},
+    }
+
+def report(res: Dict[str, Any]) -> None:
+    m = res["meta"]
+    print(f"{m['rooms']} rooms x {m['players']} players, {m['reveals']} reveals, "
+          f"concurrency {m['concurrency']}, target {m['target']}")
+    print(f"  {'endpoint':<32} {'count':>7} {'err':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for label, e in res["endpoints"].items():
+        print(f"  {label:<32} {e['count']:7d} {e['errors']:5d} {e['p50_ms']:8.2f} {e['p95_ms']:8.2f} {e['p99_ms']:8.2f}")
+    print(f"  {res['requests']} requests in {res['seconds']:.2f} s = {res['rps']:.0f} req/s; "
+          f"sessions ok {res['sessions']}, failed {res['sessions_failed']}; WS frames {res['ws_frames']}")
+    if "lock_waits" in res:
+        print(f"  write-lock waits: {res['lock_waits']} ({res['lock_wait_ms']:.0f} ms total)")
+
+def compare(res: Dict[str, Any], base: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions of `res` against `base`, as printable lines."""
+    worse = []
+    for label, e in res["endpoints"].items():
+        old = base.get("endpoints", {}).get(label)
+        if old and old["p95_ms"] > 0 and e["p95_ms"] > old["p95_ms"] * (1 + tolerance):
+            worse.append(f"{label}: p95 {old['p95_ms']:.2f} -> {e['p95_ms']:.2f} ms")
+    if base.get("rps") and res["rps"] < base["rps"] * (1 - tolerance):
+        worse.append(f"throughput: {base['rps']:.0f} -> {res['rps']:.0f} req/s")
+    if res["sessions_failed"] > base.get("sessions_failed", 0):
+        worse.append(f"failed sessions: {base.get('sessions_failed', 0)} -> {res['sessions_failed']}")
+    return worse
+
+async def main(args) -> int:
+    stats = Stats()
+    run = await run_http(args.url, args, stats) if args.url else await run_inprocess(args, stats)
+    res = summarize(args, stats, run)
+    report(res)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(res, f, indent=2, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            base = json.load(f)
+        worse = compare(res, base, args.tolerance)
+        print(f"  vs {args.compare} ({base['meta'].get('commit') or '?'}): " + ("no regressions" if not worse else "REGRESSIONS"))
+        for line in worse:
+            print(f"    {line}")
+        return 1 if worse else 0
+    return 0
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rooms", type=int, default=200)
+    ap.add_argument("--players", type=int, default=6)
+    ap.add_argument("--reveals", type=int, default=2)
+    ap.add_argument("--concurrency", type=int, default=200, help="rooms in flight at once")
+    ap.add_argument("--no-listeners", dest="listeners", action="store_false")
+    ap.add_argument("--url", default="", help="drive a running server instead of the in-process app")
+    ap.add_argument("--uvicorn", action="store_true", help="serve the app with a local uvicorn and drive it over TCP")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--save", default="", help="write results as JSON")
+    ap.add_argument("--compare", default="", help="JSON from an earlier run to check for regressions")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown for --compare")
+    sys.exit(asyncio.run(main(ap.parse_args())))
@@ -0,0 +1,120 @@
+"""
+Replay Telegram updates through the bot's dispatcher without Telegram.
+
+Updates are either generated (each chat runs /start -> "join room" button ->
+room code, which exercises FSM state and the database) or read from a JSON
+Lines file of recorded Update objects. Bot API calls go to a null session
+that only sleeps for --latency-ms, standing in for the network round trip.
+
+    python -m benchmarks.bench_updates --chats 200 --concurrency 1 16 64
+    python -m benchmarks.bench_updates --updates recorded.jsonl --concurrency 16
+    python -m benchmarks.bench_updates --fsm sqlite --latency-ms 0
+    python -m benchmarks.bench_updates --chats 5 --save sample.jsonl
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.types import Update
+
+from bot.fsm_storage import SQLiteStorage
+from bot.pipeline import UpdatePipeline
+from bot.services import LocalGameService
+from database import db as dbmod
+from run_bot import build_dispatcher
+
+class NullSession(BaseSession):
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+        self.calls = 0
+
+    async def make_request(self, bot, method, timeout=None):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return True
+
+    async def stream_content(self, *args, **kwargs):
+        if False:
+            yield b""
+
+    async def close(self):
+        pass
+
+def synthetic(chats: int) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    for c in range(chats):
+        chat = {"id": 10_000 + c, "type": "private"}
+        user = {"id": 10_000 + c, "is_bot": False, "first_name": f"P{c}"}
+        msg = {"date": 0, "chat": chat, "from": user}
+        out.append({"update_id": len(out) + 1, "message": {**msg, "message_id": 1, "text": "/start",
+                    "entities": [{"type": "bot_command", "offset": 0, "length": 6}]}})
+        out.append({"update_id": len(out) + 1, "callback_query": {
+            "id": str(len(out)), "from": user, "chat_instance": str(c), "data": "join_room",
+            "message": {**msg, "message_id": 2, "from": {"id": 1, "is_bot": True, "first_name": "Bot"}, "text": "menu"}}})
+        out.append({"update_id": len(out) + 1, "message": {**msg, "message_id": 3, "text": "ZZZZZZ"}})
+    # Interleave chats the way a real stream would arrive
+    return sorted(out, key=lambda u: (u.get("message", {}).get("message_id") or 2, u["update_id"]))
+
+async def replay(dp, raw: List[Dict[str, Any]], concurrency: int, latency: float) -> None:
+    session = NullSession(latency)
+    bot = Bot("42:BENCHMARK", session=session)
+    pipeline = UpdatePipeline(dp, bot, concurrency=concurrency, max_pending=len(raw) + 1)
+    updates = [Update.model_validate(u, context={"bot": bot}) for u in raw]
+    t0 = time.perf_counter()
+    for update in updates:
+        await pipeline.submit(update)
+    await pipeline.drain()
+    dt = time.perf_counter() - t0
+    print(f"  concurrency={concurrency:<4} {len(updates) / dt:9.0f} updates/s  "
+          f"({pipeline.handled} ok, {pipeline.failed} failed, {session.calls} API calls)")
+
+async def main(args):
+    if args.updates:
+        with open(args.updates, encoding="utf-8") as f:
+            raw = [json.loads(line) for line in f if line.strip()]
+    else:
+        raw = synthetic(args.chats)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(u, ensure_ascii=False) + "\n" for u in raw)
+        print(f"wrote {len(raw)} updates to {args.save}")
+        return
+    with tempfile.TemporaryDirectory() as td:
+        dbmod.set_db_path(os.path.join(td, "bench.db"))
+        await dbmod.ensure_initialized()
+        await dbmod.open_pool(4, "wal")
+        try:
+            print(f"{len(raw)} updates, {args.latency_ms} ms per Bot API call")
+            # Routers are module-level singletons: one dispatcher for all runs
+            storage = SQLiteStorage(os.path.join(td, "bench.db")) if args.fsm == "sqlite" else None
+            dp = build_dispatcher(LocalGameService(), storage)
+            try:
+                for c in args.concurrency:
+                    await replay(dp, raw, c, args.latency_ms / 1000)
+            finally:
+                await dp.storage.close()
+        finally:
+            await dbmod.close_pool()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chats", type=int, default=200)
+    ap.add_argument("--updates", help="JSON Lines file of recorded Update objects")
+    ap.add_argument("--save", help="write the generated updates to this file and exit")
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    ap.add_argument("--latency-ms", type=float, default=20.0)
+    ap.add_argument("--fsm", choices=("memory", "sqlite"), default="memory")
+    args = ap.parse_args()
+    # One INFO line per update would dominate the measurement
+    logging.getLogger("aiogram.event").setLevel(logging.WARNING)
+    asyncio.run(main(args))
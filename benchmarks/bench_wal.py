@@ -0,0 +1,76 @@
+"""
+Answer writers vs. room-state readers under the "default" and "wal" storage profiles.
+
+    python -m benchmarks.bench_wal --rooms 20 --players 50 --readers 8
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import List
+
+from database import db as dbmod
+
+def _pct(samples: List[float], p: float) -> float:
+    s = sorted(samples)
+    return s[min(len(s) - 1, int(len(s) * p))] * 1000 if s else 0.0
+
+async def _seed(rooms: int, players: int):
+    setup = []
+    for r in range(rooms):
+        users = [await dbmod.get_or_create_user(f"w{r}-{i}", f"P{i}") for i in range(players)]
+        room = await dbmod.create_room(users[0]["id"])
+        for u in users[1:]:
+            await dbmod.join_room(room["code"], u["id"])
+        rd = await dbmod.set_question(room["id"], "Bench?")
+        setup.append((room, rd, users))
+    return setup
+
+async def _run(profile: str, rooms: int, players: int, readers: int, pool_size: int):
+    with tempfile.TemporaryDirectory() as td:
+        dbmod.set_db_path(os.path.join(td, "bench.db"))
+        await dbmod.ensure_initialized()
+        await dbmod.open_pool(pool_size, profile)
+        try:
+            setup = await _seed(rooms, players)
+            write_lat: List[float] = []
+            read_lat: List[float] = []
+            done = asyncio.Event()
+
+            async def writer(room, rd, users):
+                for u in users:
+                    t = time.perf_counter()
+                    await dbmod.submit_answer(rd["id"], u["id"], f"answer {u['id']}")
+                    write_lat.append(time.perf_counter() - t)
+
+            async def reader(i: int):
+                room = setup[i % len(setup)][0]
+                while not done.is_set():
+                    t = time.perf_counter()
+                    await dbmod.get_room_state(room["id"])
+                    read_lat.append(time.perf_counter() - t)
+
+            t0 = time.perf_counter()
+            read_tasks = [asyncio.create_task(reader(i)) for i in range(readers)]
+            await asyncio.gather(*(writer(*s) for s in setup))
+            done.set()
+            await asyncio.gather(*read_tasks)
+            elapsed = time.perf_counter() - t0
+        finally:
+            await dbmod.close_pool()
+    print(f"{profile:>8}: writes {len(write_lat) / elapsed:7.0f}/s p99 {_pct(write_lat, .99):6.1f} ms | "
+          f"reads {len(read_lat) / elapsed:7.0f}/s p99 {_pct(read_lat, .99):6.1f} ms")
+
+async def main(args):
+    for profile in ("default", "wal"):
+        await _run(profile, args.rooms, args.players, args.readers, args.pool_size)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rooms", type=int, default=20)
+    ap.add_argument("--players", type=int, default=50)
+    ap.add_argument("--readers", type=int, default=8)
+    ap.add_argument("--pool-size", type=int, default=4)
+    asyncio.run(main(ap.parse_args()))
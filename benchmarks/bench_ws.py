@@ -0,0 +1,69 @@
+"""
+Broadcast latency for one room with N sockets, a few of which are slow.
+
+Uses in-process fake sockets, so it measures WSManager itself rather than the
+network. "enqueue" is what the HTTP handler pays; "delivered" is the time until
+every fast socket has the frame. A slow socket costs at most the send timeout
+once before it is evicted, and never delays the others.
+
+    python -m benchmarks.bench_ws --sockets 50,100,500 --slow 3
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import time
+
+from api.ws import WSManager
+
+class FakeSocket:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.received = 0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        await asyncio.sleep(self.delay)
+        self.received += 1
+
+    async def send_json(self, message):
+        await self.send_text(message)
+
+    async def close(self, code: int = 1000):
+        pass
+
+async def _bench(n: int, slow: int, delay: float, timeout: float, rounds: int):
+    mgr = WSManager(send_timeout=timeout)
+    sockets = [FakeSocket(delay if i < slow else 0.001) for i in range(n)]
+    for ws in sockets:
+        await mgr.connect(1, ws)
+    msg = {"type": "answer_added", "payload": {"answer_id": 1, "text": "x" * 80}}
+    enqueue, delivered = [], []
+    for i in range(rounds):
+        t = time.perf_counter()
+        await mgr.broadcast(1, msg)
+        enqueue.append((time.perf_counter() - t) * 1000)
+        fast = [ws for ws in sockets[slow:]]
+        while any(ws.received <= i for ws in fast):
+            await asyncio.sleep(0)
+        delivered.append((time.perf_counter() - t) * 1000)
+    await asyncio.sleep(timeout)  # let the slow sockets hit their send timeout
+    enqueue.sort()
+    delivered.sort()
+    print(f"{n:5d} sockets, {slow} slow: enqueue p50 {enqueue[len(enqueue) // 2]:6.2f} ms  "
+          f"delivered p50 {delivered[len(delivered) // 2]:6.1f} ms  max {delivered[-1]:6.1f} ms  evicted {mgr.evicted}")
+    await mgr.close()
+
+async def main(args):
+    for n in (int(x) for x in args.sockets.split(",")):
+        await _bench(n, args.slow, args.slow_delay, args.timeout, args.rounds)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sockets", default="50,100,500")
+    ap.add_argument("--slow", type=int, default=3)
+    ap.add_argument("--slow-delay", type=float, default=1.0)
+    ap.add_argument("--timeout", type=float, default=0.25)
+    ap.add_argument("--rounds", type=int, default=20)
+    asyncio.run(main(ap.parse_args()))
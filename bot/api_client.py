@@ -0,0 +1,82 @@
+from __future__ import annotations
+"""
+Bot-wide HTTP client for the game API.
+
+One instance is created in run_bot.main() and handed to handlers through the
+dispatcher as their GameService (`game`), so every bot interaction reuses pooled
+keep-alive connections (HTTP/2 when the optional `h2` package is installed)
+instead of opening a fresh client per update.
+"""
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+import httpx
+
+from bot.services import GameError
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
+class ApiError(GameError):
+    """The API rejected the request; `detail` is its user-facing message."""
+
+# Safe to retry only when the request never reached the server
+_NOT_SENT = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+_RETRY_STATUS = {502, 503, 504}
+
+class ApiClient:
+    def __init__(self, base_url: str, timeout: float = 5.0, retries: int = 3, backoff: float = 0.2,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.retries = retries
+        self.backoff = backoff
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            http2=_HTTP2 and transport is None,
+            timeout=httpx.Timeout(timeout, connect=min(timeout, 3.0)),
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=60),
+            transport=transport,
+        )
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+    async def _post(self, path: str, payload: Dict[str, Any], idempotent: bool) -> Dict[str, Any]:
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            try:
+                r = await self._client.post(path, json=payload)
+            except _NOT_SENT:
+                if last:
+                    raise
+            except httpx.TransportError:
+                if last or not idempotent:
+                    raise
+            else:
+                if r.status_code in _RETRY_STATUS and idempotent and not last:
+                    pass
+                elif r.status_code >= 400:
+                    try:
+                        detail = r.json().get("detail")
+                    except ValueError:
+                        detail = None
+                    raise ApiError(detail or f"HTTP {r.status_code}", r.status_code)
+                else:
+                    return r.json()
+            delay = self.backoff * (2 ** attempt)
+            logger.warning("API %s failed, retry %d in %.1fs", path, attempt + 1, delay)
+            await asyncio.sleep(delay)
+        raise AssertionError("unreachable")
+
+    # The API upserts the user as part of these calls, so one round trip suffices
+
+    async def create_room(self, tg_user_id: str, name: str) -> Dict[str, Any]:
+        return await self._post("/rooms", {"room_code": "", "tg_user_id": tg_user_id, "name": name}, idempotent=False)
+
+    async def join_room(self, room_code: str, tg_user_id: str, name: str) -> Dict[str, Any]:
+        return await self._post("/rooms/join", {"room_code": room_code, "tg_user_id": tg_user_id, "name": name}, idempotent=True)
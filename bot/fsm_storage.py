@@ -0,0 +1,192 @@
+from __future__ import annotations
+"""
+aiogram FSM storage on the project's SQLite database (table fsm_states).
+
+State survives bot restarts and is shared by every bot process on the host.
+Reads are served from an in-memory cache for `cache_ttl` seconds; writes land
+in the cache immediately and are flushed to SQLite in one transaction every
+`flush_interval` seconds (0 writes through). States untouched for `state_ttl`
+seconds are treated as gone and pruned.
+
+With several bot replicas, keep cache_ttl short (or route a chat to the same
+replica) so one replica does not act on another's stale cached state.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import aiosqlite
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+from database import db as dbmod
+from database.pool import DEFAULT_PRAGMAS, apply_pragmas
+
+logger = logging.getLogger(__name__)
+
+def _key(key: StorageKey) -> str:
+    return ":".join(str(p) if p is not None else "" for p in (
+        key.bot_id, key.chat_id, key.user_id, key.thread_id, key.business_connection_id, key.destiny))
+
+class SQLiteStorage(BaseStorage):
+    def __init__(self, path: str, flush_interval: float = 0.05, cache_ttl: float = 2.0,
+                 state_ttl: float = 24 * 3600, max_cached: int = 10_000, prune_interval: float = 600.0,
+                 pragmas: Optional[Dict[str, object]] = None):
+        self.path = path
+        # The storage profile the API uses (DB_PROFILE); other processes share the file,
+        # so writes always wait for its lock
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self.pragmas.setdefault("busy_timeout", 5000)
+        self.flush_interval = flush_interval
+        self.cache_ttl = cache_ttl
+        self.state_ttl = state_ttl
+        self.max_cached = max_cached
+        self.prune_interval = prune_interval
+        # key -> [state, data, cached_at]
+        self._cache: "OrderedDict[str, List[Any]]" = OrderedDict()
+        # key -> (state, data, updated_at) waiting for the next flush
+        self._dirty: Dict[str, Tuple[Optional[str], Dict[str, Any], float]] = {}
+        self._flushing: Dict[str, Tuple[Optional[str], Dict[str, Any], float]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._db: Optional[aiosqlite.Connection] = None
+        self._open_lock = asyncio.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+
+    async def _conn(self) -> aiosqlite.Connection:
+        if self._db is None:
+            async with self._open_lock:
+                if self._db is None:
+                    # Same schema setup as the API, auto_vacuum included
+                    await dbmod.ensure_initialized(self.path)
+                    db = await aiosqlite.connect(self.path, isolation_level=None)
+                    await apply_pragmas(db, self.pragmas)
+                    self._db = db
+                    if self.flush_interval > 0:
+                        self._flusher = asyncio.create_task(self._flush_loop())
+        return self._db
+
+    async def _entry(self, key: str) -> List[Any]:
+        now = time.time()
+        entry = self._cache.get(key)
+        if entry is not None and (self._pending(key) or now - entry[2] < self.cache_ttl):
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return entry
+        self.misses += 1
+        db = await self._conn()
+        cur = await db.execute("SELECT state, data, updated_at FROM fsm_states WHERE key=?", (key,))
+        row = await cur.fetchone()
+        # A write may have landed in the cache while we were reading
+        if self._pending(key):
+            return self._cache[key]
+        if row is None or row[2] < now - self.state_ttl:
+            entry = [None, {}, now]
+        else:
+            entry = [row[0], json.loads(row[1]), now]
+        self._remember(key, entry)
+        return entry
+
+    def _pending(self, key: str) -> bool:
+        """The cache holds changes SQLite does not have yet."""
+        return key in self._dirty or key in self._flushing
+
+    def _remember(self, key: str, entry: List[Any]) -> None:
+        self._cache[key] = entry
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_cached:
+            old = next(iter(self._cache))
+            if self._pending(old):
+                break
+            del self._cache[old]
+
+    async def _write(self, key: str, entry: List[Any]) -> None:
+        now = time.time()
+        entry[2] = now
+        self._remember(key, entry)
+        self._dirty[key] = (entry[0], dict(entry[1]), now)
+        if self.flush_interval <= 0:
+            await self.flush()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        k = _key(key)
+        entry = await self._entry(k)
+        entry[0] = state.state if isinstance(state, State) else state
+        await self._write(k, entry)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._entry(_key(key)))[0]
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        k = _key(key)
+        entry = await self._entry(k)
+        entry[1] = dict(data)
+        await self._write(k, entry)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return dict((await self._entry(_key(key)))[1])
+
+    async def flush(self) -> None:
+        """Write every pending change in one transaction."""
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            batch, self._dirty = self._dirty, {}
+            self._flushing = batch
+            upserts = [(k, s, json.dumps(d, ensure_ascii=False), ts) for k, (s, d, ts) in batch.items() if s is not None or d]
+            deletes = [(k,) for k, (s, d, _) in batch.items() if s is None and not d]
+            db = await self._conn()
+            try:
+                await db.execute("BEGIN")
+                if upserts:
+                    await db.executemany("""
+                        INSERT INTO fsm_states (key, state, data, updated_at) VALUES (?,?,?,?)
+                        ON CONFLICT(key) DO UPDATE SET state=excluded.state, data=excluded.data, updated_at=excluded.updated_at
+                    """, upserts)
+                if deletes:
+                    await db.executemany("DELETE FROM fsm_states WHERE key=?", deletes)
+                await db.execute("COMMIT")
+            except BaseException:
+                if db.in_transaction:
+                    await db.execute("ROLLBACK")
+                # Keep anything newer that arrived meanwhile
+                self._dirty = {**batch, **self._dirty}
+                raise
+            finally:
+                self._flushing = {}
+
+    async def prune(self) -> int:
+        db = await self._conn()
+        cur = await db.execute("DELETE FROM fsm_states WHERE updated_at < ?", (time.time() - self.state_ttl,))
+        return cur.rowcount
+
+    async def _flush_loop(self) -> None:
+        last_prune = time.monotonic()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                if time.monotonic() - last_prune >= self.prune_interval:
+                    last_prune = time.monotonic()
+                    await self.prune()
+            except Exception:
+                logger.exception("FSM storage flush failed")
+
+    async def close(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        if self._db is not None:
+            try:
+                await self.flush()
+            finally:
+                await self._db.close()
+                self._db = None
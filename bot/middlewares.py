@@ -1,11 +1,17 @@
 from __future__ import annotations
 import logging
+import time
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject
 from typing import Callable, Dict, Any, Awaitable
 
+import metrics
+
 logger = logging.getLogger(__name__)
 
+_UPDATES = metrics.histogram("bot_update_seconds", "Bot update handling time by update type", ("type",))
+_UPDATE_ERRORS = metrics.counter("bot_update_errors", "Bot updates whose handler raised", ("type",))
+
 class RedactingLoggingMiddleware(BaseMiddleware):
     """Log updates without leaking secrets."""
     async def __call__(self,
@@ -17,3 +23,26 @@ class RedactingLoggingMiddleware(BaseMiddleware):
         except Exception:
             pass
         return await handler(event, data)
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Time every update through its handlers (bot_update_seconds in /metrics)."""
+    def __init__(self):
+        # update type -> (histogram, error counter)
+        self._children: Dict[str, Any] = {}
+
+    async def __call__(self,
+                       handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+                       event: TelegramObject,
+                       data: Dict[str, Any]) -> Any:
+        kind = getattr(event, "event_type", None) or type(event).__name__
+        children = self._children.get(kind)
+        if children is None:
+            children = self._children[kind] = (_UPDATES.labels(kind), _UPDATE_ERRORS.labels(kind))
+        t0 = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            children[1].inc()
+            raise
+        finally:
+            children[0].observe(time.perf_counter() - t0)
@@ -0,0 +1,96 @@
+from __future__ import annotations
+"""
+Concurrent update processing for webhook mode.
+
+Updates from different chats are handled in parallel (at most `concurrency`
+at once), while updates from the same chat run strictly in arrival order, so
+a user's FSM flow (e.g. JoinStates) never sees its own messages reordered.
+`submit()` returns as soon as the update is queued, which lets the webhook
+answer Telegram immediately; it only waits when `max_pending` updates are
+already in flight.
+"""
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Hashable, Optional, Set
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+logger = logging.getLogger(__name__)
+
+def chat_key(update: Update) -> Optional[Hashable]:
+    """Ordering key: the chat the update belongs to, else its sender; None runs unordered."""
+    event = update.event
+    chat = getattr(event, "chat", None) or getattr(getattr(event, "message", None), "chat", None)
+    if chat is not None:
+        return chat.id
+    user = getattr(event, "from_user", None)
+    return ("user", user.id) if user is not None else None
+
+class UpdatePipeline:
+    def __init__(self, dp: Dispatcher, bot: Bot, concurrency: int = 16, max_pending: int = 1000,
+                 **kwargs: Any):
+        self.dp = dp
+        self.bot = bot
+        self.kwargs = kwargs
+        self._slots = asyncio.Semaphore(max(1, concurrency))
+        self._pending = asyncio.Semaphore(max(1, max_pending))
+        # One lane (FIFO + its runner task) per chat with queued updates
+        self._lanes: Dict[Hashable, Deque[Update]] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self.handled = 0
+        self.failed = 0
+
+    async def submit(self, update: Update) -> None:
+        await self._pending.acquire()
+        self._idle.clear()
+        key = chat_key(update)
+        if key is not None and key in self._lanes:
+            self._lanes[key].append(update)
+            return
+        lane: Deque[Update] = deque([update])
+        if key is not None:
+            self._lanes[key] = lane
+        task = asyncio.create_task(self._run(key, lane))
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+
+    def _done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not self._tasks:
+            self._idle.set()
+
+    async def _run(self, key: Optional[Hashable], lane: Deque[Update]) -> None:
+        try:
+            while lane:
+                update = lane[0]
+                try:
+                    async with self._slots:
+                        await self.dp.feed_update(self.bot, update, **self.kwargs)
+                    self.handled += 1
+                except Exception:
+                    self.failed += 1
+                    logger.exception("Update %s failed", update.update_id)
+                finally:
+                    lane.popleft()
+                    self._pending.release()
+        finally:
+            if key is not None and self._lanes.get(key) is lane:
+                del self._lanes[key]
+
+    async def drain(self) -> None:
+        """Wait until every submitted update has been handled."""
+        await self._idle.wait()
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """Let in-flight updates finish for up to `timeout` seconds, then cancel the rest."""
+        try:
+            await asyncio.wait_for(self.drain(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Dropping %d unfinished update lanes", len(self._tasks))
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
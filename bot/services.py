@@ -0,0 +1,65 @@
+from __future__ import annotations
+"""
+Game operations the bot needs, behind one interface with two backends.
+
+- ApiClient (bot/api_client.py) talks to the API over HTTP: used by
+  run_bot.py when the bot runs as its own process.
+- LocalGameService calls the database layer directly: used by run_all.py,
+  where the bot and the API share one process and event loop, so a bot
+  command costs a couple of SQLite queries instead of an HTTP round trip.
+
+Handlers receive the active backend as `game` and only rely on GameService.
+"""
+from typing import Any, Dict, Optional, Protocol
+
+from api import events
+from database import db as dbmod
+
+class GameError(Exception):
+    """The game rejected the request; `detail` is its user-facing message."""
+    def __init__(self, detail: str, status_code: int = 0):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+class GameService(Protocol):
+    async def create_room(self, tg_user_id: str, name: str) -> Dict[str, Any]: ...
+    async def join_room(self, room_code: str, tg_user_id: str, name: str) -> Dict[str, Any]: ...
+    async def close(self) -> None: ...
+
+class LocalGameService:
+    """
+    In-process backend. Given the FastAPI app it uses the same store (room
+    engine or db) and WS manager as the routes, so players in the mini-app
+    still see bot joins live. Returns the same payloads as the HTTP endpoints.
+    """
+
+    def __init__(self, app: Optional[Any] = None):
+        self.app = app
+
+    def _store(self):
+        state = getattr(self.app, "state", None)
+        return getattr(state, "room_engine", None) or dbmod
+
+    async def close(self) -> None:
+        pass
+
+    async def create_room(self, tg_user_id: str, name: str) -> Dict[str, Any]:
+        user = await dbmod.get_or_create_user(tg_user_id, name)
+        room = await dbmod.create_room(user["id"])
+        return {"room_id": room["id"], "room_code": room["code"]}
+
+    async def join_room(self, room_code: str, tg_user_id: str, name: str) -> Dict[str, Any]:
+        user = await dbmod.get_or_create_user(tg_user_id, name)
+        try:
+            result = await self._store().join_room(room_code, user["id"])
+        except ValueError as e:
+            raise GameError(str(e), 400) from None
+        ws = getattr(getattr(self.app, "state", None), "ws_manager", None)
+        if ws is not None:
+            await ws.broadcast(result["room"]["id"], events.player_joined(user["id"], user["name"]))
+        return {
+            "room_id": result["room"]["id"],
+            "player_id": result["player"]["player_id"],
+            "super_cards": result["player"]["super_cards"]
+        }
@@ -0,0 +1,48 @@
+from __future__ import annotations
+"""
+Telegram webhook endpoint for FastAPI.
+
+Telegram sends the secret given to setWebhook in X-Telegram-Bot-Api-Secret-Token;
+anything without it is rejected before the body is parsed. Accepted updates go
+to an UpdatePipeline and the request returns right away.
+"""
+import hmac
+import logging
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from fastapi import APIRouter, FastAPI, HTTPException, Request
+from starlette.routing import Mount
+
+from bot.pipeline import UpdatePipeline
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "x-telegram-bot-api-secret-token"
+
+def webhook_router(pipeline: UpdatePipeline, path: str, secret: str) -> APIRouter:
+    router = APIRouter()
+
+    @router.post(path, include_in_schema=False)
+    async def telegram_webhook(request: Request):
+        token = request.headers.get(SECRET_HEADER, "")
+        if not secret or not hmac.compare_digest(token.encode(), secret.encode()):
+            raise HTTPException(status_code=403, detail="forbidden")
+        update = Update.model_validate(await request.json(), context={"bot": pipeline.bot})
+        await pipeline.submit(update)
+        return {"ok": True}
+
+    return router
+
+def mount_webhook(app: FastAPI, pipeline: UpdatePipeline, path: str, secret: str) -> None:
+    """Add the webhook route ahead of the static-files mount on "/" (run_api.py)."""
+    app.include_router(webhook_router(pipeline, path, secret))
+    routes = app.router.routes
+    route = routes.pop()
+    first_mount = next((i for i, r in enumerate(routes) if isinstance(r, Mount)), len(routes))
+    routes.insert(first_mount, route)
+
+async def register_webhook(bot: Bot, dp: Dispatcher, base_url: str, path: str, secret: str) -> None:
+    url = base_url.rstrip("/") + path
+    await bot.set_webhook(url, secret_token=secret, allowed_updates=dp.resolve_used_update_types())
+    logger.info("Webhook set to %s", url)
@@ -16,6 +16,43 @@ class Config:
     WEBAPP_URL: str
     DEV_MODE: bool
     DB_PATH: str
+    DB_POOL_SIZE: int = 4
+    DB_PROFILE: str = "wal"  # storage profile, see database/pool.py STORAGE_PROFILES
+    DB_CHECKPOINT_INTERVAL: float = 30.0  # seconds, 0 disables periodic WAL checkpoints
+    ROOM_ENGINE: bool = False  # serve round actions from the in-memory RoomEngine (single API process only)
+    ROOM_ENGINE_FLUSH_MS: int = 50
+    WS_SEND_TIMEOUT: float = 2.0  # seconds; slower sockets are evicted
+    WS_QUEUE_SIZE: int = 64  # outbound frames buffered per socket
+    WS_OVERFLOW: str = "coalesce"  # drop_oldest / coalesce / disconnect
+    WS_HISTORY_SIZE: int = 256  # recent events kept per room for ?since= replay
+    EVENT_BUS: str = "memory"  # memory (single process) / sqlite (uvicorn --workers N)
+    API_WORKERS: int = 1
+    BOT_API_TIMEOUT: float = 5.0  # seconds per bot -> API request
+    BOT_API_RETRIES: int = 3
+    BOT_MODE: str = "polling"  # polling / webhook
+    WEBHOOK_URL: str = ""  # public base URL Telegram posts to; defaults to WEBAPP_URL
+    WEBHOOK_PATH: str = "/tg/webhook"
+    WEBHOOK_SECRET: str = ""  # X-Telegram-Bot-Api-Secret-Token; random per start when empty
+    WEBHOOK_PORT: int = 8081  # standalone run_bot.py webhook server; run_all.py uses the API port
+    BOT_CONCURRENCY: int = 16  # updates handled in parallel (one at a time per chat)
+    BOT_QUEUE_SIZE: int = 1000  # accepted but unfinished updates before the webhook waits
+    FSM_STORAGE: str = "sqlite"  # memory / sqlite (survives restarts, shared between bot processes)
+    FSM_FLUSH_MS: int = 50  # batch FSM writes this long; 0 writes through
+    FSM_CACHE_TTL: float = 2.0  # seconds a cached FSM state is trusted without re-reading
+    FSM_STATE_TTL: float = 86400.0  # seconds before an untouched FSM state expires
+    ROOM_IDLE_TTL: float = 21600.0  # seconds without activity before a room is closed
+    ROOM_ARCHIVE_AFTER: float = 3600.0  # seconds a closed room stays readable before archiving
+    ARCHIVE_DB_PATH: str = ""  # separate SQLite file for room_archive; empty keeps it in DB_PATH
+    LIFECYCLE_INTERVAL: float = 300.0  # seconds between lifecycle sweeps, 0 disables
+    ANSWER_BATCH_MS: float = 5.0  # group-commit window for answer submissions, 0 commits each one
+    CACHE_SIZE: int = 10000  # entries per user/room cache, 0 disables caching
+    CACHE_TTL: float = 60.0  # seconds; bounds staleness between API processes
+    METRICS_ENABLED: bool = True  # GET /metrics (Prometheus text) and request timing middleware
+    PROFILING: bool = False  # slow-query log, event-loop lag monitor, GET /admin/profile
+    SLOW_QUERY_MS: float = 100.0  # with PROFILING: log statements/commits slower than this
+    LOOP_LAG_MS: float = 100.0  # with PROFILING: warn when the event loop is blocked this long
+    ADMIN_TOKEN: str = ""  # X-Admin-Token for /admin/*; the endpoints stay closed when empty
+    ROOM_CODE_KEY: str = ""  # secret keying room codes (database/codes.py); required
 
 _cached: Config | None = None
 
@@ -41,6 +78,18 @@ def load_json_config() -> dict:
         data = json.load(f)
     return data
 
+def _opt(data: dict, key: str, default, cast=str):
+    """Optional setting: config.json first, then environment, then default."""
+    raw = data.get(key)
+    if raw is None:
+        raw = os.environ.get(key)
+    if raw is None or raw == "":
+        return default
+    return cast(raw)
+
+def _flag(raw) -> bool:
+    return raw if isinstance(raw, bool) else str(raw).lower() in {"1", "true", "yes"}
+
 def get_config() -> Config:
     global _cached
     if _cached:
@@ -54,5 +103,48 @@ def get_config() -> Config:
         raise RuntimeError("BOT_TOKEN не задан. Укажите корректный токен в config.json или переменной окружения.")
     if not url:
         raise RuntimeError("WEBAPP_URL не задан. Укажите адрес WebApp (например http://localhost:8000).")
-    _cached = Config(BOT_TOKEN=bot, WEBAPP_URL=url, DEV_MODE=bool(dev), DB_PATH=dbp)
+    room_code_key = _opt(data, "ROOM_CODE_KEY", "")
+    if not room_code_key:
+        raise RuntimeError("ROOM_CODE_KEY не задан. Укажите секретную строку в config.json или переменной окружения: "
+                           "без неё коды комнат предсказуемы по их номерам.")
+    _cached = Config(
+        BOT_TOKEN=bot, WEBAPP_URL=url, DEV_MODE=bool(dev), DB_PATH=dbp,
+        DB_POOL_SIZE=_opt(data, "DB_POOL_SIZE", 4, int),
+        DB_PROFILE=_opt(data, "DB_PROFILE", "wal"),
+        DB_CHECKPOINT_INTERVAL=_opt(data, "DB_CHECKPOINT_INTERVAL", 30.0, float),
+        ROOM_ENGINE=_opt(data, "ROOM_ENGINE", False, _flag),
+        ROOM_ENGINE_FLUSH_MS=_opt(data, "ROOM_ENGINE_FLUSH_MS", 50, int),
+        WS_SEND_TIMEOUT=_opt(data, "WS_SEND_TIMEOUT", 2.0, float),
+        WS_QUEUE_SIZE=_opt(data, "WS_QUEUE_SIZE", 64, int),
+        WS_OVERFLOW=_opt(data, "WS_OVERFLOW", "coalesce"),
+        WS_HISTORY_SIZE=_opt(data, "WS_HISTORY_SIZE", 256, int),
+        EVENT_BUS=_opt(data, "EVENT_BUS", "memory"),
+        API_WORKERS=_opt(data, "API_WORKERS", 1, int),
+        BOT_API_TIMEOUT=_opt(data, "BOT_API_TIMEOUT", 5.0, float),
+        BOT_API_RETRIES=_opt(data, "BOT_API_RETRIES", 3, int),
+        BOT_MODE=_opt(data, "BOT_MODE", "polling"),
+        WEBHOOK_URL=_opt(data, "WEBHOOK_URL", "") or url,
+        WEBHOOK_PATH=_opt(data, "WEBHOOK_PATH", "/tg/webhook"),
+        WEBHOOK_SECRET=_opt(data, "WEBHOOK_SECRET", ""),
+        WEBHOOK_PORT=_opt(data, "WEBHOOK_PORT", 8081, int),
+        BOT_CONCURRENCY=_opt(data, "BOT_CONCURRENCY", 16, int),
+        BOT_QUEUE_SIZE=_opt(data, "BOT_QUEUE_SIZE", 1000, int),
+        FSM_STORAGE=_opt(data, "FSM_STORAGE", "sqlite"),
+        FSM_FLUSH_MS=_opt(data, "FSM_FLUSH_MS", 50, int),
+        FSM_CACHE_TTL=_opt(data, "FSM_CACHE_TTL", 2.0, float),
+        FSM_STATE_TTL=_opt(data, "FSM_STATE_TTL", 86400.0, float),
+        ROOM_IDLE_TTL=_opt(data, "ROOM_IDLE_TTL", 21600.0, float),
+        ROOM_ARCHIVE_AFTER=_opt(data, "ROOM_ARCHIVE_AFTER", 3600.0, float),
+        ARCHIVE_DB_PATH=_opt(data, "ARCHIVE_DB_PATH", ""),
+        LIFECYCLE_INTERVAL=_opt(data, "LIFECYCLE_INTERVAL", 300.0, float),
+        ANSWER_BATCH_MS=_opt(data, "ANSWER_BATCH_MS", 5.0, float),
+        CACHE_SIZE=_opt(data, "CACHE_SIZE", 10000, int),
+        CACHE_TTL=_opt(data, "CACHE_TTL", 60.0, float),
+        METRICS_ENABLED=_opt(data, "METRICS_ENABLED", True, _flag),
+        PROFILING=_opt(data, "PROFILING", False, _flag),
+        SLOW_QUERY_MS=_opt(data, "SLOW_QUERY_MS", 100.0, float),
+        LOOP_LAG_MS=_opt(data, "LOOP_LAG_MS", 100.0, float),
+        ADMIN_TOKEN=_opt(data, "ADMIN_TOKEN", ""),
+        ROOM_CODE_KEY=room_code_key,
+    )
     return _cached
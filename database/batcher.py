@@ -0,0 +1,117 @@
+from __future__ import annotations
+"""
+Group commit for answer submissions.
+
+When a question goes out every player answers within seconds, and one commit
+per answer makes them queue on the SQLite write lock. AnswerBatcher collects
+the submit_answer calls arriving within `window` seconds (from any room) and
+writes them in one transaction with one commit. Each caller still gets its own
+row or its own ValueError. Enabled with db.open_answer_batcher().
+"""
+import asyncio
+import functools
+from typing import Any, List, Optional, Set, Tuple
+
+import aiosqlite
+
+from database import db as dbmod
+from database.records import AnswerRow
+
+_Item = Tuple[int, int, str, asyncio.Future]
+
+class AnswerBatcher:
+    def __init__(self, window: float = 0.005, max_batch: int = 256):
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self._pending: List[_Item] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._writes: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.answers = 0
+
+    async def submit(self, round_id: int, user_id: int, text: str) -> AnswerRow:
+        fut = asyncio.get_running_loop().create_future()
+        self._pending.append((round_id, user_id, text, fut))
+        if len(self._pending) >= self.max_batch:
+            self._kick()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._kick)
+        return await fut
+
+    def _kick(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.create_task(self._write(batch))
+        self._writes.add(task)
+        task.add_done_callback(functools.partial(self._done, batch))
+
+    def _done(self, batch: List[_Item], task: asyncio.Task) -> None:
+        self._writes.discard(task)
+        # A write cancelled at shutdown, even before it started, must not leave callers waiting
+        if task.cancelled():
+            for *_, fut in batch:
+                if not fut.done():
+                    fut.cancel()
+
+    async def _write(self, batch: List[_Item]) -> None:
+        results: List[Any] = []
+        try:
+            async with dbmod._connect(write=True) as db:
+                rooms: Set[int] = set()
+                for round_id, user_id, text, _ in batch:
+                    result = await self._insert(db, round_id, user_id, text)
+                    if isinstance(result, tuple):
+                        room_id, result = result
+                        rooms.add(room_id)
+                    results.append(result)
+                for room_id in rooms:
+                    await dbmod._bump_version(db, room_id)
+                await db.commit()
+        except Exception as e:
+            # Nothing was committed: every caller in the batch gets the error
+            for *_, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        self.batches += 1
+        self.answers += len(batch)
+        for (*_, fut), result in zip(batch, results):
+            if fut.done():
+                continue
+            if isinstance(result, Exception):
+                fut.set_exception(result)
+            else:
+                fut.set_result(result)
+
+    async def _insert(self, db: aiosqlite.Connection, round_id: int, user_id: int, text: str):
+        """(room id, the new answer row), or the exception this caller should get."""
+        try:
+            cur = await db.execute(f"""
+                INSERT INTO answers (round_id, user_id, text)
+                SELECT id, ?, ? FROM rounds WHERE id=? AND status='collecting'
+                ON CONFLICT(round_id, user_id) DO NOTHING
+                RETURNING (SELECT room_id FROM rounds WHERE rounds.id=answers.round_id), {dbmod._ANSWER_ROW_COLUMNS}
+            """, (user_id, text, round_id))
+            row = await cur.fetchone()
+        except aiosqlite.IntegrityError as e:
+            # Duplicates are DO NOTHING above: this is another constraint (unknown user, ...).
+            # Only this statement was rolled back; the caller gets the error as it is.
+            return e
+        if row is not None:
+            return row[0], AnswerRow(*row[1:])
+        cur = await db.execute("SELECT status FROM rounds WHERE id=?", (round_id,))
+        rd = await cur.fetchone()
+        if rd is None:
+            return ValueError("Раунд не найден")
+        if rd[0] != "collecting":
+            return ValueError("Сбор ответов завершён")
+        return ValueError("Вы уже отправили ответ в этом раунде")
+
+    async def close(self) -> None:
+        """Write whatever is still waiting for its window."""
+        self._kick()
+        await asyncio.gather(*self._writes, return_exceptions=True)
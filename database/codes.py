@@ -0,0 +1,80 @@
+from __future__ import annotations
+"""
+Room codes derived from room ids.
+
+encode() is a bijection from [0, 36**6) onto the 6-character A-Z0-9 codes:
+an 8-round Feistel network over 32 bits, cycle-walked back into range.
+Distinct ids therefore always get distinct codes, so creating a room needs no
+uniqueness probe. decode() is the inverse. encode() is registered as an SQL
+function on every connection (database/pool.py), so the code is computed
+inside the INSERT.
+
+A room code is all it takes to join a room, so the round function is keyed
+BLAKE2b with keys derived from the secret ROOM_CODE_KEY setting (set_key()).
+Without the key, ids do not predict codes; both functions refuse to run
+until a key is set.
+"""
+import hashlib
+from typing import Optional, Tuple
+
+ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+LENGTH = 6
+SPACE = len(ALPHABET) ** LENGTH  # 2_176_782_336 codes
+
+# Generic attacks on Feistel networks over small halves weaken quickly with fewer rounds
+ROUNDS = 8
+_MASK = 0xFFFF
+
+# Changing the key only affects codes issued afterwards; stored codes stay valid
+# and any clash with them is skipped by create_room.
+_KEYS: Optional[Tuple[bytes, ...]] = None
+_INVERSE_KEYS: Optional[Tuple[bytes, ...]] = None
+
+def derive_keys(secret: str) -> Tuple[bytes, ...]:
+    """Per-round BLAKE2b keys for a ROOM_CODE_KEY secret."""
+    if not secret:
+        raise ValueError("ROOM_CODE_KEY is empty")
+    return tuple(
+        hashlib.blake2b(secret.encode(), digest_size=32, person=b"room-code", salt=bytes([i]) * 16).digest()
+        for i in range(ROUNDS)
+    )
+
+def set_key(secret: str) -> None:
+    """Key encode()/decode() with the ROOM_CODE_KEY secret; call once at startup."""
+    global _KEYS, _INVERSE_KEYS
+    _KEYS = derive_keys(secret)
+    _INVERSE_KEYS = tuple(reversed(_KEYS))
+
+def _round(half: int, key: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(half.to_bytes(2, "big"), digest_size=2, key=key).digest(), "big")
+
+def _permute(n: int, keys: Tuple[bytes, ...]) -> int:
+    left, right = n >> 16, n & _MASK
+    for key in keys:
+        left, right = right, left ^ _round(right, key)
+    return (right << 16) | left
+
+def _walk(n: int, keys: Optional[Tuple[bytes, ...]]) -> int:
+    if keys is None:
+        raise RuntimeError("ROOM_CODE_KEY is not set: call database.codes.set_key() at startup")
+    # Cycle walking: the 32-bit permutation restricted to [0, SPACE) is still a bijection
+    n = _permute(n, keys)
+    while n >= SPACE:
+        n = _permute(n, keys)
+    return n
+
+def encode(room_id: int) -> str:
+    if not 0 <= room_id < SPACE:
+        raise ValueError(f"room id out of range: {room_id}")
+    n = _walk(room_id, _KEYS)
+    chars = []
+    for _ in range(LENGTH):
+        n, r = divmod(n, len(ALPHABET))
+        chars.append(ALPHABET[r])
+    return "".join(reversed(chars))
+
+def decode(code: str) -> int:
+    n = 0
+    for ch in code:
+        n = n * len(ALPHABET) + ALPHABET.index(ch)
+    return _walk(n, _INVERSE_KEYS)
@@ -3,257 +3,547 @@ from __future__ import annotations
 Async DB helpers using aiosqlite, with invariants and transactions.
 """
 import asyncio
-import random
-import string
-from dataclasses import asdict
+import functools
+import time
+from contextlib import asynccontextmanager
+from dataclasses import asdict, replace
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 import aiosqlite
+import metrics
 from config import PROJECT_ROOT
+from database.cache import TTLCache
+from database.migrate import migrate
+from database.pool import ConnectionPool, open_connection, profile_pragmas
+from database.records import Answer, AnswerRow, Player, Record, Room, RoomSummary, Round, User
 
 _DB_PATH = str(PROJECT_ROOT / "database" / "miniapp.db")
-_SCHEMA_PATH = str(PROJECT_ROOT / "database" / "schema.sql")
+
+_pool: Optional[ConnectionPool] = None
+# Group-commit writer for submit_answer (database/batcher.py), when enabled
+_answer_batcher = None
+# Path whose schema is known to be current in this process
+_initialized_path: Optional[str] = None
+
+# Read-through caches for rows that almost never change (database/cache.py)
+_users_by_tg = TTLCache("users_by_tg")
+_users_by_id = TTLCache("users_by_id")
+_rooms_by_id = TTLCache("rooms_by_id")
+_room_ids = TTLCache("room_ids_by_code")  # codes map to one id forever
+_CACHES = (_users_by_tg, _users_by_id, _rooms_by_id, _room_ids)
+# Room metadata served from the cache; version/updated_at change on every write
+_ROOM_META = Room.columns()
+# Explicit column lists, in record field order (database/records.py)
+_USER_COLUMNS = ", ".join(User.columns())
+_ROOM_COLUMNS = ", ".join(_ROOM_META)
+_ROUND_COLUMNS = ", ".join(Round.columns())
+_ANSWER_ROW_COLUMNS = ", ".join(AnswerRow.columns())
+_PLAYER_SQL = """
+    SELECT rp.id, u.id, u.name, rp.super_cards
+    FROM room_players rp JOIN users u ON u.id = rp.user_id
+    WHERE rp.room_id=? AND rp.user_id=?
+"""
+_PLAYERS_SQL = """
+    SELECT rp.id, u.id, u.name, rp.super_cards
+    FROM room_players rp JOIN users u ON u.id = rp.user_id
+    WHERE rp.room_id=?
+    ORDER BY rp.id ASC
+"""
+_ANSWERS_SQL = """
+    SELECT a.id, a.text, a.revealed, CASE WHEN a.revealed=1 THEN u.name ELSE NULL END
+    FROM answers a JOIN users u ON u.id = a.user_id
+    WHERE a.round_id=?
+    ORDER BY a.id ASC
+"""
+_CURRENT_ROUND_SQL = f"SELECT {_ROUND_COLUMNS} FROM rounds WHERE room_id=? ORDER BY id DESC LIMIT 1"
+
+# The same views as one statement each, encoded by SQLite's JSON functions
+# (keys as in the records above) for routes that send them straight out.
+# SQLite 3.40 has no ORDER BY inside aggregates: json_group_array takes the
+# rows in the order of the ordered subquery it reads from.
+_PLAYERS_JSON = """(
+    SELECT json_group_array(json_object('player_id', p.id, 'user_id', p.user_id, 'name', p.name, 'super_cards', p.super_cards))
+    FROM (SELECT rp.id, u.id AS user_id, u.name, rp.super_cards
+          FROM room_players rp JOIN users u ON u.id = rp.user_id
+          WHERE rp.room_id = r.id ORDER BY rp.id ASC) p
+)"""
+_ROUND_JSON = """(
+    SELECT json_object('id', id, 'room_id', room_id, 'question', question, 'status', status, 'created_at', created_at)
+    FROM rounds WHERE room_id = r.id ORDER BY id DESC LIMIT 1
+)"""
+_ANSWERS_JSON = """(
+    SELECT json_group_array(json_object('answer_id', x.id, 'text', x.text, 'revealed', x.revealed, 'author_display', x.author_display))
+    FROM (SELECT a.id, a.text, a.revealed, CASE WHEN a.revealed=1 THEN u.name ELSE NULL END AS author_display
+          FROM answers a JOIN users u ON u.id = a.user_id
+          WHERE a.round_id = {round_id} ORDER BY a.id ASC) x
+)"""
+_ROOM_STATE_JSON_SQL = f"""
+    SELECT json_object('room_id', r.id, 'room_code', r.code, 'status', r.status,
+                       'players', {_PLAYERS_JSON}, 'current_round', {_ROUND_JSON})
+    FROM rooms r WHERE r.id=?
+"""
+_ROOM_SNAPSHOT_JSON_SQL = f"""
+    SELECT r.version,
+           json_object('room_id', r.id, 'room_code', r.code, 'status', r.status, 'version', r.version,
+                       'players', {_PLAYERS_JSON}, 'current_round', {_ROUND_JSON},
+                       'answers', {_ANSWERS_JSON.format(round_id="(SELECT MAX(id) FROM rounds WHERE room_id = r.id)")})
+    FROM rooms r WHERE r.id=?
+"""
+_ANSWERS_JSON_SQL = f"SELECT {_ANSWERS_JSON.format(round_id='?')}"
+# Counters kept by the room_summary triggers (migration 0008)
+_SUMMARY_SQL = """
+    SELECT r.id, r.code, r.status, r.version,
+           s.player_count, s.current_round_id, s.round_status, s.answer_count, s.revealed_count
+    FROM rooms r JOIN room_summary s ON s.room_id = r.id
+"""
+
+# Per-function timings; each wrapped coroutine keeps its own histogram/counter child
+_CALLS = metrics.histogram("db_call_seconds", "Time spent in a database/db.py coroutine", ("fn",))
+_CALL_ERRORS = metrics.counter("db_call_errors", "database/db.py coroutines that raised", ("fn",))
+_CONNECT = metrics.histogram("db_connect_seconds", "Time to get a connection: pool reader/writer wait, or opening one", ("mode",))
+_CONNECT_READ, _CONNECT_WRITE, _CONNECT_OPEN = (_CONNECT.labels(m) for m in ("read", "write", "open"))
+
+def _timed(fn):
+    hist, errors = _CALLS.labels(fn.__name__), _CALL_ERRORS.labels(fn.__name__)
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        except BaseException:
+            errors.inc()
+            raise
+        finally:
+            hist.observe(time.perf_counter() - t0)
+    return wrapper
 
 def set_db_path(path: str) -> None:
-    global _DB_PATH
+    global _DB_PATH, _initialized_path
     _DB_PATH = path
+    _initialized_path = None
+    for c in _CACHES:
+        c.clear()
 
-async def ensure_initialized() -> None:
-    """Create tables if not exists by executing schema.sql."""
-    Path(_DB_PATH).parent.mkdir(parents=True, exist_ok=True)
-    async with aiosqlite.connect(_DB_PATH) as db:
-        with open(_SCHEMA_PATH, "r", encoding="utf-8") as f:
-            await db.executescript(f.read())
-        await db.commit()
+def configure_cache(size: int = 10_000, ttl: float = 60.0) -> None:
+    """Size and TTL of the user/room caches; 0 disables them."""
+    for c in _CACHES:
+        c.configure(size, ttl)
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {c.name: c.stats() for c in _CACHES}
+
+def invalidate_room(room_id: int) -> None:
+    """Forget cached room metadata after its status changes or it is deleted."""
+    _rooms_by_id.pop(room_id)
 
-def _code(n: int = 6) -> str:
-    chars = string.ascii_uppercase + string.digits
-    return "".join(random.choice(chars) for _ in range(n))
+def _remember_user(user: User) -> User:
+    _users_by_tg.put(user.tg_user_id, user)
+    _users_by_id.put(user.id, user)
+    return user
+
+def _remember_room(room: Room) -> Room:
+    _rooms_by_id.put(room.id, room)
+    _room_ids.put(room.code, room.id)
+    return room
+
+async def _fetchone(db: aiosqlite.Connection, record: type, sql: str, params: Tuple = ()) -> Optional[Record]:
+    """Run a query whose columns are `record`'s fields, building the record from the tuple row."""
+    cur = await db.execute(sql, params)
+    cur.row_factory = record.from_row
+    return await cur.fetchone()
+
+async def _fetchall(db: aiosqlite.Connection, record: type, sql: str, params: Tuple = ()) -> List[Record]:
+    cur = await db.execute(sql, params)
+    cur.row_factory = record.from_row
+    return await cur.fetchall()
+
+async def open_pool(size: int = 4, profile: str = "default", checkpoint_interval: float = 0) -> ConnectionPool:
+    """Open the shared connection pool; until then every call opens its own connection."""
+    global _pool
+    await close_pool()
+    _pool = await ConnectionPool(_DB_PATH, size=size, pragmas=profile_pragmas(profile)).open()
+    _pool.start_checkpointer(checkpoint_interval)
+    return _pool
+
+async def close_pool() -> None:
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None:
+        await pool.close()
+
+def open_answer_batcher(window: float = 0.005, max_batch: int = 256):
+    """Route submit_answer through a group-commit batcher; call close_answer_batcher() on shutdown."""
+    global _answer_batcher
+    from database.batcher import AnswerBatcher
+    _answer_batcher = AnswerBatcher(window=window, max_batch=max_batch)
+    return _answer_batcher
+
+async def close_answer_batcher() -> None:
+    global _answer_batcher
+    batcher, _answer_batcher = _answer_batcher, None
+    if batcher is not None:
+        await batcher.close()
+
+@asynccontextmanager
+async def _connect(write: bool = False) -> AsyncIterator[aiosqlite.Connection]:
+    pool = _pool
+    t0 = time.perf_counter()
+    if pool is not None and pool.path == _DB_PATH:
+        async with (pool.writer() if write else pool.reader()) as db:
+            (_CONNECT_WRITE if write else _CONNECT_READ).observe(time.perf_counter() - t0)
+            yield db
+        return
+    db = await open_connection(_DB_PATH)
+    _CONNECT_OPEN.observe(time.perf_counter() - t0)
+    try:
+        yield db
+    finally:
+        await db.close()
+
+async def ensure_initialized(path: Optional[str] = None) -> None:
+    """Apply pending schema migrations once per process; later calls only check a flag.
+
+    `path` defaults to the configured database (set_db_path).
+    """
+    global _initialized_path
+    path = path or _DB_PATH
+    if _initialized_path == path:
+        return
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    async with aiosqlite.connect(path, isolation_level=None) as db:
+        # Only takes effect on a new file; enable_incremental_vacuum() converts older ones
+        await db.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        await migrate(db)
+    _initialized_path = path
+
+async def enable_incremental_vacuum() -> bool:
+    """One-off conversion of an older file to auto_vacuum=INCREMENTAL (database/lifecycle.py compact).
+
+    Rebuilds the whole file with VACUUM, so it runs from `--init`, not from a
+    serving process. Returns False when the file was already converted.
+    """
+    async with aiosqlite.connect(_DB_PATH, isolation_level=None) as db:
+        cur = await db.execute("PRAGMA auto_vacuum")
+        if (await cur.fetchone())[0] == 2:
+            return False
+        await db.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        await db.execute("VACUUM")
+        return True
+
+async def _bump_version(db: aiosqlite.Connection, room_id: int) -> None:
+    # Also marks the room active for the idle-room sweep (database/lifecycle.py)
+    await db.execute("UPDATE rooms SET version=version+1, updated_at=strftime('%s','now') WHERE id=?", (room_id,))
 
 # ---------------- Users -----------------
 
-async def get_or_create_user(tg_user_id: str, name: str) -> Dict[str, Any]:
+@_timed
+async def get_or_create_user(tg_user_id: str, name: str) -> User:
+    cached = _users_by_tg.get(tg_user_id)
+    if cached is not None and (not name or cached.name == name):
+        return cached
     await ensure_initialized()
-    async with aiosqlite.connect(_DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cur = await db.execute("SELECT * FROM users WHERE tg_user_id=?", (tg_user_id,))
-        row = await cur.fetchone()
-        if row:
+    async with _connect(write=True) as db:
+        sql = f"SELECT {_USER_COLUMNS} FROM users WHERE tg_user_id=?"
+        user = await _fetchone(db, User, sql, (tg_user_id,))
+        if user:
             # Update name if changed
-            if name and row["name"] != name:
-                await db.execute("UPDATE users SET name=? WHERE id=?", (name, row["id"]))
+            if name and user.name != name:
+                await db.execute("UPDATE users SET name=? WHERE id=?", (name, user.id))
                 await db.commit()
-                row = dict(row)
-                row["name"] = name
-                return row
-            return dict(row)
+                return _remember_user(replace(user, name=name))
+            return _remember_user(user)
         await db.execute("INSERT INTO users (tg_user_id, name) VALUES (?,?)", (tg_user_id, name or f"User{tg_user_id}"))
         await db.commit()
-        cur = await db.execute("SELECT * FROM users WHERE tg_user_id=?", (tg_user_id,))
-        return dict(await cur.fetchone())
+        return _remember_user(await _fetchone(db, User, sql, (tg_user_id,)))
 
-async def get_user_by_id(user_id: int) -> Optional[Dict[str, Any]]:
-    async with aiosqlite.connect(_DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cur = await db.execute("SELECT * FROM users WHERE id=?", (user_id,))
-        row = await cur.fetchone()
-        return dict(row) if row else None
+@_timed
+async def get_user_by_id(user_id: int) -> Optional[User]:
+    cached = _users_by_id.get(user_id)
+    if cached is not None:
+        return cached
+    async with _connect() as db:
+        user = await _fetchone(db, User, f"SELECT {_USER_COLUMNS} FROM users WHERE id=?", (user_id,))
+        return _remember_user(user) if user else None
 
 # ---------------- Rooms -----------------
 
-async def create_room(owner_user_id: int) -> Dict[str, Any]:
+@_timed
+async def create_room(owner_user_id: int) -> Room:
     await ensure_initialized()
-    async with aiosqlite.connect(_DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        # Generate unique code
+    async with _connect(write=True) as db:
+        # The code is a bijection of the new id (database/codes.py), so it is unique by
+        # construction. Only codes issued randomly before that can clash: skip the id.
         for _ in range(20):
-            code = _code(6)
-            cur = await db.execute("SELECT id FROM rooms WHERE code=?", (code,))
-            if not await cur.fetchone():
+            cur = await db.execute(f"""
+                INSERT INTO rooms (id, code, owner_user_id, status, updated_at)
+                SELECT n, room_code(n), ?, 'active', strftime('%s','now')
+                FROM (SELECT COALESCE((SELECT seq FROM sqlite_sequence WHERE name='rooms'), 0) + 1 AS n)
+                WHERE true
+                ON CONFLICT(code) DO NOTHING
+                RETURNING {_ROOM_COLUMNS}
+            """, (owner_user_id,))
+            cur.row_factory = Room.from_row
+            room = await cur.fetchone()
+            if room:
                 break
+            # Make sure the next attempt uses a later id (SQLite may have advanced it already)
+            await db.execute("UPDATE sqlite_sequence SET seq=seq+1 WHERE name='rooms'")
         else:
+            await db.rollback()
             raise RuntimeError("Не удалось сгенерировать уникальный код комнаты")
-        await db.execute("INSERT INTO rooms (code, owner_user_id, status) VALUES (?,?, 'active')", (code, owner_user_id))
-        await db.commit()
-        cur = await db.execute("SELECT * FROM rooms WHERE code=?", (code,))
-        room = dict(await cur.fetchone())
         # Owner auto-joins with 3 super-cards
         await db.execute(
             "INSERT OR IGNORE INTO room_players (room_id, user_id, super_cards) VALUES (?,?,3)",
-            (room["id"], owner_user_id),
+            (room.id, owner_user_id),
         )
         await db.commit()
-        return room
+        return _remember_room(room)
 
-async def get_room_by_code(room_code: str) -> Optional[Dict[str, Any]]:
-    async with aiosqlite.connect(_DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cur = await db.execute("SELECT * FROM rooms WHERE code=?", (room_code,))
-        row = await cur.fetchone()
-        return dict(row) if row else None
+@_timed
+async def get_room_by_code(room_code: str) -> Optional[Room]:
+    """Room metadata (id, code, owner, status, timestamps), usually without SQL."""
+    room_id = _room_ids.get(room_code)
+    if room_id is not None:
+        return await get_room_by_id(room_id)
+    async with _connect() as db:
+        room = await _fetchone(db, Room, f"SELECT {_ROOM_COLUMNS} FROM rooms WHERE code=?", (room_code,))
+        return _remember_room(room) if room else None
 
-async def get_room_by_id(room_id: int) -> Optional[Dict[str, Any]]:
-    async with aiosqlite.connect(_DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cur = await db.execute("SELECT * FROM rooms WHERE id=?", (room_id,))
-        row = await cur.fetchone()
-        return dict(row) if row else None
+@_timed
+async def get_room_by_id(room_id: int) -> Optional[Room]:
+    cached = _rooms_by_id.get(room_id)
+    if cached is not None:
+        return cached
+    async with _connect() as db:
+        room = await _fetchone(db, Room, f"SELECT {_ROOM_COLUMNS} FROM rooms WHERE id=?", (room_id,))
+        return _remember_room(room) if room else None
 
+@_timed
 async def join_room(room_code: str, user_id: int) -> Dict[str, Any]:
-    async with aiosqlite.connect(_DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cur = await db.execute("SELECT * FROM rooms WHERE code=?", (room_code,))
-        room = await cur.fetchone()
-        if not room:
-            raise ValueError("Комната не найдена")
-        if room["status"] != "active":
-            raise ValueError("Комната закрыта")
-        await db.execute(
+    room = await get_room_by_code(room_code)
+    if not room:
+        raise ValueError("Комната не найдена")
+    if room.status != "active":
+        raise ValueError("Комната закрыта")
+    async with _connect(write=True) as db:
+        cur = await db.execute(
             "INSERT OR IGNORE INTO room_players (room_id, user_id, super_cards) VALUES (?,?,3)",
-            (room["id"], user_id),
+            (room.id, user_id),
         )
+        if cur.rowcount:
+            await _bump_version(db, room.id)
         await db.commit()
-        cur = await db.execute("SELECT * FROM room_players WHERE room_id=? AND user_id=?", (room["id"], user_id))
-        rp = dict(await cur.fetchone())
-        return {"room": dict(room), "player": rp}
+        player = await _fetchone(db, Player, _PLAYER_SQL, (room.id, user_id))
+        return {"room": room, "player": player}
 
+@_timed
 async def get_room_state(room_id: int) -> Dict[str, Any]:
-    async with aiosqlite.connect(_DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cur = await db.execute("SELECT * FROM rooms WHERE id=?", (room_id,))
+    async with _connect() as db:
+        cur = await db.execute("SELECT id, code, status FROM rooms WHERE id=?", (room_id,))
         room = await cur.fetchone()
         if not room:
             raise ValueError("Комната не найдена")
-        cur = await db.execute("""
-            SELECT rp.id as player_id, u.id as user_id, u.name, rp.super_cards
-            FROM room_players rp JOIN users u ON u.id = rp.user_id
-            WHERE rp.room_id=?
-            ORDER BY rp.joined_at ASC
-        """, (room_id,))
-        players = [dict(r) for r in await cur.fetchall()]
-        # current round (last row by created_at)
-        cur = await db.execute("""
-            SELECT id, question, status, created_at
-            FROM rounds WHERE room_id=?
-            ORDER BY id DESC LIMIT 1
-        """, (room_id,))
-        current_round = await cur.fetchone()
+        players = await _fetchall(db, Player, _PLAYERS_SQL, (room_id,))
+        # current round (latest id)
+        current_round = await _fetchone(db, Round, _CURRENT_ROUND_SQL, (room_id,))
+        room_id, code, status = room
         return {
-            "room_id": room["id"],
-            "room_code": room["code"],
-            "status": room["status"],
+            "room_id": room_id,
+            "room_code": code,
+            "status": status,
             "players": players,
-            "current_round": dict(current_round) if current_round else None
+            "current_round": current_round
         }
 
+@_timed
+async def get_room_version(room_id: int) -> Optional[int]:
+    async with _connect() as db:
+        cur = await db.execute("SELECT version FROM rooms WHERE id=?", (room_id,))
+        row = await cur.fetchone()
+        return row[0] if row else None
+
+@_timed
+async def get_room_snapshot(room_id: int) -> Dict[str, Any]:
+    """Room, players, current round and its answers from one read transaction."""
+    async with _connect() as db:
+        await db.execute("BEGIN")
+        try:
+            cur = await db.execute("SELECT id, code, status, version FROM rooms WHERE id=?", (room_id,))
+            room = await cur.fetchone()
+            if not room:
+                raise ValueError("Комната не найдена")
+            players = await _fetchall(db, Player, _PLAYERS_SQL, (room_id,))
+            current_round = await _fetchone(db, Round, _CURRENT_ROUND_SQL, (room_id,))
+            answers = []
+            if current_round:
+                answers = await _fetchall(db, Answer, _ANSWERS_SQL, (current_round.id,))
+        finally:
+            await db.execute("COMMIT")
+        room_id, code, status, version = room
+        return {
+            "room_id": room_id,
+            "room_code": code,
+            "status": status,
+            "version": version,
+            "players": players,
+            "current_round": current_round,
+            "answers": answers,
+        }
+
+@_timed
+async def get_room_state_json(room_id: int) -> str:
+    """get_room_state as JSON text, built by SQLite in one statement."""
+    async with _connect() as db:
+        cur = await db.execute(_ROOM_STATE_JSON_SQL, (room_id,))
+        row = await cur.fetchone()
+        if not row:
+            raise ValueError("Комната не найдена")
+        return row[0]
+
+@_timed
+async def get_room_snapshot_json(room_id: int) -> Tuple[int, str]:
+    """(version, get_room_snapshot as JSON text); one statement is one read snapshot."""
+    async with _connect() as db:
+        cur = await db.execute(_ROOM_SNAPSHOT_JSON_SQL, (room_id,))
+        row = await cur.fetchone()
+        if not row:
+            raise ValueError("Комната не найдена")
+        return row[0], row[1]
+
+@_timed
+async def get_room_summary(room_id: int) -> Optional[RoomSummary]:
+    """Status, version and counters of a room: two primary-key lookups."""
+    async with _connect() as db:
+        return await _fetchone(db, RoomSummary, _SUMMARY_SQL + " WHERE r.id=?", (room_id,))
+
+@_timed
+async def list_active_rooms(limit: int = 50) -> List[RoomSummary]:
+    """Most recently active rooms first (idx_rooms_status_updated), with their counters."""
+    async with _connect() as db:
+        sql = _SUMMARY_SQL + " WHERE r.status='active' ORDER BY r.updated_at DESC LIMIT ?"
+        return await _fetchall(db, RoomSummary, sql, (limit,))
+
 # ---------------- Rounds & Prompts -----------------
 
-async def set_question(room_id: int, text: str) -> Dict[str, Any]:
+@_timed
+async def set_question(room_id: int, text: str) -> Round:
     text = (text or "").strip()
     if not text or len(text) > 200:
         raise ValueError("Вопрос пустой или слишком длинный (≤200)")
-    async with aiosqlite.connect(_DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with _connect(write=True) as db:
         # Close previous collecting rounds (move to discussion)
         await db.execute("UPDATE rounds SET status='discussion' WHERE room_id=? AND status='collecting'", (room_id,))
         await db.execute("INSERT INTO rounds (room_id, question, status) VALUES (?,?, 'collecting')", (room_id, text))
+        await _bump_version(db, room_id)
         await db.commit()
-        cur = await db.execute("SELECT * FROM rounds WHERE room_id=? ORDER BY id DESC LIMIT 1", (room_id,))
-        return dict(await cur.fetchone())
+        return await _fetchone(db, Round, _CURRENT_ROUND_SQL, (room_id,))
 
-async def get_current_question(room_id: int) -> Optional[Dict[str, Any]]:
-    async with aiosqlite.connect(_DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cur = await db.execute("SELECT * FROM rounds WHERE room_id=? ORDER BY id DESC LIMIT 1", (room_id,))
-        row = await cur.fetchone()
-        return dict(row) if row else None
+@_timed
+async def get_current_question(room_id: int) -> Optional[Round]:
+    async with _connect() as db:
+        return await _fetchone(db, Round, _CURRENT_ROUND_SQL, (room_id,))
 
+@_timed
 async def close_round(room_id: int) -> None:
-    async with aiosqlite.connect(_DB_PATH) as db:
-        await db.execute("UPDATE rounds SET status='discussion' WHERE room_id=? AND status='collecting'", (room_id,))
+    async with _connect(write=True) as db:
+        cur = await db.execute("UPDATE rounds SET status='discussion' WHERE room_id=? AND status='collecting'", (room_id,))
+        if cur.rowcount:
+            await _bump_version(db, room_id)
         await db.commit()
 
 # ---------------- Answers -----------------
 
-async def submit_answer(round_id: int, user_id: int, text: str) -> Dict[str, Any]:
+@_timed
+async def submit_answer(round_id: int, user_id: int, text: str) -> AnswerRow:
     text = (text or "").strip()
     if not text or len(text) > 300:
         raise ValueError("Ответ пустой или слишком длинный (≤300)")
-    async with aiosqlite.connect(_DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    if _answer_batcher is not None:
+        return await _answer_batcher.submit(round_id, user_id, text)
+    async with _connect(write=True) as db:
         # Ensure round exists and collecting
-        cur = await db.execute("SELECT * FROM rounds WHERE id=?", (round_id,))
+        cur = await db.execute("SELECT room_id, status FROM rounds WHERE id=?", (round_id,))
         rd = await cur.fetchone()
         if not rd:
             raise ValueError("Раунд не найден")
-        if rd["status"] != "collecting":
+        room_id, status = rd
+        if status != "collecting":
             raise ValueError("Сбор ответов завершён")
         try:
-            await db.execute("INSERT INTO answers (round_id, user_id, text) VALUES (?,?,?)", (round_id, user_id, text))
+            ans = await _fetchone(db, AnswerRow, f"""
+                INSERT INTO answers (round_id, user_id, text) VALUES (?,?,?)
+                RETURNING {_ANSWER_ROW_COLUMNS}
+            """, (round_id, user_id, text))
+            await _bump_version(db, room_id)
             await db.commit()
         except aiosqlite.IntegrityError:
             raise ValueError("Вы уже отправили ответ в этом раунде")
-        cur = await db.execute("SELECT * FROM answers WHERE round_id=? AND user_id=?", (round_id, user_id))
-        return dict(await cur.fetchone())
+        return ans
 
-async def get_answers(round_id: int) -> List[Dict[str, Any]]:
-    async with aiosqlite.connect(_DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cur = await db.execute("""
-            SELECT a.id as answer_id, a.text, a.revealed,
-                   CASE WHEN a.revealed=1 THEN u.name ELSE NULL END as author_display
-            FROM answers a JOIN users u ON u.id = a.user_id
-            WHERE a.round_id=?
-            ORDER BY a.id ASC
-        """, (round_id,))
-        return [dict(r) for r in await cur.fetchall()]
+@_timed
+async def get_answers(round_id: int) -> List[Answer]:
+    async with _connect() as db:
+        return await _fetchall(db, Answer, _ANSWERS_SQL, (round_id,))
 
-# ---------------- Reveals -----------------
+@_timed
+async def get_answers_json(round_id: int) -> str:
+    """get_answers as a JSON array, built by SQLite."""
+    async with _connect() as db:
+        cur = await db.execute(_ANSWERS_JSON_SQL, (round_id,))
+        return (await cur.fetchone())[0]
 
-async def reveal_answer(round_id: int, answer_id: int, actor_user_id: int) -> Dict[str, Any]:
-    async with aiosqlite.connect(_DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        async with db.execute("BEGIN"):
-            # Load answer & round & room
-            cur = await db.execute("SELECT * FROM answers WHERE id=? AND round_id=?", (answer_id, round_id))
-            ans = await cur.fetchone()
-            if not ans:
-                raise ValueError("Ответ не найден")
-            if ans["revealed"] == 1:
-                raise ValueError("Этот ответ уже раскрыт")
-            cur = await db.execute("SELECT * FROM rounds WHERE id=?", (round_id,))
-            rd = await cur.fetchone()
-            if not rd:
-                raise ValueError("Раунд не найден")
-            # Author cannot reveal own answer
-            if ans["user_id"] == actor_user_id:
-                raise ValueError("Нельзя раскрыть свой собственный ответ")
-            # Get room_id
-            room_id = rd["room_id"]
-            # Find actor in room and decrement a super-card
-            cur = await db.execute("""
-                SELECT rp.id, rp.super_cards FROM room_players rp
-                WHERE rp.room_id=? AND rp.user_id=?
-            """, (room_id, actor_user_id))
-            rp = await cur.fetchone()
-            if not rp:
-                raise ValueError("Вы не являетесь игроком этой комнаты")
-            if rp["super_cards"] <= 0:
-                raise ValueError("У вас нет супер-карт")
-            await db.execute("UPDATE room_players SET super_cards=super_cards-1 WHERE id=? AND super_cards>0", (rp["id"],))
-            # Mark answer as revealed
-            await db.execute("UPDATE answers SET revealed=1, revealed_by_user_id=? WHERE id=?", (actor_user_id, answer_id))
-            await db.commit()
+# ---------------- Reveals -----------------
 
-        # fetch display name
+@_timed
+async def reveal_answer(round_id: int, answer_id: int, actor_user_id: int) -> Answer:
+    async with _connect(write=True) as db:
+        # Spend a card only if every rule holds; the first write takes the write lock,
+        # so nothing can change between the checks and the answer update.
         cur = await db.execute("""
-            SELECT a.id as answer_id, u.name as author_display
-            FROM answers a JOIN users u ON u.id = a.user_id
-            WHERE a.id=?
-        """, (answer_id,))
-        row = await cur.fetchone()
-        return dict(row)
+            UPDATE room_players SET super_cards=super_cards-1
+            WHERE room_id=(SELECT room_id FROM rounds WHERE id=?) AND user_id=? AND super_cards>0
+              AND EXISTS (SELECT 1 FROM answers WHERE id=? AND round_id=? AND revealed=0 AND user_id<>?)
+            RETURNING room_id
+        """, (round_id, actor_user_id, answer_id, round_id, actor_user_id))
+        spent = await cur.fetchone()
+        if spent is None:
+            # Explain the refusal inside the transaction that refused it, still holding the write lock
+            try:
+                reason = await _reveal_refusal(db, round_id, answer_id, actor_user_id)
+            finally:
+                await db.rollback()
+            raise ValueError(reason)
+        revealed = await _fetchone(db, Answer, """
+            UPDATE answers SET revealed=1, revealed_by_user_id=? WHERE id=? AND revealed=0
+            RETURNING id, text, revealed, (SELECT name FROM users WHERE users.id=answers.user_id)
+        """, (actor_user_id, answer_id))
+        await _bump_version(db, spent[0])
+        await db.commit()
+        return revealed
+
+async def _reveal_refusal(db: aiosqlite.Connection, round_id: int, answer_id: int, actor_user_id: int) -> str:
+    """Why reveal_answer refused: one lookup, checked in the original order."""
+    cur = await db.execute("""
+        SELECT a.id, a.revealed, a.user_id, rd.id, rp.super_cards
+        FROM (SELECT 1)
+        LEFT JOIN answers a ON a.id=? AND a.round_id=?
+        LEFT JOIN rounds rd ON rd.id=?
+        LEFT JOIN room_players rp ON rp.room_id=rd.room_id AND rp.user_id=?
+    """, (answer_id, round_id, round_id, actor_user_id))
+    found, revealed, author_id, found_round, super_cards = await cur.fetchone()
+    if found is None:
+        return "Ответ не найден"
+    if revealed == 1:
+        return "Этот ответ уже раскрыт"
+    if found_round is None:
+        return "Раунд не найден"
+    if author_id == actor_user_id:
+        return "Нельзя раскрыть свой собственный ответ"
+    if super_cards is None:
+        return "Вы не являетесь игроком этой комнаты"
+    return "У вас нет супер-карт"
 
 # --------------- CLI -----------------
 
@@ -267,3 +557,5 @@ if __name__ == "__main__":
     if args.init:
         asyncio.run(ensure_initialized())
         print(f"DB initialized at {args.db}")
+        if asyncio.run(enable_incremental_vacuum()):
+            print("Converted to auto_vacuum=INCREMENTAL")
@@ -0,0 +1,475 @@
+from __future__ import annotations
+"""
+In-process authoritative room engine with write-behind persistence.
+
+Active rooms (players, super-cards, current round and its answers) live in
+memory and every round action is checked and applied there, then queued as
+SQL and flushed to SQLite in batches. The public coroutines mirror the
+database.db helpers of the same name and return the same shapes, so routes
+can use either one.
+
+The engine owns the ids of rounds and answers it creates, so only one API
+process may run it against a given database.
+"""
+import asyncio
+import logging
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from api import serialization
+from database import db as dbmod
+from database.records import Answer, AnswerRow, Player, RoomSummary, Round
+
+logger = logging.getLogger(__name__)
+
+def _now() -> str:
+    # Same format as SQLite CURRENT_TIMESTAMP
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+
+def _is_transient(e: sqlite3.DatabaseError) -> bool:
+    # Worth retrying the whole batch; anything else is the statement's own fault
+    msg = str(e)
+    return isinstance(e, sqlite3.OperationalError) and ("locked" in msg or "busy" in msg or "disk I/O" in msg)
+
+class _Room:
+    __slots__ = ("id", "code", "status", "version", "players", "round", "answers", "answer_by_user", "touched")
+
+    def __init__(self, id: int, code: str, status: str, version: int = 0):
+        self.id = id
+        self.code = code
+        self.status = status
+        self.version = version
+        # user_id -> [player_id, name, super_cards], in join order
+        self.players: Dict[int, list] = {}
+        # [id, question, status, created_at] of the latest round
+        self.round: Optional[list] = None
+        # answer_id -> [user_id, text, revealed, revealed_by_user_id, created_at, author_name]
+        self.answers: Dict[int, list] = {}
+        self.answer_by_user: Dict[int, int] = {}
+        self.touched = time.monotonic()
+
+class RoomEngine:
+    def __init__(self, flush_interval: float = 0.05, batch_size: int = 500, idle_ttl: float = 3600.0,
+                 max_retries: int = 3):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.idle_ttl = idle_ttl
+        # Failed flushes of a batch before it is written statement by statement
+        self.max_retries = max(1, max_retries)
+        self._failures = 0
+        self.rooms: Dict[int, _Room] = {}
+        self._round_room: Dict[int, int] = {}
+        self._loading: Dict[int, asyncio.Future] = {}
+        self._pending: List[Tuple[str, tuple]] = []
+        self._wakeup = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._next_round_id = 0
+        self._next_answer_id = 0
+
+    # ---------------- lifecycle -----------------
+
+    async def start(self) -> "RoomEngine":
+        self._next_round_id = await self._max_id("rounds")
+        self._next_answer_id = await self._max_id("answers")
+        self._flusher = asyncio.create_task(self._flush_loop())
+        return self
+
+    async def _max_id(self, table: str) -> int:
+        # AUTOINCREMENT never reuses ids, so respect sqlite_sequence as well
+        async with dbmod._connect() as db:
+            cur = await db.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+            top = (await cur.fetchone())[0]
+            cur = await db.execute("SELECT seq FROM sqlite_sequence WHERE name=?", (table,))
+            row = await cur.fetchone()
+        return max(top, row[0] if row else 0)
+
+    async def stop(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        # Enough attempts to reach the statement-by-statement fallback; shutdown goes on regardless
+        for _ in range(self.max_retries + 1):
+            try:
+                await self.flush()
+                return
+            except Exception:
+                logger.exception("Room engine flush on stop failed")
+        if self._pending:
+            logger.error("Room engine stopped with %d unwritten statements", len(self._pending))
+
+    def _bump(self, room: _Room) -> None:
+        # Mirrors db._bump_version so the persisted version matches memory
+        room.version += 1
+        self._queue("UPDATE rooms SET version=version+1, updated_at=strftime('%s','now') WHERE id=?", (room.id,))
+
+    def _queue(self, sql: str, params: tuple) -> None:
+        self._pending.append((sql, params))
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def _flush_loop(self) -> None:
+        last_sweep = time.monotonic()
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+                if time.monotonic() - last_sweep > self.idle_ttl / 4:
+                    last_sweep = time.monotonic()
+                    self.evict_idle()
+            except Exception:
+                logger.exception("Room engine flush failed; will retry")
+
+    async def flush(self) -> int:
+        """Write queued changes in one transaction. Returns the number of statements."""
+        async with self._flush_lock:
+            batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            try:
+                if self._failures < self.max_retries:
+                    await self._write(batch)
+                else:
+                    await self._write_each(batch)
+            except BaseException as e:
+                self._pending[:0] = batch
+                if isinstance(e, Exception):
+                    self._failures += 1
+                raise
+            self._failures = 0
+            return len(batch)
+
+    async def _write(self, batch: List[Tuple[str, tuple]]) -> None:
+        async with dbmod._connect(write=True) as db:
+            i = 0
+            while i < len(batch):
+                # Group consecutive identical statements into executemany
+                sql, j = batch[i][0], i + 1
+                while j < len(batch) and batch[j][0] == sql:
+                    j += 1
+                await db.executemany(sql, [p for _, p in batch[i:j]])
+                i = j
+            await db.commit()
+
+    async def _write_each(self, batch: List[Tuple[str, tuple]]) -> None:
+        """The batch kept failing: commit every statement that can be, log and drop the rest.
+
+        A statement that always fails (a constraint violation) would otherwise
+        block all persistence while the queue grows. If the database itself is
+        unavailable, this raises like a normal flush and the batch is kept.
+        """
+        async with dbmod._connect(write=True) as db:
+            await db.execute("BEGIN IMMEDIATE")
+            for sql, params in batch:
+                await db.execute("SAVEPOINT engine_stmt")
+                try:
+                    await db.execute(sql, params)
+                except sqlite3.DatabaseError as e:
+                    if _is_transient(e):
+                        raise
+                    logger.error("Dropping write-behind statement that keeps failing: %s %r (%s)", sql.strip(), params, e)
+                    await db.execute("ROLLBACK TO engine_stmt")
+                await db.execute("RELEASE engine_stmt")
+            await db.commit()
+
+    def evict(self, room_id: int) -> None:
+        """Drop a room from memory; queued writes for it are still flushed."""
+        room = self.rooms.pop(room_id, None)
+        if room and room.round:
+            self._round_room.pop(room.round[0], None)
+
+    def evict_idle(self) -> None:
+        cutoff = time.monotonic() - self.idle_ttl
+        for room_id in [r.id for r in self.rooms.values() if r.touched < cutoff]:
+            self.evict(room_id)
+
+    # ---------------- loading -----------------
+
+    async def _room(self, room_id: int) -> Optional[_Room]:
+        room = self.rooms.get(room_id)
+        if room is not None:
+            room.touched = time.monotonic()
+            return room
+        fut = self._loading.get(room_id)
+        if fut is None:
+            fut = asyncio.get_running_loop().create_future()
+            self._loading[room_id] = fut
+            try:
+                room = await self._load(room_id)
+                if room is not None:
+                    self.rooms[room_id] = room
+                    if room.round:
+                        self._round_room[room.round[0]] = room_id
+                fut.set_result(room)
+            except BaseException as e:
+                fut.set_exception(e)
+                raise
+            finally:
+                self._loading.pop(room_id, None)
+            return room
+        return await fut
+
+    async def _load(self, room_id: int) -> Optional[_Room]:
+        # Anything queued for this room must be visible before we read it back
+        await self.flush()
+        async with dbmod._connect() as db:
+            cur = await db.execute("SELECT id, code, status, version FROM rooms WHERE id=?", (room_id,))
+            row = await cur.fetchone()
+            if not row:
+                return None
+            room = _Room(*row)
+            cur = await db.execute("""
+                SELECT u.id, rp.id, u.name, rp.super_cards
+                FROM room_players rp JOIN users u ON u.id = rp.user_id
+                WHERE rp.room_id=?
+                ORDER BY rp.id ASC
+            """, (room_id,))
+            for user_id, player_id, name, cards in await cur.fetchall():
+                room.players[user_id] = [player_id, name, cards]
+            cur = await db.execute("""
+                SELECT id, question, status, created_at
+                FROM rounds WHERE room_id=?
+                ORDER BY id DESC LIMIT 1
+            """, (room_id,))
+            rd = await cur.fetchone()
+            if rd:
+                room.round = list(rd)
+                cur = await db.execute("""
+                    SELECT a.id, a.user_id, a.text, a.revealed, a.revealed_by_user_id, a.created_at, u.name
+                    FROM answers a JOIN users u ON u.id = a.user_id
+                    WHERE a.round_id=? ORDER BY a.id ASC
+                """, (rd[0],))
+                for row in await cur.fetchall():
+                    room.answers[row[0]] = list(row[1:])
+                    room.answer_by_user[row[1]] = row[0]
+            return room
+
+    async def _room_for_round(self, round_id: int) -> Optional[_Room]:
+        room_id = self._round_room.get(round_id)
+        if room_id is None:
+            async with dbmod._connect() as db:
+                cur = await db.execute("SELECT room_id FROM rounds WHERE id=?", (round_id,))
+                row = await cur.fetchone()
+            if not row:
+                return None
+            room_id = row[0]
+        return await self._room(room_id)
+
+    # ---------------- reads -----------------
+
+    async def get_room_state(self, room_id: int) -> Dict[str, Any]:
+        room = await self._room(room_id)
+        if room is None:
+            raise ValueError("Комната не найдена")
+        rd = room.round
+        return {
+            "room_id": room.id,
+            "room_code": room.code,
+            "status": room.status,
+            "players": [Player(p[0], uid, p[1], p[2]) for uid, p in room.players.items()],
+            "current_round": Round(rd[0], room.id, rd[1], rd[2], rd[3]) if rd else None,
+        }
+
+    async def get_room_version(self, room_id: int) -> Optional[int]:
+        room = await self._room(room_id)
+        return room.version if room is not None else None
+
+    async def get_room_snapshot(self, room_id: int) -> Dict[str, Any]:
+        state = await self.get_room_state(room_id)
+        room = self.rooms[room_id]
+        state["version"] = room.version
+        state["answers"] = [self._answer_view(room, aid, a) for aid, a in room.answers.items()]
+        return state
+
+    async def get_current_question(self, room_id: int) -> Optional[Round]:
+        room = await self._room(room_id)
+        if room is None or room.round is None:
+            return None
+        rd = room.round
+        return Round(rd[0], room.id, rd[1], rd[2], rd[3])
+
+    async def get_answers(self, round_id: int) -> List[Answer]:
+        room = await self._room_for_round(round_id)
+        if room is None or room.round is None or room.round[0] != round_id:
+            # Past rounds are not kept in memory
+            await self.flush()
+            return await dbmod.get_answers(round_id)
+        return [self._answer_view(room, aid, a) for aid, a in room.answers.items()]
+
+    def _answer_view(self, room: _Room, aid: int, a: list) -> Answer:
+        return Answer(aid, a[1], a[2], a[5] if a[2] else None)
+
+    # The *_json views are already in memory: encode them here rather than in SQLite.
+    # Plain dicts, with the records' keys: orjson encodes those several times faster
+    # than slotted records (database/records.py).
+
+    async def _loaded(self, room_id: int) -> _Room:
+        room = await self._room(room_id)
+        if room is None:
+            raise ValueError("Комната не найдена")
+        return room
+
+    def _state_doc(self, room: _Room, snapshot: bool = False) -> Dict[str, Any]:
+        rd = room.round
+        doc = {"room_id": room.id, "room_code": room.code, "status": room.status}
+        if snapshot:
+            doc["version"] = room.version
+        doc.update({
+            "players": [{"player_id": p[0], "user_id": uid, "name": p[1], "super_cards": p[2]}
+                        for uid, p in room.players.items()],
+            "current_round": {"id": rd[0], "room_id": room.id, "question": rd[1], "status": rd[2], "created_at": rd[3]}
+                             if rd else None,
+        })
+        if snapshot:
+            doc["answers"] = self._answer_docs(room)
+        return doc
+
+    def _answer_docs(self, room: _Room) -> List[Dict[str, Any]]:
+        return [{"answer_id": aid, "text": a[1], "revealed": a[2], "author_display": a[5] if a[2] else None}
+                for aid, a in room.answers.items()]
+
+    async def get_room_state_json(self, room_id: int) -> str:
+        return serialization.dumps_str(self._state_doc(await self._loaded(room_id)))
+
+    async def get_room_snapshot_json(self, room_id: int) -> Tuple[int, str]:
+        room = await self._loaded(room_id)
+        return room.version, serialization.dumps_str(self._state_doc(room, snapshot=True))
+
+    async def get_answers_json(self, round_id: int) -> str:
+        room = await self._room_for_round(round_id)
+        if room is None or room.round is None or room.round[0] != round_id:
+            await self.flush()
+            return await dbmod.get_answers_json(round_id)
+        return serialization.dumps_str(self._answer_docs(room))
+
+    async def get_room_summary(self, room_id: int) -> Optional[RoomSummary]:
+        room = self.rooms.get(room_id)
+        if room is None:
+            # Not worth loading a whole room for its counters
+            await self.flush()
+            return await dbmod.get_room_summary(room_id)
+        rd = room.round
+        return RoomSummary(room.id, room.code, room.status, room.version, len(room.players),
+                           rd[0] if rd else None, rd[2] if rd else None,
+                           len(room.answers), sum(1 for a in room.answers.values() if a[2]))
+
+    async def list_active_rooms(self, limit: int = 50) -> List[RoomSummary]:
+        await self.flush()
+        return await dbmod.list_active_rooms(limit)
+
+    # ---------------- writes -----------------
+
+    async def join_room(self, room_code: str, user_id: int) -> Dict[str, Any]:
+        # Joins are rare: write through, then mirror into memory if loaded
+        await self.flush()
+        result = await dbmod.join_room(room_code, user_id)
+        room = self.rooms.get(result["room"].id)
+        if room is not None and user_id not in room.players:
+            p = result["player"]
+            room.players[user_id] = [p.player_id, p.name, p.super_cards]
+            room.version += 1  # db.join_room bumped it for the new player
+        return result
+
+    async def set_question(self, room_id: int, text: str) -> Round:
+        text = (text or "").strip()
+        if not text or len(text) > 200:
+            raise ValueError("Вопрос пустой или слишком длинный (≤200)")
+        room = await self._room(room_id)
+        if room is None:
+            raise ValueError("Комната не найдена")
+        if room.round is not None:
+            if room.round[2] == "collecting":
+                room.round[2] = "discussion"
+            self._round_room.pop(room.round[0], None)
+        self._queue("UPDATE rounds SET status='discussion' WHERE room_id=? AND status='collecting'", (room_id,))
+        self._next_round_id += 1
+        rd = [self._next_round_id, text, "collecting", _now()]
+        room.round = rd
+        room.answers = {}
+        room.answer_by_user = {}
+        self._round_room[rd[0]] = room_id
+        self._queue("INSERT INTO rounds (id, room_id, question, status, created_at) VALUES (?,?,?,?,?)",
+                    (rd[0], room_id, rd[1], rd[2], rd[3]))
+        self._bump(room)
+        return Round(rd[0], room_id, rd[1], rd[2], rd[3])
+
+    async def close_round(self, room_id: int) -> None:
+        room = await self._room(room_id)
+        if room is not None and room.round is not None and room.round[2] == "collecting":
+            room.round[2] = "discussion"
+            self._queue("UPDATE rounds SET status='discussion' WHERE room_id=? AND status='collecting'", (room_id,))
+            self._bump(room)
+
+    async def submit_answer(self, round_id: int, user_id: int, text: str) -> AnswerRow:
+        text = (text or "").strip()
+        if not text or len(text) > 300:
+            raise ValueError("Ответ пустой или слишком длинный (≤300)")
+        room = await self._room_for_round(round_id)
+        if room is None:
+            raise ValueError("Раунд не найден")
+        if room.round is None or room.round[0] != round_id or room.round[2] != "collecting":
+            raise ValueError("Сбор ответов завершён")
+        if user_id in room.answer_by_user:
+            raise ValueError("Вы уже отправили ответ в этом раунде")
+        p = room.players.get(user_id)
+        if p is not None:
+            name = p[1]
+        else:
+            user = await dbmod.get_user_by_id(user_id)
+            if user is None:
+                raise ValueError("Пользователь не найден")
+            name = user["name"]
+            # Re-check after the await: the round may have moved on meanwhile
+            if room.round is None or room.round[0] != round_id or room.round[2] != "collecting":
+                raise ValueError("Сбор ответов завершён")
+            if user_id in room.answer_by_user:
+                raise ValueError("Вы уже отправили ответ в этом раунде")
+        self._next_answer_id += 1
+        aid, created = self._next_answer_id, _now()
+        room.answers[aid] = [user_id, text, 0, None, created, name]
+        room.answer_by_user[user_id] = aid
+        self._queue("INSERT INTO answers (id, round_id, user_id, text, created_at) VALUES (?,?,?,?,?)",
+                    (aid, round_id, user_id, text, created))
+        self._bump(room)
+        return AnswerRow(aid, round_id, user_id, text, 0, None, created)
+
+    async def reveal_answer(self, round_id: int, answer_id: int, actor_user_id: int) -> Answer:
+        room = await self._room_for_round(round_id)
+        if room is None:
+            raise ValueError("Ответ не найден")
+        if room.round is None or room.round[0] != round_id:
+            # Past round: let the database check it, then mirror the spent card
+            await self.flush()
+            result = await dbmod.reveal_answer(round_id, answer_id, actor_user_id)
+            p = room.players.get(actor_user_id)
+            if p:
+                p[2] -= 1
+            room.version += 1
+            return result
+        a = room.answers.get(answer_id)
+        if a is None:
+            raise ValueError("Ответ не найден")
+        if a[2] == 1:
+            raise ValueError("Этот ответ уже раскрыт")
+        if a[0] == actor_user_id:
+            raise ValueError("Нельзя раскрыть свой собственный ответ")
+        p = room.players.get(actor_user_id)
+        if p is None:
+            raise ValueError("Вы не являетесь игроком этой комнаты")
+        if p[2] <= 0:
+            raise ValueError("У вас нет супер-карт")
+        p[2] -= 1
+        a[2], a[3] = 1, actor_user_id
+        self._queue("UPDATE room_players SET super_cards=super_cards-1 WHERE id=? AND super_cards>0", (p[0],))
+        self._queue("UPDATE answers SET revealed=1, revealed_by_user_id=? WHERE id=?", (actor_user_id, answer_id))
+        self._bump(room)
+        return Answer(answer_id, a[1], 1, a[5])
@@ -0,0 +1,193 @@
+from __future__ import annotations
+"""
+Room lifecycle: close idle rooms, archive finished ones, compact the file.
+
+A sweep runs three steps:
+
+1. close: active rooms with no activity (rooms.updated_at, bumped by every
+   room write) for `idle_ttl` seconds become 'closed';
+2. archive: rooms closed, and not written to, for `archive_after` seconds
+   (closed rooms still take round and answer writes) are folded into one JSON
+   row each in room_archive (in the main DB, or a separate file given as
+   `archive_path`) and deleted, cascading to room_players, rounds and answers;
+3. compact: freed pages are returned with PRAGMA incremental_vacuum (files
+   created before auto_vacuum=INCREMENTAL are converted by `db.py --init`).
+
+The hot tables then only hold live games, which keeps idx_rounds_room and
+idx_answers_round small enough to stay in the page cache.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import aiosqlite
+
+from database import db as dbmod
+
+logger = logging.getLogger(__name__)
+
+RoomsHook = Callable[[List[int]], Awaitable[None]]
+
+_ARCHIVE_TABLE = """
+    CREATE TABLE IF NOT EXISTS {schema}.room_archive (
+        room_id INTEGER PRIMARY KEY,
+        code TEXT NOT NULL,
+        owner_user_id INTEGER NOT NULL,
+        created_at DATETIME,
+        closed_at INTEGER,
+        archived_at INTEGER NOT NULL,
+        data TEXT NOT NULL
+    )
+"""
+
+# One document per room: players as [user_id, super_cards], rounds with their
+# answers as [user_id, text, revealed, revealed_by_user_id]
+_ARCHIVE_ROWS = """
+    INSERT OR REPLACE INTO {schema}.room_archive (room_id, code, owner_user_id, created_at, closed_at, archived_at, data)
+    SELECT r.id, r.code, r.owner_user_id, r.created_at, r.closed_at, strftime('%s','now'),
+        json_object(
+            'players', (SELECT json_group_array(json_array(p.user_id, p.super_cards))
+                        FROM room_players p WHERE p.room_id = r.id),
+            'rounds', (SELECT json_group_array(json_object(
+                            'question', rd.question, 'created_at', rd.created_at,
+                            'answers', (SELECT json_group_array(json_array(a.user_id, a.text, a.revealed, a.revealed_by_user_id))
+                                        FROM answers a WHERE a.round_id = rd.id)))
+                       FROM rounds rd WHERE rd.room_id = r.id)
+        )
+    FROM rooms r WHERE r.id IN ({ids})
+"""
+
+class RoomLifecycle:
+    def __init__(self, idle_ttl: float = 6 * 3600, archive_after: float = 3600, archive_path: str = "",
+                 interval: float = 300, batch_size: int = 500, vacuum_pages: int = 2000,
+                 engine: Optional[Any] = None, on_closed: Optional[RoomsHook] = None,
+                 on_archived: Optional[RoomsHook] = None):
+        self.idle_ttl = idle_ttl
+        self.archive_after = archive_after
+        self.archive_path = archive_path
+        self.interval = interval
+        self.batch_size = batch_size
+        self.vacuum_pages = vacuum_pages
+        # RoomEngine: flushed before a sweep so updated_at is current, and told to forget rooms
+        self.engine = engine
+        self.on_closed = on_closed
+        self.on_archived = on_archived
+        self._task: Optional[asyncio.Task] = None
+        self._warned_vacuum = False
+
+    def start(self) -> "RoomLifecycle":
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+        return self
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("Room lifecycle sweep failed")
+
+    async def sweep(self) -> Dict[str, int]:
+        closed = await self.close_idle()
+        archived = await self.archive_closed()
+        freed = await self.compact() if archived else 0
+        if closed or archived:
+            logger.info("Lifecycle: closed %d rooms, archived %d, freed %d pages", len(closed), len(archived), freed)
+        return {"closed": len(closed), "archived": len(archived), "freed_pages": freed}
+
+    async def close_idle(self) -> List[int]:
+        if self.engine is not None:
+            await self.engine.flush()
+        async with dbmod._connect(write=True) as db:
+            cur = await db.execute("""
+                UPDATE rooms SET status='closed', closed_at=strftime('%s','now'), version=version+1
+                WHERE status='active' AND updated_at < strftime('%s','now') - ?
+                RETURNING id
+            """, (int(self.idle_ttl),))
+            ids = [row[0] for row in await cur.fetchall()]
+            await db.commit()
+        await self._forget(ids, self.on_closed)
+        return ids
+
+    async def archive_closed(self) -> List[int]:
+        archived: List[int] = []
+        if self.engine is not None:
+            await self.engine.flush()
+        async with dbmod._connect(write=True) as db:
+            schema = await self._attach(db)
+            try:
+                while True:
+                    cur = await db.execute("""
+                        SELECT id FROM rooms
+                        WHERE status='closed' AND COALESCE(closed_at, 0) < strftime('%s','now') - :after
+                          AND COALESCE(updated_at, 0) < strftime('%s','now') - :after
+                        LIMIT :limit
+                    """, {"after": int(self.archive_after), "limit": self.batch_size})
+                    ids = [row[0] for row in await cur.fetchall()]
+                    if not ids:
+                        break
+                    marks = ",".join("?" * len(ids))
+                    await db.execute(_ARCHIVE_ROWS.format(schema=schema, ids=marks), ids)
+                    # ON DELETE CASCADE takes room_players, rounds and answers with it
+                    await db.execute(f"DELETE FROM rooms WHERE id IN ({marks})", ids)
+                    await db.execute(f"DELETE FROM ws_events WHERE room_id IN ({marks})", ids)
+                    await db.commit()
+                    archived += ids
+                    if len(ids) < self.batch_size:
+                        break
+            finally:
+                if db.in_transaction:
+                    await db.rollback()
+                if schema != "main":
+                    await db.execute("DETACH DATABASE archive")
+        await self._forget(archived, self.on_archived)
+        return archived
+
+    async def _attach(self, db: aiosqlite.Connection) -> str:
+        if not self.archive_path:
+            return "main"
+        await db.execute("ATTACH DATABASE ? AS archive", (self.archive_path,))
+        await db.execute(_ARCHIVE_TABLE.format(schema="archive"))
+        await db.commit()
+        return "archive"
+
+    async def compact(self) -> int:
+        """Release free pages to the filesystem; returns how many were free before.
+
+        Only files in auto_vacuum=INCREMENTAL mode are compacted: converting one
+        rebuilds the whole file, which is left to `python database/db.py --init`.
+        """
+        async with dbmod._connect(write=True) as db:
+            cur = await db.execute("PRAGMA auto_vacuum")
+            if (await cur.fetchone())[0] != 2:
+                if not self._warned_vacuum:
+                    logger.warning("%s is not in auto_vacuum=INCREMENTAL mode, skipping compaction; "
+                                   "run `python database/db.py --init` once to convert it", dbmod._DB_PATH)
+                    self._warned_vacuum = True
+                return 0
+            cur = await db.execute("PRAGMA freelist_count")
+            free = (await cur.fetchone())[0]
+            cur = await db.execute(f"PRAGMA incremental_vacuum({int(self.vacuum_pages)})")
+            await cur.fetchall()
+        return free
+
+    async def _forget(self, ids: List[int], hook: Optional[RoomsHook]) -> None:
+        if not ids:
+            return
+        for room_id in ids:
+            dbmod.invalidate_room(room_id)
+        if self.engine is not None:
+            for room_id in ids:
+                self.engine.evict(room_id)
+        if hook is not None:
+            await hook(ids)
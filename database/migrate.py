@@ -0,0 +1,70 @@
+from __future__ import annotations
+"""
+Versioned schema migrations.
+
+Migrations are numbered SQL files in database/migrations (0001_initial.sql,
+0002_....sql) applied in order. The applied version is kept in the
+schema_version table; each migration runs in its own IMMEDIATE transaction
+together with its version row, so concurrent starters cannot apply it twice.
+"""
+import sqlite3
+from pathlib import Path
+from typing import List, Tuple
+
+import aiosqlite
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+
+def load_migrations(directory: Path = MIGRATIONS_DIR) -> List[Tuple[int, str, str]]:
+    """Return (version, name, sql) for every NNNN_name.sql file, ordered by version."""
+    found = []
+    for path in sorted(directory.glob("*.sql")):
+        version = int(path.name.split("_", 1)[0])
+        found.append((version, path.stem, path.read_text(encoding="utf-8")))
+    return found
+
+def split_statements(script: str) -> List[str]:
+    statements, buf = [], ""
+    for line in script.splitlines(keepends=True):
+        buf += line
+        if sqlite3.complete_statement(buf):
+            if buf.strip():
+                statements.append(buf.strip())
+            buf = ""
+    if buf.strip() and not buf.strip().startswith("--"):
+        statements.append(buf.strip())
+    return statements
+
+async def current_version(db: aiosqlite.Connection) -> int:
+    cur = await db.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    return (await cur.fetchone())[0]
+
+async def migrate(db: aiosqlite.Connection) -> int:
+    """Apply pending migrations on a connection opened with isolation_level=None.
+    Returns the resulting schema version."""
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    version = await current_version(db)
+    for number, name, sql in load_migrations():
+        if number <= version:
+            continue
+        await db.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have applied it while we waited for the lock
+            if number <= await current_version(db):
+                await db.execute("ROLLBACK")
+                continue
+            for stmt in split_statements(sql):
+                await db.execute(stmt)
+            await db.execute("INSERT INTO schema_version (version, name) VALUES (?,?)", (number, name))
+            await db.execute("COMMIT")
+        except BaseException:
+            await db.execute("ROLLBACK")
+            raise
+        version = number
+    return await current_version(db)
@@ -0,0 +1,10 @@
+-- Room events shared between API processes (api/bus.py SQLiteBus)
+CREATE TABLE IF NOT EXISTS ws_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    room_id INTEGER NOT NULL,
+    origin TEXT NOT NULL,
+    body TEXT NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_ws_events_created ON ws_events(created_at);
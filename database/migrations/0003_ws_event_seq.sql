@@ -0,0 +1,4 @@
+-- Per-room monotonically increasing event sequence for resumable subscriptions
+ALTER TABLE ws_events ADD COLUMN seq INTEGER NOT NULL DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS idx_ws_events_room_seq ON ws_events(room_id, seq);
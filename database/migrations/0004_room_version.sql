@@ -0,0 +1,2 @@
+-- Bumped by every write that changes what a room snapshot shows (ETag source)
+ALTER TABLE rooms ADD COLUMN version INTEGER NOT NULL DEFAULT 0;
@@ -0,0 +1,17 @@
+-- Room activity and closing times (unix seconds) for database/lifecycle.py
+ALTER TABLE rooms ADD COLUMN updated_at INTEGER;
+ALTER TABLE rooms ADD COLUMN closed_at INTEGER;
+UPDATE rooms SET updated_at = CAST(strftime('%s', created_at) AS INTEGER);
+
+CREATE INDEX IF NOT EXISTS idx_rooms_status_updated ON rooms(status, updated_at);
+
+-- Finished rooms, one compact JSON document each (players, rounds, answers)
+CREATE TABLE IF NOT EXISTS room_archive (
+    room_id INTEGER PRIMARY KEY,
+    code TEXT NOT NULL,
+    owner_user_id INTEGER NOT NULL,
+    created_at DATETIME,
+    closed_at INTEGER,
+    archived_at INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
@@ -0,0 +1,5 @@
+-- Player lists (get_room_state, get_room_snapshot) read user_id and super_cards
+-- per room straight from this index; reveal_answer's card check hits the same keys
+CREATE INDEX IF NOT EXISTS idx_room_players_cards ON room_players(room_id, user_id, super_cards);
+-- Covered by the UNIQUE(room_id, user_id) index and the one above
+DROP INDEX IF EXISTS idx_room_players_room;
@@ -0,0 +1,73 @@
+-- One row per room with the counters lobby lists and status polls show, kept
+-- current by the triggers below, so reading them never scans room_players or
+-- answers. Triggers rather than code in database/db.py: the room engine's
+-- write-behind SQL, the answer batcher and lifecycle cascades all go through them.
+CREATE TABLE IF NOT EXISTS room_summary (
+    room_id INTEGER PRIMARY KEY,
+    player_count INTEGER NOT NULL DEFAULT 0,
+    current_round_id INTEGER,
+    round_status TEXT,
+    -- Answers to the current round only
+    answer_count INTEGER NOT NULL DEFAULT 0,
+    revealed_count INTEGER NOT NULL DEFAULT 0,
+    FOREIGN KEY (room_id) REFERENCES rooms(id) ON DELETE CASCADE
+);
+
+INSERT OR IGNORE INTO room_summary (room_id, player_count, current_round_id, round_status, answer_count, revealed_count)
+SELECT r.id,
+       (SELECT COUNT(*) FROM room_players p WHERE p.room_id = r.id),
+       rd.id, rd.status,
+       (SELECT COUNT(*) FROM answers a WHERE a.round_id = rd.id),
+       (SELECT COUNT(*) FROM answers a WHERE a.round_id = rd.id AND a.revealed = 1)
+FROM rooms r
+LEFT JOIN rounds rd ON rd.id = (SELECT MAX(id) FROM rounds WHERE room_id = r.id);
+
+CREATE TRIGGER IF NOT EXISTS room_summary_room AFTER INSERT ON rooms
+BEGIN
+    INSERT OR IGNORE INTO room_summary (room_id) VALUES (NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS room_summary_join AFTER INSERT ON room_players
+BEGIN
+    UPDATE room_summary SET player_count = player_count + 1 WHERE room_id = NEW.room_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS room_summary_leave AFTER DELETE ON room_players
+BEGIN
+    UPDATE room_summary SET player_count = player_count - 1 WHERE room_id = OLD.room_id;
+END;
+
+-- Round ids only grow, so a new round is always the current one
+CREATE TRIGGER IF NOT EXISTS room_summary_round AFTER INSERT ON rounds
+BEGIN
+    UPDATE room_summary
+    SET current_round_id = NEW.id, round_status = NEW.status, answer_count = 0, revealed_count = 0
+    WHERE room_id = NEW.room_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS room_summary_round_status AFTER UPDATE OF status ON rounds
+BEGIN
+    UPDATE room_summary SET round_status = NEW.status
+    WHERE room_id = NEW.room_id AND current_round_id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS room_summary_answer AFTER INSERT ON answers
+BEGIN
+    UPDATE room_summary
+    SET answer_count = answer_count + 1, revealed_count = revealed_count + NEW.revealed
+    WHERE room_id = (SELECT room_id FROM rounds WHERE id = NEW.round_id) AND current_round_id = NEW.round_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS room_summary_reveal AFTER UPDATE OF revealed ON answers
+WHEN NEW.revealed <> OLD.revealed
+BEGIN
+    UPDATE room_summary SET revealed_count = revealed_count + NEW.revealed - OLD.revealed
+    WHERE room_id = (SELECT room_id FROM rounds WHERE id = NEW.round_id) AND current_round_id = NEW.round_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS room_summary_answer_gone AFTER DELETE ON answers
+BEGIN
+    UPDATE room_summary
+    SET answer_count = answer_count - 1, revealed_count = revealed_count - OLD.revealed
+    WHERE room_id = (SELECT room_id FROM rounds WHERE id = OLD.round_id) AND current_round_id = OLD.round_id;
+END;
@@ -0,0 +1,216 @@
+from __future__ import annotations
+"""
+Long-lived aiosqlite connection pool: one writer, several readers.
+
+SQLite allows a single writer at a time, so all writes share one connection
+guarded by a lock, while reads are spread over a small set of reader
+connections. PRAGMAs are applied once per connection when it is opened.
+"""
+import asyncio
+import logging
+import sqlite3
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+import aiosqlite
+from aiosqlite.context import contextmanager
+
+import metrics
+from database import codes
+
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger("database.slow")
+
+# Per-connection PRAGMAs (foreign_keys is per-connection in SQLite).
+DEFAULT_PRAGMAS: Dict[str, object] = {
+    "foreign_keys": "ON",
+}
+
+# Storage profiles selectable with DB_PROFILE. "wal" lets readers proceed while
+# a write is in progress; synchronous=NORMAL is durable across app crashes and
+# only risks the last commits on power loss.
+STORAGE_PROFILES: Dict[str, Dict[str, object]] = {
+    "default": dict(DEFAULT_PRAGMAS),
+    "wal": {
+        **DEFAULT_PRAGMAS,
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "mmap_size": 64 * 1024 * 1024,
+        "cache_size": -16000,  # KiB
+    },
+}
+
+def profile_pragmas(profile: str) -> Dict[str, object]:
+    try:
+        return dict(STORAGE_PROFILES[profile])
+    except KeyError:
+        raise ValueError(f"Unknown storage profile: {profile!r}") from None
+
+async def apply_pragmas(db: aiosqlite.Connection, pragmas: Dict[str, object]) -> None:
+    for name, value in pragmas.items():
+        await db.execute(f"PRAGMA {name}={value}")
+
+async def register_functions(db: aiosqlite.Connection) -> None:
+    """Application SQL functions used by queries (see database/codes.py)."""
+    await db.create_function("room_code", 1, codes.encode, deterministic=True)
+
+_QUERY = metrics.histogram("db_query_seconds", "SQLite statement execution time").labels()
+_COMMIT = metrics.histogram("db_commit_seconds", "SQLite commit time").labels()
+_BUSY = metrics.counter("db_busy", "Statements that failed with SQLITE_BUSY / database is locked").labels()
+# Statements slower than this many seconds are logged with their parameters; 0 = off
+_slow_query = 0.0
+
+def set_slow_query_log(ms: float) -> None:
+    global _slow_query
+    _slow_query = max(0.0, ms) / 1000
+
+def _log_slow(sql: str, parameters: Any, elapsed: float) -> None:
+    params = repr(parameters)
+    if len(params) > 200:
+        params = params[:200] + "…"
+    slow_logger.warning("%.1f ms: %s %s", elapsed * 1000, " ".join(sql.split()), params)
+
+class TimedConnection(aiosqlite.Connection):
+    """aiosqlite connection that records statement and commit times (see metrics.py)."""
+
+    @contextmanager
+    async def execute(self, sql: str, parameters: Optional[Iterable[Any]] = None) -> aiosqlite.Cursor:
+        t0 = time.perf_counter()
+        try:
+            return await super().execute(sql, parameters)
+        except sqlite3.OperationalError as e:
+            _count_busy(e)
+            raise
+        finally:
+            elapsed = time.perf_counter() - t0
+            _QUERY.observe(elapsed)
+            if _slow_query and elapsed >= _slow_query:
+                _log_slow(sql, parameters, elapsed)
+
+    @contextmanager
+    async def executemany(self, sql: str, parameters: Iterable[Iterable[Any]]) -> aiosqlite.Cursor:
+        t0 = time.perf_counter()
+        try:
+            return await super().executemany(sql, parameters)
+        except sqlite3.OperationalError as e:
+            _count_busy(e)
+            raise
+        finally:
+            elapsed = time.perf_counter() - t0
+            _QUERY.observe(elapsed)
+            if _slow_query and elapsed >= _slow_query:
+                _log_slow(sql, "(executemany)", elapsed)
+
+    async def commit(self) -> None:
+        t0 = time.perf_counter()
+        try:
+            await super().commit()
+        except sqlite3.OperationalError as e:
+            _count_busy(e)
+            raise
+        finally:
+            elapsed = time.perf_counter() - t0
+            _COMMIT.observe(elapsed)
+            if _slow_query and elapsed >= _slow_query:
+                _log_slow("COMMIT", (), elapsed)
+
+def _count_busy(e: sqlite3.OperationalError) -> None:
+    # busy_timeout retries inside SQLite; what reaches us is a wait that ran out
+    msg = str(e)
+    if "locked" in msg or "busy" in msg:
+        _BUSY.inc()
+
+async def open_connection(path: str, pragmas: Optional[Dict[str, object]] = None) -> aiosqlite.Connection:
+    db = await TimedConnection(lambda: sqlite3.connect(path), 64)
+    await apply_pragmas(db, DEFAULT_PRAGMAS if pragmas is None else pragmas)
+    await register_functions(db)
+    return db
+
+class ConnectionPool:
+    def __init__(self, path: str, size: int = 4, pragmas: Optional[Dict[str, object]] = None):
+        self.path = path
+        self.size = max(1, size)
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._write_lock = asyncio.Lock()
+        self._readers: "asyncio.Queue[aiosqlite.Connection]" = asyncio.Queue()
+        self._all: List[aiosqlite.Connection] = []
+        self._checkpointer: Optional[asyncio.Task] = None
+        self.closed = True
+        # Writers that found the write lock taken, and their total wait in seconds
+        self.write_waits = 0
+        self.write_wait_time = 0.0
+
+    async def open(self) -> "ConnectionPool":
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._writer = await open_connection(self.path, self.pragmas)
+        self._all.append(self._writer)
+        for _ in range(self.size):
+            db = await open_connection(self.path, self.pragmas)
+            self._all.append(db)
+            self._readers.put_nowait(db)
+        self.closed = False
+        return self
+
+    def start_checkpointer(self, interval: float) -> None:
+        """Periodically fold the WAL back into the main DB file so it stays small."""
+        if interval > 0 and self._checkpointer is None:
+            self._checkpointer = asyncio.create_task(self._checkpoint_loop(interval))
+
+    async def _checkpoint_loop(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.checkpoint()
+            except Exception:
+                logger.exception("WAL checkpoint failed")
+
+    async def checkpoint(self, mode: str = "PASSIVE") -> Optional[tuple]:
+        # PASSIVE never waits for the writer, so a reader connection is enough
+        async with self.reader() as db:
+            cur = await db.execute(f"PRAGMA wal_checkpoint({mode})")
+            row = await cur.fetchone()
+            return tuple(row) if row else None
+
+    async def close(self) -> None:
+        self.closed = True
+        if self._checkpointer is not None:
+            self._checkpointer.cancel()
+            try:
+                await self._checkpointer
+            except asyncio.CancelledError:
+                pass
+            self._checkpointer = None
+        async with self._write_lock:
+            for db in self._all:
+                await db.close()
+            self._all.clear()
+            self._writer = None
+            self._readers = asyncio.Queue()
+
+    @asynccontextmanager
+    async def reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        db = await self._readers.get()
+        try:
+            yield db
+        finally:
+            self._readers.put_nowait(db)
+
+    @asynccontextmanager
+    async def writer(self) -> AsyncIterator[aiosqlite.Connection]:
+        t0 = time.perf_counter() if self._write_lock.locked() else None
+        async with self._write_lock:
+            if t0 is not None:
+                self.write_waits += 1
+                self.write_wait_time += time.perf_counter() - t0
+            db = self._writer
+            assert db is not None, "pool is closed"
+            try:
+                yield db
+            finally:
+                # Never hand the shared writer back with a half-done transaction.
+                if db.in_transaction:
+                    await db.rollback()
@@ -0,0 +1,130 @@
+from __future__ import annotations
+"""
+Typed rows returned by database/db.py and the room engine.
+
+Dataclasses built straight from the sqlite3 tuple: connections return plain
+tuples (database/pool.py) and `Record.from_row` is set as the cursor's
+row_factory, so a fetched row costs one record instead of a Row plus a dict.
+Field order is the column order of the SELECTs and RETURNING lists that
+build them.
+
+Slotted: a record holds its fields and nothing else, smaller than a dict
+or a dict-backed dataclass (benchmarks/bench_rows.py). The price is JSON
+encoding: orjson reads a slotted dataclass field by field, several times
+slower than a dict, so views sent to clients in bulk are built by SQLite
+(the *_json functions in database/db.py) rather than encoded from records.
+
+They keep read access by key (`rec["name"]`, `rec.get()`, `.items()`,
+`dict(rec)`, `{**rec}`), so callers written against dict rows work
+unchanged; api/serialization.py's stdlib fallback encodes `as_dict()`.
+Cached users and rooms are shared between callers: treat records as
+read-only and use dataclasses.replace() for a changed copy.
+"""
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Iterator, Optional
+
+@dataclass(slots=True)
+class Record:
+    @classmethod
+    def from_row(cls, cursor: Any, row: tuple) -> "Record":
+        """sqlite3 row_factory: (cursor, tuple) -> record."""
+        return cls(*row)
+
+    @classmethod
+    def columns(cls) -> tuple:
+        return tuple(f.name for f in fields(cls))
+
+    # __match_args__ is the dataclass's field names, in order, kept on the class
+    def __getitem__(self, key: str) -> Any:
+        if key in self.__match_args__:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.__match_args__
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__match_args__)
+
+    def __len__(self) -> int:
+        return len(self.__match_args__)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self.__match_args__ else default
+
+    # Dict views, so they compare and combine like a dict row's
+    def keys(self):
+        return self.as_dict().keys()
+
+    def values(self):
+        return self.as_dict().values()
+
+    def items(self):
+        return self.as_dict().items()
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {k: getattr(self, k) for k in self.__match_args__}
+
+@dataclass(slots=True)
+class User(Record):
+    id: int
+    tg_user_id: str
+    name: str
+    created_at: Optional[str]
+
+@dataclass(slots=True)
+class Room(Record):
+    """Room metadata; version/updated_at change on every write and are not part of it."""
+    id: int
+    code: str
+    owner_user_id: int
+    status: str
+    created_at: Optional[str]
+    closed_at: Optional[int]
+
+@dataclass(slots=True)
+class RoomSummary(Record):
+    """A room's status and the room_summary counters, for lobby lists and status polls."""
+    room_id: int
+    code: str
+    status: str
+    version: int
+    player_count: int
+    current_round_id: Optional[int]
+    round_status: Optional[str]
+    answer_count: int
+    revealed_count: int
+
+@dataclass(slots=True)
+class Player(Record):
+    player_id: int
+    user_id: int
+    name: str
+    super_cards: int
+
+@dataclass(slots=True)
+class Round(Record):
+    id: int
+    room_id: int
+    question: str
+    status: str
+    created_at: Optional[str]
+
+@dataclass(slots=True)
+class Answer(Record):
+    """An answer as players see it: the author only once revealed."""
+    answer_id: int
+    text: str
+    revealed: int
+    author_display: Optional[str]
+
+@dataclass(slots=True)
+class AnswerRow(Record):
+    """A full answers-table row, as submit_answer returns it to its author."""
+    id: int
+    round_id: int
+    user_id: int
+    text: str
+    revealed: int
+    revealed_by_user_id: Optional[int]
+    created_at: Optional[str]
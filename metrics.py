@@ -0,0 +1,175 @@
+"""
+In-process metrics rendered in the Prometheus text format (GET /metrics).
+
+No client library: a metric family hands out one child per label set, and call
+sites fetch their child once (at import, decoration or first use) and keep it,
+so recording is an attribute update with no lookups or allocations on the hot
+path. Gauges are callbacks read at scrape time.
+
+    QUERY = histogram("db_query_seconds", "Statement execution time")
+    QUERY.labels().observe(elapsed)
+"""
+from __future__ import annotations
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Seconds; tuned for SQLite calls and in-process request handling
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+class CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, n: int = 1) -> None:
+        self.value += n
+
+class HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class _Family:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values: str):
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {values}")
+        child = self.children.get(values)
+        if child is None:
+            child = self.children[values] = self._child()
+        return child
+
+    def _child(self):
+        raise NotImplementedError
+
+    def _samples(self) -> Iterable[Tuple[str, Tuple[str, ...], float]]:
+        raise NotImplementedError
+
+class Counter(_Family):
+    kind = "counter"
+
+    def _child(self) -> CounterChild:
+        return CounterChild()
+
+    def _samples(self):
+        for values, child in self.children.items():
+            yield self.name + "_total", values, child.value
+
+class Histogram(_Family):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.bounds = tuple(sorted(buckets))
+
+    def _child(self) -> HistogramChild:
+        return HistogramChild(self.bounds)
+
+    def _samples(self):
+        # Rendering "le" needs its own label, handled in render()
+        for values, child in self.children.items():
+            yield "", values, child
+
+class HistogramGauge(Histogram):
+    """Histogram of values read at scrape time (e.g. current room sizes) instead of observed."""
+
+    def __init__(self, name: str, help: str, fn: Callable, buckets: Sequence[float]):
+        super().__init__(name, help, (), buckets)
+        self.fn = fn
+
+    def _samples(self):
+        child = HistogramChild(self.bounds)
+        for value in self.fn():
+            child.observe(value)
+        yield "", (), child
+
+class Gauge(_Family):
+    """Read at scrape time: `fn` returns the value, or (label values, value) pairs when labelled.
+
+    kind="counter" exposes a monotonic count kept elsewhere (e.g. WSManager.evicted).
+    """
+
+    def __init__(self, name: str, help: str, fn: Callable, labelnames: Sequence[str] = (), kind: str = "gauge"):
+        super().__init__(name, help, labelnames)
+        self.fn = fn
+        self.kind = kind
+
+    def _samples(self):
+        result = self.fn()
+        if self.labelnames:
+            for values, value in result:
+                yield self.name, tuple(values), value
+        else:
+            yield self.name, (), result
+
+REGISTRY: Dict[str, _Family] = {}
+
+def _register(family: _Family) -> _Family:
+    # Re-registering replaces the old family (app factories, tests)
+    REGISTRY[family.name] = family
+    return family
+
+def counter(name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+    return _register(Counter(name, help, labelnames))
+
+def histogram(name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram(name, help, labelnames, buckets))
+
+def histogram_gauge(name: str, help: str, fn: Callable, buckets: Sequence[float]) -> HistogramGauge:
+    return _register(HistogramGauge(name, help, fn, buckets))
+
+def gauge(name: str, help: str, fn: Callable, labelnames: Sequence[str] = (), kind: str = "gauge") -> Gauge:
+    return _register(Gauge(name, help, fn, labelnames, kind))
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{k}="{_escape(str(v))}"' for k, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _num(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render() -> str:
+    lines: List[str] = []
+    for family in list(REGISTRY.values()):
+        try:
+            samples = list(family._samples())
+        except Exception as e:  # a broken gauge callback must not take the endpoint down
+            lines.append(f"# {family.name}: {e!r}")
+            continue
+        lines.append(f"# HELP {family.name} {family.help}")
+        lines.append(f"# TYPE {family.name} {family.kind}")
+        if isinstance(family, Histogram):
+            for _, values, child in samples:
+                cumulative = 0
+                for bound, n in zip(family.bounds + (float("inf"),), child.counts):
+                    cumulative += n
+                    le = 'le="' + ("+Inf" if bound == float("inf") else _num(bound)) + '"'
+                    lines.append(f"{family.name}_bucket{_labels(family.labelnames, values, le)} {cumulative}")
+                lines.append(f"{family.name}_sum{_labels(family.labelnames, values)} {_num(child.sum)}")
+                lines.append(f"{family.name}_count{_labels(family.labelnames, values)} {child.count}")
+        else:
+            for name, values, value in samples:
+                lines.append(f"{name}{_labels(family.labelnames, values)} {_num(value)}")
+    return "\n".join(lines) + "\n"
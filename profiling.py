@@ -0,0 +1,97 @@
+"""
+Opt-in production diagnostics (PROFILING=true), for when a game night stalls:
+
+- LoopLagMonitor: how late the event loop wakes up from a short sleep, i.e.
+  how long some callback blocked it (event_loop_lag_seconds in /metrics, and a
+  warning above the threshold);
+- sample_stacks / folded: a wall-clock sampling profiler over every thread
+  (the event loop and the aiosqlite connection threads), dumped in the
+  "folded stacks" format that flamegraph.pl, speedscope and inferno read.
+
+The slow-query log lives with the connections (database/pool.py).
+Nothing here runs unless started, so with profiling off the cost is zero.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+_LAG = metrics.histogram("event_loop_lag_seconds", "Extra delay of the event loop waking from a short sleep",
+                         buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)).labels()
+
+class LoopLagMonitor:
+    def __init__(self, interval: float = 0.25, threshold: float = 0.1):
+        self.interval = interval
+        self.threshold = threshold
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> "LoopLagMonitor":
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+        return self
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            t0 = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - t0 - self.interval)
+            _LAG.observe(lag)
+            if lag > self.max_lag:
+                self.max_lag = lag
+            if lag >= self.threshold:
+                logger.warning("Event loop blocked for %.0f ms", lag * 1000)
+
+def _frame_label(code) -> str:
+    parts = code.co_filename.replace("\\", "/").rsplit("/", 2)
+    return f"{code.co_name} ({'/'.join(parts[-2:])}:{code.co_firstlineno})"
+
+def sample_stacks(seconds: float, interval: float = 0.005) -> Counter:
+    """Sample every other thread's stack for `seconds`; blocking, run it in a worker thread."""
+    me = threading.get_ident()
+    counts: Counter = Counter()
+    labels: Dict[object, str] = {}
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = _frame_label(code)
+                stack.append(label)
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            counts[";".join(reversed(stack))] += 1
+        time.sleep(interval)
+    return counts
+
+def folded(counts: Counter) -> str:
+    """One "frame;frame;frame count" line per distinct stack, root first."""
+    return "".join(f"{stack} {n}\n" for stack, n in counts.most_common())
+
+def default_output_name() -> str:
+    return f"profile-{os.getpid()}-{int(time.time())}.folded"
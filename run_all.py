@@ -0,0 +1,73 @@
+from __future__ import annotations
+"""
+API and bot in one process, on one event loop.
+
+The bot uses LocalGameService, so its commands hit the database directly
+instead of looping back over HTTP through WEBAPP_URL (often a public tunnel).
+With BOT_MODE=webhook Telegram posts updates to WEBHOOK_PATH on the API server.
+Single-process only: use run_api.py + run_bot.py for API_WORKERS > 1.
+
+    python run_all.py
+"""
+import asyncio
+import contextlib
+import logging
+
+import uvicorn
+
+from run_api import app, cfg
+from run_bot import build_bot, build_dispatcher, build_pipeline, build_storage, webhook_secret
+from bot.services import LocalGameService
+from bot.webhook import mount_webhook, register_webhook
+
+async def main():
+    game = LocalGameService(app)
+    bot = build_bot(cfg)
+    dp = build_dispatcher(game, build_storage(cfg))
+    pipeline = None
+    if cfg.BOT_MODE == "webhook":
+        # Telegram posts to the API server itself; no polling task
+        secret = webhook_secret(cfg)
+        pipeline = build_pipeline(cfg, dp, bot)
+        mount_webhook(app, pipeline, cfg.WEBHOOK_PATH, secret)
+
+    server = uvicorn.Server(uvicorn.Config(app, host="0.0.0.0", port=8000, log_level="info"))
+    serving = asyncio.create_task(server.serve())
+    # The bot needs the lifespan (migrations, pool, WS bus) up before its first update
+    while not server.started:
+        if serving.done():
+            return await serving
+        await asyncio.sleep(0.05)
+
+    if pipeline is not None:
+        await register_webhook(bot, dp, cfg.WEBHOOK_URL, cfg.WEBHOOK_PATH, secret)
+        try:
+            await serving
+        finally:
+            await pipeline.close()
+            await bot.session.close()
+            await dp.storage.close()
+            await game.close()
+        return
+
+    # uvicorn owns SIGINT/SIGTERM; polling is stopped when the server exits
+    polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False))
+    logging.info("Bot polling in-process")
+    try:
+        await asyncio.wait({serving, polling}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        polling.cancel()
+        try:
+            with contextlib.suppress(asyncio.CancelledError):
+                await polling
+        finally:
+            server.should_exit = True
+            await serving
+            await dp.storage.close()
+            await game.close()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except (KeyboardInterrupt, SystemExit):
+        pass
@@ -9,26 +9,75 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
 from config import get_config
-from database.db import ensure_initialized, set_db_path
+from database.db import (
+    ensure_initialized, set_db_path, open_pool, close_pool, open_answer_batcher, close_answer_batcher, configure_cache,
+)
+from database import codes
+from database.engine import RoomEngine
+from database.lifecycle import RoomLifecycle
+from database.pool import profile_pragmas, set_slow_query_log
 from api.routes.rooms import router as rooms_router
 from api.routes.prompts import router as prompts_router
 from api.routes.answers import router as answers_router
 from api.routes.reveals import router as reveals_router
 from api.routes.users import router as users_router
+from api.routes.admin import router as admin_router
 from api.ws import WSManager, router as ws_router
+from api import metrics as api_metrics
+from api import events
+from api.bus import make_bus
+from api.serialization import FastJSONResponse
+from profiling import LoopLagMonitor
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
 
 cfg = get_config()
 set_db_path(cfg.DB_PATH)
+codes.set_key(cfg.ROOM_CODE_KEY)
+
+async def _rooms_closed(room_ids):
+    for room_id in room_ids:
+        await app.state.ws_manager.broadcast(room_id, events.room_closed(room_id))
+
+async def _rooms_archived(room_ids):
+    for room_id in room_ids:
+        app.state.ws_manager.forget(room_id)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await ensure_initialized()
+    await open_pool(cfg.DB_POOL_SIZE, cfg.DB_PROFILE, cfg.DB_CHECKPOINT_INTERVAL)
+    configure_cache(cfg.CACHE_SIZE, cfg.CACHE_TTL)
+    await app.state.ws_manager.attach_bus(make_bus(cfg.EVENT_BUS, cfg.DB_PATH, profile_pragmas(cfg.DB_PROFILE)))
+    if cfg.ROOM_ENGINE:
+        app.state.room_engine = await RoomEngine(flush_interval=cfg.ROOM_ENGINE_FLUSH_MS / 1000).start()
+    elif cfg.ANSWER_BATCH_MS > 0:
+        # The room engine already writes behind in batches
+        open_answer_batcher(cfg.ANSWER_BATCH_MS / 1000)
+    lifecycle = RoomLifecycle(
+        idle_ttl=cfg.ROOM_IDLE_TTL, archive_after=cfg.ROOM_ARCHIVE_AFTER, archive_path=cfg.ARCHIVE_DB_PATH,
+        interval=cfg.LIFECYCLE_INTERVAL, engine=app.state.room_engine,
+        on_closed=_rooms_closed, on_archived=_rooms_archived,
+    ).start()
+    lag_monitor = None
+    if cfg.PROFILING:
+        set_slow_query_log(cfg.SLOW_QUERY_MS)
+        lag_monitor = LoopLagMonitor(threshold=cfg.LOOP_LAG_MS / 1000).start()
     logging.info("API started at %s", cfg.WEBAPP_URL)
-    yield
+    try:
+        yield
+    finally:
+        if lag_monitor is not None:
+            await lag_monitor.stop()
+        await lifecycle.stop()
+        if app.state.room_engine is not None:
+            await app.state.room_engine.stop()
+            app.state.room_engine = None
+        await app.state.ws_manager.close()
+        await close_answer_batcher()
+        await close_pool()
 
-app = FastAPI(title="Who Said That? API", lifespan=lifespan)
+app = FastAPI(title="Who Said That? API", lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # CORS (в проде сузьте домены)
 app.add_middleware(
@@ -39,8 +88,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if cfg.METRICS_ENABLED:
+    api_metrics.install(app)
+
 # WS менеджер в state
-app.state.ws_manager = WSManager()
+app.state.ws_manager = WSManager(
+    send_timeout=cfg.WS_SEND_TIMEOUT, queue_size=cfg.WS_QUEUE_SIZE, overflow=cfg.WS_OVERFLOW,
+    history_size=cfg.WS_HISTORY_SIZE,
+)
+app.state.room_engine = None
+# Токен для /admin/*: задаётся при импорте, как и остальной state, а не в lifespan
+app.state.admin_token = cfg.ADMIN_TOKEN
 
 # СНАЧАЛА подключаем API/WS роуты…
 app.include_router(rooms_router, prefix="")
@@ -49,6 +107,10 @@ app.include_router(answers_router, prefix="")
 app.include_router(reveals_router, prefix="")
 app.include_router(users_router, prefix="")
 app.include_router(ws_router, prefix="")
+if cfg.METRICS_ENABLED:
+    app.include_router(api_metrics.router, prefix="")
+if cfg.PROFILING:
+    app.include_router(admin_router, prefix="")
 
 # …и ТОЛЬКО ПОТОМ монтируем статику на корень
 web_dir = Path(__file__).resolve().parent / "webapp"
@@ -56,4 +118,6 @@ app.mount("/", StaticFiles(directory=str(web_dir), html=True), name="webapp")
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("run_api:app", host="0.0.0.0", port=8000, reload=False)
+    if cfg.API_WORKERS > 1 and (cfg.EVENT_BUS == "memory" or cfg.ROOM_ENGINE):
+        raise SystemExit("API_WORKERS > 1 требует EVENT_BUS=sqlite и ROOM_ENGINE=false")
+    uvicorn.run("run_api:app", host="0.0.0.0", port=8000, reload=False, workers=cfg.API_WORKERS)
@@ -1,15 +1,24 @@
 from __future__ import annotations
 import asyncio
 import logging
+import secrets
+from typing import Optional
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage
 
 from config import get_config
 from bot.handlers.start import router as start_router
 from bot.handlers.rooms import router as rooms_router
 from bot.handlers.admin import router as admin_router
-from bot.middlewares import RedactingLoggingMiddleware
+from bot.middlewares import RedactingLoggingMiddleware, UpdateMetricsMiddleware
+from bot.api_client import ApiClient
+from bot.services import GameService
+from bot.pipeline import UpdatePipeline
+from bot.fsm_storage import SQLiteStorage
+from database.pool import profile_pragmas
 
 logging.basicConfig(
     level=logging.INFO,
@@ -34,17 +43,71 @@ class TokenRedactor(logging.Filter):
 for name in ["aiogram", "httpx", "asyncio", "uvicorn", "uvicorn.error"]:
     logging.getLogger(name).addFilter(TokenRedactor())
 
-async def main():
-    cfg = get_config()
-    bot = Bot(token=cfg.BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-    dp = Dispatcher()
+def build_storage(cfg) -> BaseStorage:
+    if cfg.FSM_STORAGE == "sqlite":
+        return SQLiteStorage(cfg.DB_PATH, flush_interval=cfg.FSM_FLUSH_MS / 1000,
+                             cache_ttl=cfg.FSM_CACHE_TTL, state_ttl=cfg.FSM_STATE_TTL,
+                             pragmas=profile_pragmas(cfg.DB_PROFILE))
+    return MemoryStorage()
+
+def build_dispatcher(game: GameService, storage: Optional[BaseStorage] = None) -> Dispatcher:
+    """Dispatcher with all routers; handlers receive `game` as their backend."""
+    dp = Dispatcher(storage=storage or MemoryStorage())
     dp.update.middleware(RedactingLoggingMiddleware())
+    dp.update.middleware(UpdateMetricsMiddleware())
+    dp["game"] = game
 
     dp.include_router(start_router)
     dp.include_router(rooms_router)
     dp.include_router(admin_router)
+    return dp
+
+def build_bot(cfg) -> Bot:
+    return Bot(token=cfg.BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+
+def webhook_secret(cfg) -> str:
+    # set_webhook is called on every start, so a fresh random secret works too
+    return cfg.WEBHOOK_SECRET or secrets.token_urlsafe(32)
+
+def build_pipeline(cfg, dp: Dispatcher, bot: Bot) -> UpdatePipeline:
+    return UpdatePipeline(dp, bot, concurrency=cfg.BOT_CONCURRENCY, max_pending=cfg.BOT_QUEUE_SIZE)
+
+async def run_webhook(cfg, dp: Dispatcher, bot: Bot) -> None:
+    """Standalone webhook server on WEBHOOK_PORT (the API runs elsewhere)."""
+    import uvicorn
+    from fastapi import FastAPI
+    from bot.webhook import mount_webhook, register_webhook
 
-    await dp.start_polling(bot)
+    secret = webhook_secret(cfg)
+    pipeline = build_pipeline(cfg, dp, bot)
+    web = FastAPI(title="Who Said That? bot webhook")
+    if cfg.METRICS_ENABLED:
+        from api.metrics import router as metrics_router
+        web.include_router(metrics_router)
+    mount_webhook(web, pipeline, cfg.WEBHOOK_PATH, secret)
+    await register_webhook(bot, dp, cfg.WEBHOOK_URL, cfg.WEBHOOK_PATH, secret)
+    server = uvicorn.Server(uvicorn.Config(web, host="0.0.0.0", port=cfg.WEBHOOK_PORT, log_level="info"))
+    try:
+        await server.serve()
+    finally:
+        await pipeline.close()
+        await bot.session.close()
+
+async def main():
+    cfg = get_config()
+    bot = build_bot(cfg)
+    # Standalone bot: reach the game over HTTP through a shared, pooled client
+    game = ApiClient(cfg.WEBAPP_URL, timeout=cfg.BOT_API_TIMEOUT, retries=cfg.BOT_API_RETRIES)
+    dp = build_dispatcher(game, build_storage(cfg))
+
+    try:
+        if cfg.BOT_MODE == "webhook":
+            await run_webhook(cfg, dp, bot)
+        else:
+            await dp.start_polling(bot)
+    finally:
+        await dp.storage.close()
+        await game.close()
 
 if __name__ == "__main__":
     try:
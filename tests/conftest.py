@@ -0,0 +1,4 @@
+from database import codes
+
+# Room codes need a key; the app takes it from ROOM_CODE_KEY (config.py)
+codes.set_key("test-room-code-key")
@@ -18,3 +18,28 @@ async def test_answers_flow():
         ans = await dbmod.get_answers(rd["id"])
         assert len(ans) == 1
         assert ans[0]["revealed"] == 0
+
+@pytest.mark.asyncio
+async def test_answer_events_carry_full_rows():
+    from api import events
+    with tempfile.TemporaryDirectory() as td:
+        dbmod.set_db_path(os.path.join(td, "t.db"))
+        await dbmod.ensure_initialized()
+        u1 = await dbmod.get_or_create_user("2101", "Cat")
+        u2 = await dbmod.get_or_create_user("2102", "Dog")
+        room = await dbmod.create_room(u1["id"])
+        await dbmod.join_room(room["code"], u2["id"])
+        rd = await dbmod.set_question(room["id"], "Q?")
+        ans = await dbmod.submit_answer(rd["id"], u2["id"], "Woof")
+
+        added = events.answer_added(ans)
+        assert added["v"] == events.SCHEMA_VERSION
+        # Same fields a client would get from re-listing, so it never has to
+        row = (await dbmod.get_answers(rd["id"]))[0]
+        assert {k: added["payload"][k] for k in row} == dict(row)
+        assert added["payload"]["round_id"] == rd["id"]
+
+        result = await dbmod.reveal_answer(rd["id"], ans["id"], u1["id"])
+        revealed = events.answer_revealed(rd["id"], result, u1["id"])["payload"]
+        row = (await dbmod.get_answers(rd["id"]))[0]
+        assert {**added["payload"], **revealed}.items() >= row.items()
@@ -0,0 +1,29 @@
+import httpx
+import pytest
+from bot.api_client import ApiClient, ApiError
+
+@pytest.mark.asyncio
+async def test_join_retries_transient_errors_and_surfaces_detail():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if len(calls) == 1:
+            raise httpx.ConnectError("refused", request=request)
+        if len(calls) == 2:
+            return httpx.Response(503)
+        if request.url.path == "/rooms/join":
+            return httpx.Response(400, json={"detail": "Комната не найдена"})
+        return httpx.Response(200, json={"room_id": 1, "room_code": "ABC123"})
+
+    api = ApiClient("http://api", backoff=0, transport=httpx.MockTransport(handler))
+    try:
+        with pytest.raises(ApiError) as err:
+            await api.join_room("ABC123", "1", "Ann")
+        assert err.value.detail == "Комната не найдена"
+        assert calls == ["/rooms/join"] * 3
+        # Non-idempotent create is not retried on a 5xx, and never calls /users
+        assert (await api.create_room("1", "Ann"))["room_code"] == "ABC123"
+        assert calls[-1] == "/rooms"
+    finally:
+        await api.close()
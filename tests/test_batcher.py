@@ -0,0 +1,58 @@
+import asyncio, os, sqlite3, tempfile
+import pytest
+from database import db as dbmod
+from database.records import AnswerRow
+
+@pytest.mark.asyncio
+async def test_concurrent_answers_share_one_commit_with_own_errors():
+    with tempfile.TemporaryDirectory() as td:
+        dbmod.set_db_path(os.path.join(td, "t.db"))
+        await dbmod.ensure_initialized()
+        users = [await dbmod.get_or_create_user(str(5000 + i), f"P{i}") for i in range(10)]
+        room = await dbmod.create_room(users[0]["id"])
+        old = await dbmod.set_question(room["id"], "Old?")
+        rd = await dbmod.set_question(room["id"], "New?")  # closes the old round
+        version = (await dbmod.get_room_snapshot(room["id"]))["version"]
+        batcher = dbmod.open_answer_batcher(window=0.05)
+        try:
+            results = await asyncio.gather(
+                *(dbmod.submit_answer(rd["id"], u["id"], f"a{u['id']}") for u in users),
+                dbmod.submit_answer(rd["id"], users[0]["id"], "again"),
+                dbmod.submit_answer(old["id"], users[1]["id"], "late"),
+                dbmod.submit_answer(999, users[1]["id"], "lost"),
+                dbmod.submit_answer(rd["id"], 10**6, "nobody"),
+                return_exceptions=True,
+            )
+        finally:
+            await dbmod.close_answer_batcher()
+        assert batcher.batches == 1
+        ok, dup, late, lost, nobody = results[:10], results[10], results[11], results[12], results[13]
+        assert [r["user_id"] for r in ok] == [u["id"] for u in users]
+        assert ok[3]["text"] == f"a{users[3]['id']}" and all(isinstance(r, AnswerRow) for r in ok)
+        assert str(dup) == "Вы уже отправили ответ в этом раунде"
+        assert str(late) == "Сбор ответов завершён"
+        assert str(lost) == "Раунд не найден"
+        # A foreign-key failure is not reported as a duplicate answer
+        assert isinstance(nobody, sqlite3.IntegrityError)
+        assert len(await dbmod.get_answers(rd["id"])) == 10
+        assert (await dbmod.get_room_snapshot(room["id"]))["version"] > version
+
+@pytest.mark.asyncio
+async def test_cancelled_write_does_not_leave_callers_pending():
+    with tempfile.TemporaryDirectory() as td:
+        dbmod.set_db_path(os.path.join(td, "t.db"))
+        await dbmod.ensure_initialized()
+        u = await dbmod.get_or_create_user("5100", "P")
+        room = await dbmod.create_room(u["id"])
+        rd = await dbmod.set_question(room["id"], "Q?")
+        batcher = dbmod.open_answer_batcher(window=60)
+        try:
+            pending = [asyncio.ensure_future(dbmod.submit_answer(rd["id"], u["id"], "a")) for _ in range(2)]
+            await asyncio.sleep(0)
+            batcher._kick()
+            for write in list(batcher._writes):
+                write.cancel()
+            done, _ = await asyncio.wait(pending, timeout=1)
+            assert len(done) == 2 and all(f.cancelled() for f in done)
+        finally:
+            await dbmod.close_answer_batcher()
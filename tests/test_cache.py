@@ -0,0 +1,33 @@
+import os, tempfile
+import pytest
+import aiosqlite
+from database import db as dbmod
+from database.lifecycle import RoomLifecycle
+
+@pytest.mark.asyncio
+async def test_users_and_rooms_are_served_from_cache_until_written():
+    with tempfile.TemporaryDirectory() as td:
+        path = os.path.join(td, "t.db")
+        dbmod.set_db_path(path)
+        await dbmod.ensure_initialized()
+        u = await dbmod.get_or_create_user("7001", "Ann")
+        hits = dbmod.cache_stats()["users_by_tg"]["hits"]
+        assert await dbmod.get_or_create_user("7001", "Ann") == u
+        assert dbmod.cache_stats()["users_by_tg"]["hits"] == hits + 1
+        # A new name goes to the database and refreshes both keys
+        renamed = await dbmod.get_or_create_user("7001", "Anna")
+        assert (await dbmod.get_user_by_id(u["id"]))["name"] == "Anna" == renamed["name"]
+
+        room = await dbmod.create_room(u["id"])
+        before = dbmod.cache_stats()["rooms_by_id"]["hits"]
+        assert (await dbmod.get_room_by_code(room["code"]))["id"] == room["id"]
+        assert dbmod.cache_stats()["rooms_by_id"]["hits"] == before + 1
+
+        # Closing through the lifecycle invalidates the cached status
+        async with aiosqlite.connect(path) as db:
+            await db.execute("UPDATE rooms SET updated_at=0")
+            await db.commit()
+        await RoomLifecycle(idle_ttl=60).close_idle()
+        other = await dbmod.get_or_create_user("7002", "Bob")
+        with pytest.raises(ValueError, match="Комната закрыта"):
+            await dbmod.join_room(room["code"], other["id"])
@@ -0,0 +1,43 @@
+import os, random, tempfile
+import pytest
+from database import db as dbmod
+from database import codes
+from database.codes import ALPHABET, SPACE, decode, encode
+
+def test_encoding_is_a_bijection():
+    ids = list(range(1000)) + [random.randrange(SPACE) for _ in range(1000)] + [SPACE - 1]
+    codes = [encode(i) for i in ids]
+    assert all(len(c) == 6 and set(c) <= set(ALPHABET) for c in codes)
+    assert [decode(c) for c in codes] == ids
+    assert len(set(codes[:1000])) == 1000
+
+def test_codes_depend_on_the_secret_key(monkeypatch):
+    ids = list(range(1, 201))
+    monkeypatch.setattr(codes, "_KEYS", codes.derive_keys("one"))
+    first = [encode(i) for i in ids]
+    monkeypatch.setattr(codes, "_KEYS", codes.derive_keys("two"))
+    second = [encode(i) for i in ids]
+    assert all(a != b for a, b in zip(first, second))
+    monkeypatch.setattr(codes, "_KEYS", None)
+    with pytest.raises(RuntimeError):
+        encode(1)
+
+@pytest.mark.asyncio
+async def test_create_room_skips_legacy_code_clash():
+    with tempfile.TemporaryDirectory() as td:
+        dbmod.set_db_path(os.path.join(td, "t.db"))
+        await dbmod.ensure_initialized()
+        u = await dbmod.get_or_create_user("1", "Ann")
+        first = await dbmod.create_room(u["id"])
+        assert first["code"] == encode(first["id"])
+        # A pre-bijection random code that happens to equal the next id's code
+        async with dbmod._connect(write=True) as db:
+            await db.execute("INSERT INTO rooms (id, code, owner_user_id) VALUES (?,?,?)",
+                             (first["id"] + 1, "LEGACY", u["id"]))
+            await db.execute("INSERT INTO rooms (code, owner_user_id) VALUES (?,?)", (encode(first["id"] + 3), u["id"]))
+            await db.commit()
+        room = await dbmod.create_room(u["id"])
+        assert room["id"] > first["id"] + 3
+        assert room["code"] == encode(room["id"])
+        state = await dbmod.get_room_state(room["id"])
+        assert state["players"][0]["user_id"] == u["id"]
@@ -0,0 +1,69 @@
+import os, tempfile
+import pytest
+from database import db as dbmod
+from database.engine import RoomEngine
+from database.records import Answer
+
+@pytest.mark.asyncio
+async def test_engine_round_flow_and_write_behind():
+    with tempfile.TemporaryDirectory() as td:
+        dbmod.set_db_path(os.path.join(td, "t.db"))
+        await dbmod.ensure_initialized()
+        u1 = await dbmod.get_or_create_user("5001", "Alice")
+        u2 = await dbmod.get_or_create_user("5002", "Bob")
+        room = await dbmod.create_room(u1["id"])
+        engine = await RoomEngine(flush_interval=60).start()
+        try:
+            await engine.join_room(room["code"], u2["id"])
+            rd = await engine.set_question(room["id"], "Q?")
+            a1 = await engine.submit_answer(rd["id"], u1["id"], "Alice's text")
+            with pytest.raises(ValueError):
+                await engine.submit_answer(rd["id"], u1["id"], "Duplicate")
+            with pytest.raises(ValueError):
+                await engine.reveal_answer(rd["id"], a1["id"], u1["id"])
+            res = await engine.reveal_answer(rd["id"], a1["id"], u2["id"])
+            assert res == Answer(a1["id"], "Alice's text", 1, "Alice")
+            with pytest.raises(ValueError):
+                await engine.reveal_answer(rd["id"], a1["id"], u2["id"])
+
+            state = await engine.get_room_state(room["id"])
+            assert [p["super_cards"] for p in state["players"]] == [3, 2]
+            # Nothing written yet: the database still sees no answers
+            assert await dbmod.get_answers(rd["id"]) == []
+            assert await engine.flush() > 0
+            assert await dbmod.get_answers(rd["id"]) == await engine.get_answers(rd["id"])
+            assert await dbmod.get_room_state(room["id"]) == state
+
+            # A fresh engine rebuilds the same view from SQLite
+            engine.evict(room["id"])
+            assert await engine.get_room_state(room["id"]) == state
+            await engine.close_round(room["id"])
+            with pytest.raises(ValueError):
+                await engine.submit_answer(rd["id"], u2["id"], "Late")
+        finally:
+            await engine.stop()
+        assert (await dbmod.get_current_question(room["id"]))["status"] == "discussion"
+
+@pytest.mark.asyncio
+async def test_engine_drops_a_statement_that_keeps_failing():
+    with tempfile.TemporaryDirectory() as td:
+        dbmod.set_db_path(os.path.join(td, "t.db"))
+        await dbmod.ensure_initialized()
+        u = await dbmod.get_or_create_user("5101", "Alice")
+        room = await dbmod.create_room(u["id"])
+        engine = await RoomEngine(flush_interval=60, max_retries=2).start()
+        try:
+            rd = await engine.set_question(room["id"], "Q?")
+            # No such round: the foreign key fails on every attempt
+            engine._queue("INSERT INTO answers (round_id, user_id, text) VALUES (?,?,?)", (rd["id"] + 100, u["id"], "x"))
+            await engine.submit_answer(rd["id"], u["id"], "kept")
+            for _ in range(2):
+                with pytest.raises(Exception):
+                    await engine.flush()
+            assert await engine.flush() > 0
+            assert engine._pending == []
+            assert [a["text"] for a in await dbmod.get_answers(rd["id"])] == ["kept"]
+            engine._queue("INSERT INTO answers (round_id, user_id, text) VALUES (?,?,?)", (rd["id"] + 100, u["id"], "y"))
+        finally:
+            await engine.stop()  # logs instead of raising out of the lifespan
+        assert engine._pending == []
@@ -0,0 +1,69 @@
+import os, tempfile, time
+import pytest
+import aiosqlite
+from aiogram.fsm.storage.base import StorageKey
+from bot.fsm_storage import SQLiteStorage
+from bot.handlers.rooms import JoinStates
+
+KEY = StorageKey(bot_id=1, chat_id=10, user_id=10)
+
+@pytest.mark.asyncio
+async def test_state_survives_restart_and_is_batched():
+    with tempfile.TemporaryDirectory() as td:
+        path = os.path.join(td, "t.db")
+        a = SQLiteStorage(path, flush_interval=60)
+        try:
+            await a.set_state(KEY, JoinStates.waiting_code)
+            await a.update_data(KEY, {"tries": 1})
+            assert await a.get_state(KEY) == JoinStates.waiting_code.state
+            # Nothing written yet: the batch is flushed on the interval or close
+            async with aiosqlite.connect(path) as db:
+                cur = await db.execute("SELECT COUNT(*) FROM fsm_states")
+                assert (await cur.fetchone())[0] == 0
+        finally:
+            await a.close()
+
+        b = SQLiteStorage(path, flush_interval=0)
+        try:
+            assert await b.get_state(KEY) == JoinStates.waiting_code.state
+            assert await b.get_data(KEY) == {"tries": 1}
+            await b.set_state(KEY, None)
+            await b.set_data(KEY, {})
+            async with aiosqlite.connect(path) as db:
+                cur = await db.execute("SELECT COUNT(*) FROM fsm_states")
+                assert (await cur.fetchone())[0] == 0
+        finally:
+            await b.close()
+
+@pytest.mark.asyncio
+async def test_stale_states_expire():
+    with tempfile.TemporaryDirectory() as td:
+        path = os.path.join(td, "t.db")
+        s = SQLiteStorage(path, flush_interval=0, cache_ttl=0, state_ttl=60)
+        try:
+            await s.set_state(KEY, JoinStates.waiting_code)
+            async with aiosqlite.connect(path) as db:
+                await db.execute("UPDATE fsm_states SET updated_at=?", (time.time() - 120,))
+                await db.commit()
+            assert await s.get_state(KEY) is None
+            assert await s.prune() == 1
+        finally:
+            await s.close()
+
+@pytest.mark.asyncio
+async def test_storage_uses_the_configured_profile_and_api_schema_setup():
+    from database.pool import profile_pragmas
+    with tempfile.TemporaryDirectory() as td:
+        path = os.path.join(td, "t.db")
+        s = SQLiteStorage(path, flush_interval=0, pragmas=profile_pragmas("default"))
+        try:
+            assert await s.get_state(KEY) is None
+            db = await s._conn()
+            cur = await db.execute("PRAGMA journal_mode")
+            assert (await cur.fetchone())[0] == "delete"
+            cur = await db.execute("PRAGMA busy_timeout")
+            assert (await cur.fetchone())[0] == 5000
+            cur = await db.execute("PRAGMA auto_vacuum")
+            assert (await cur.fetchone())[0] == 2
+        finally:
+            await s.close()
@@ -0,0 +1,86 @@
+import json, os, tempfile
+import pytest
+import aiosqlite
+from database import db as dbmod
+from database.lifecycle import RoomLifecycle
+
+async def _game():
+    u1 = await dbmod.get_or_create_user("1", "Ann")
+    u2 = await dbmod.get_or_create_user("2", "Bob")
+    room = await dbmod.create_room(u1["id"])
+    await dbmod.join_room(room["code"], u2["id"])
+    rd = await dbmod.set_question(room["id"], "Q?")
+    await dbmod.submit_answer(rd["id"], u2["id"], "A!")
+    fresh = await dbmod.create_room(u2["id"])
+    return room, fresh
+
+async def _count(path, sql):
+    async with aiosqlite.connect(path) as db:
+        cur = await db.execute(sql)
+        return (await cur.fetchone())[0]
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("separate_archive", [False, True])
+async def test_idle_rooms_are_closed_then_archived(separate_archive):
+    with tempfile.TemporaryDirectory() as td:
+        path = os.path.join(td, "t.db")
+        archive = os.path.join(td, "archive.db") if separate_archive else ""
+        dbmod.set_db_path(path)
+        await dbmod.ensure_initialized()
+        room, fresh = await _game()
+        async with aiosqlite.connect(path) as db:
+            await db.execute("UPDATE rooms SET updated_at=updated_at-7200 WHERE id=?", (room["id"],))
+            await db.commit()
+
+        closed = []
+        async def on_closed(ids):
+            closed.extend(ids)
+        life = RoomLifecycle(idle_ttl=3600, archive_after=600, archive_path=archive, on_closed=on_closed)
+        assert (await life.sweep())["closed"] == 1
+        assert closed == [room["id"]]
+        with pytest.raises(ValueError):
+            await dbmod.join_room(room["code"], 999)
+
+        # Closed rooms still take writes: a recent one keeps the room out of the archive
+        await dbmod.set_question(room["id"], "Q2?")
+        async with aiosqlite.connect(path) as db:
+            await db.execute("UPDATE rooms SET closed_at=closed_at-1200 WHERE id=?", (room["id"],))
+            await db.commit()
+        assert await life.archive_closed() == []
+        async with aiosqlite.connect(path) as db:
+            await db.execute("UPDATE rooms SET updated_at=updated_at-1200 WHERE id=?", (room["id"],))
+            await db.commit()
+        assert await life.archive_closed() == [room["id"]]
+        assert await _count(path, "SELECT COUNT(*) FROM rooms") == 1
+        assert await _count(path, "SELECT COUNT(*) FROM answers") == 0
+        assert await _count(path, "SELECT COUNT(*) FROM room_players") == 1
+
+        async with aiosqlite.connect(archive or path) as db:
+            cur = await db.execute("SELECT code, data FROM room_archive")
+            code, data = await cur.fetchone()
+        assert code == room["code"]
+        doc = json.loads(data)
+        assert len(doc["players"]) == 2
+        assert doc["rounds"][0]["question"] == "Q?"
+        assert doc["rounds"][0]["answers"][0][1] == "A!"
+        assert [rd["question"] for rd in doc["rounds"]] == ["Q?", "Q2?"]
+        await life.compact()
+        assert await _count(path, "PRAGMA auto_vacuum") == 2
+        assert (await dbmod.get_room_state(fresh["id"]))["status"] == "active"
+
+@pytest.mark.asyncio
+async def test_compact_skips_legacy_file_until_init_converts_it():
+    with tempfile.TemporaryDirectory() as td:
+        path = os.path.join(td, "t.db")
+        async with aiosqlite.connect(path) as db:
+            await db.execute("CREATE TABLE legacy (x)")
+            await db.commit()
+        dbmod.set_db_path(path)
+        await dbmod.ensure_initialized()
+        life = RoomLifecycle()
+        assert await life.compact() == 0
+        assert await _count(path, "PRAGMA auto_vacuum") == 0
+        assert await dbmod.enable_incremental_vacuum()
+        assert not await dbmod.enable_incremental_vacuum()
+        assert await _count(path, "PRAGMA auto_vacuum") == 2
+        await life.compact()
@@ -0,0 +1,55 @@
+import os, tempfile
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+
+import metrics
+from api import metrics as api_metrics
+from api.ws import WSManager
+from database import db as dbmod
+
+def test_histogram_renders_cumulative_buckets():
+    h = metrics.histogram("test_latency_seconds", "test", ("op",), buckets=(0.1, 1.0))
+    child = h.labels("read")
+    for v in (0.05, 0.5, 5.0):
+        child.observe(v)
+    metrics.counter("test_events", "test").labels().inc(3)
+    text = metrics.render()
+    assert 'test_latency_seconds_bucket{op="read",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{op="read",le="1.0"} 2' in text
+    assert 'test_latency_seconds_bucket{op="read",le="+Inf"} 3' in text
+    assert 'test_latency_seconds_count{op="read"} 3' in text
+    assert "test_events_total 3" in text
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_routes_db_and_ws():
+    with tempfile.TemporaryDirectory() as td:
+        dbmod.set_db_path(os.path.join(td, "t.db"))
+        await dbmod.ensure_initialized()
+        app = FastAPI()
+        app.state.ws_manager = WSManager()
+
+        @app.get("/things/{thing_id}")
+        async def thing(thing_id: int):
+            if thing_id == 0:
+                raise HTTPException(status_code=404)
+            user = await dbmod.get_or_create_user(str(thing_id), "Thing")
+            return {"user_id": user["id"]}
+
+        api_metrics.install(app)
+        app.include_router(api_metrics.router)
+        # Sockets per room come straight from the manager's room sets
+        app.state.ws_manager.rooms = {7: {object(), object()}, 8: {object()}}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as http:
+            assert (await http.get("/things/5")).status_code == 200
+            assert (await http.get("/things/0")).status_code == 404
+            text = (await http.get("/metrics")).text
+        assert 'http_request_seconds_count{method="GET",route="/things/{thing_id}"} 2' in text
+        assert 'http_request_errors_total{method="GET",route="/things/{thing_id}",class="4xx"} 1' in text
+        assert 'db_call_seconds_count{fn="get_or_create_user"}' in text
+        assert 'db_connect_seconds_count{mode="open"}' in text
+        assert "db_query_seconds_count" in text
+        assert "ws_sockets 0" in text
+        assert 'ws_room_sockets_bucket{le="1"} 1' in text and 'ws_room_sockets_bucket{le="2"} 2' in text
+        assert "ws_room_sockets_count 2" in text and "ws_room_sockets_sum 3" in text
+        assert "room_id=" not in text
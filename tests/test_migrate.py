@@ -0,0 +1,34 @@
+import os, sqlite3, tempfile
+import pytest
+import aiosqlite
+from database import db as dbmod
+from database.migrate import load_migrations, migrate
+
+@pytest.mark.asyncio
+async def test_migrations_apply_once_and_flag_short_circuits():
+    with tempfile.TemporaryDirectory() as td:
+        path = os.path.join(td, "t.db")
+        dbmod.set_db_path(path)
+        await dbmod.ensure_initialized()
+        latest = load_migrations()[-1][0]
+        async with aiosqlite.connect(path, isolation_level=None) as db:
+            assert await migrate(db) == latest
+            cur = await db.execute("SELECT COUNT(*) FROM schema_version")
+            assert (await cur.fetchone())[0] == len(load_migrations())
+        # Flag is set: dropping the file's tables is not noticed until the path changes
+        os.remove(path)
+        await dbmod.ensure_initialized()
+        assert not os.path.exists(path)
+        dbmod.set_db_path(path)
+        await dbmod.ensure_initialized()
+        assert os.path.exists(path)
+
+@pytest.mark.asyncio
+async def test_legacy_schema_is_adopted():
+    with tempfile.TemporaryDirectory() as td:
+        path = os.path.join(td, "legacy.db")
+        conn = sqlite3.connect(path)
+        conn.executescript(load_migrations()[0][2])
+        conn.close()
+        async with aiosqlite.connect(path, isolation_level=None) as db:
+            assert await migrate(db) == load_migrations()[-1][0]
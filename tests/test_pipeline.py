@@ -0,0 +1,62 @@
+import asyncio
+import httpx
+import pytest
+from aiogram.types import Update
+from fastapi import FastAPI
+from bot.pipeline import UpdatePipeline
+from bot.webhook import mount_webhook
+
+def message(update_id, chat_id, text):
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id, "date": 0, "text": text,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "U"},
+        },
+    }
+
+class SlowDispatcher:
+    def __init__(self):
+        self.seen = []
+        self.running = set()
+        self.peak = 0
+
+    async def feed_update(self, bot, update):
+        chat = update.message.chat.id
+        assert chat not in self.running, "same chat handled concurrently"
+        self.running.add(chat)
+        self.peak = max(self.peak, len(self.running))
+        await asyncio.sleep(0.01)
+        self.seen.append((chat, update.message.text))
+        self.running.discard(chat)
+
+@pytest.mark.asyncio
+async def test_pipeline_orders_per_chat_and_parallelises_across_chats():
+    dp = SlowDispatcher()
+    pipeline = UpdatePipeline(dp, bot=None, concurrency=4)
+    n = 0
+    for step in range(3):
+        for chat in (1, 2, 3):
+            n += 1
+            await pipeline.submit(Update.model_validate(message(n, chat, str(step))))
+    await pipeline.drain()
+    for chat in (1, 2, 3):
+        assert [t for c, t in dp.seen if c == chat] == ["0", "1", "2"]
+    assert dp.peak == 3
+    assert pipeline.handled == 9
+
+@pytest.mark.asyncio
+async def test_webhook_requires_secret_token():
+    dp = SlowDispatcher()
+    pipeline = UpdatePipeline(dp, bot=None)
+    app = FastAPI()
+    mount_webhook(app, pipeline, "/tg/webhook", "s3cret")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as client:
+        r = await client.post("/tg/webhook", json=message(1, 7, "hi"))
+        assert r.status_code == 403
+        r = await client.post("/tg/webhook", json=message(1, 7, "hi"),
+                              headers={"X-Telegram-Bot-Api-Secret-Token": "s3cret"})
+        assert r.status_code == 200
+    await pipeline.drain()
+    assert dp.seen == [(7, "hi")]
@@ -0,0 +1,29 @@
+import asyncio, os, tempfile
+import pytest
+from database import db as dbmod
+
+@pytest.mark.asyncio
+async def test_pooled_calls_share_connections():
+    with tempfile.TemporaryDirectory() as td:
+        dbmod.set_db_path(os.path.join(td, "t.db"))
+        await dbmod.ensure_initialized()
+        pool = await dbmod.open_pool(2)
+        try:
+            u1 = await dbmod.get_or_create_user("4001", "Ann")
+            u2 = await dbmod.get_or_create_user("4002", "Ben")
+            room = await dbmod.create_room(u1["id"])
+            await dbmod.join_room(room["code"], u2["id"])
+            rd = await dbmod.set_question(room["id"], "Q?")
+            a = await dbmod.submit_answer(rd["id"], u1["id"], "text")
+            # A failed write must not leave the shared writer inside a transaction
+            with pytest.raises(ValueError):
+                await dbmod.reveal_answer(rd["id"], a["id"], u1["id"])
+            states = await asyncio.gather(*(dbmod.get_room_state(room["id"]) for _ in range(10)))
+            assert all(len(s["players"]) == 2 for s in states)
+            assert len(pool._all) == 3
+            # Concurrent writers queue on the write lock and are counted
+            waits = pool.write_waits
+            await asyncio.gather(*(dbmod.get_or_create_user(f"41{i:02d}", "X") for i in range(5)))
+            assert pool.write_waits > waits and pool.write_wait_time > 0
+        finally:
+            await dbmod.close_pool()
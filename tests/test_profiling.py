@@ -0,0 +1,47 @@
+import asyncio, logging, os, tempfile, time
+import httpx
+import pytest
+from fastapi import FastAPI
+
+import profiling
+from api.routes.admin import router as admin_router
+from database import db as dbmod
+from database.pool import set_slow_query_log
+
+@pytest.mark.asyncio
+async def test_slow_query_log_includes_sql_and_params(caplog):
+    with tempfile.TemporaryDirectory() as td:
+        dbmod.set_db_path(os.path.join(td, "t.db"))
+        await dbmod.ensure_initialized()
+        set_slow_query_log(0.001)
+        try:
+            with caplog.at_level(logging.WARNING, logger="database.slow"):
+                await dbmod.get_or_create_user("7001", "Slowpoke")
+        finally:
+            set_slow_query_log(0)
+        logged = [r.getMessage() for r in caplog.records if r.name == "database.slow"]
+        assert any("INSERT" in m and "Slowpoke" in m for m in logged)
+        assert any(m.endswith("COMMIT ()") for m in logged)
+
+@pytest.mark.asyncio
+async def test_loop_lag_monitor_sees_blocking_callback():
+    mon = profiling.LoopLagMonitor(interval=0.01, threshold=10).start()
+    await asyncio.sleep(0.02)
+    time.sleep(0.06)  # block the loop
+    await asyncio.sleep(0.03)
+    await mon.stop()
+    assert mon.max_lag >= 0.04
+
+@pytest.mark.asyncio
+async def test_profile_endpoint_needs_token_and_returns_folded_stacks():
+    app = FastAPI()
+    app.state.admin_token = "s3cret"
+    app.include_router(admin_router)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as http:
+        assert (await http.get("/admin/profile", params={"seconds": 0.05})).status_code == 403
+        r = await http.get("/admin/profile", params={"seconds": 0.1, "interval_ms": 2}, headers={"X-Admin-Token": "s3cret"})
+    assert r.status_code == 200
+    lines = r.text.splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    # The event loop thread is among the sampled ones
+    assert any(line.startswith("MainThread;") for line in lines)
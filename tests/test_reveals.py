@@ -1,6 +1,7 @@
 import asyncio, os, tempfile
 import pytest
 from database import db as dbmod
+from database.records import Answer
 
 @pytest.mark.asyncio
 async def test_reveal_spends_supercard_and_prohibits_double():
@@ -23,3 +24,36 @@ async def test_reveal_spends_supercard_and_prohibits_double():
         a2 = await dbmod.submit_answer(rd["id"], u2["id"], "Bob's text")
         with pytest.raises(ValueError):
             await dbmod.reveal_answer(rd["id"], a2["id"], u2["id"])
+
+@pytest.mark.asyncio
+async def test_reveal_refusals_keep_distinct_messages():
+    with tempfile.TemporaryDirectory() as td:
+        dbmod.set_db_path(os.path.join(td, "t.db"))
+        await dbmod.ensure_initialized()
+        u1 = await dbmod.get_or_create_user("4001", "Alice")
+        u2 = await dbmod.get_or_create_user("4002", "Bob")
+        outsider = await dbmod.get_or_create_user("4003", "Eve")
+        room = await dbmod.create_room(u1["id"])
+        await dbmod.join_room(room["code"], u2["id"])
+        rd = await dbmod.set_question(room["id"], "Q?")
+        a = await dbmod.submit_answer(rd["id"], u1["id"], "Alice's text")
+
+        async def refusal(answer_id, actor):
+            with pytest.raises(ValueError) as err:
+                await dbmod.reveal_answer(rd["id"], answer_id, actor)
+            return str(err.value)
+
+        assert await refusal(999, u2["id"]) == "Ответ не найден"
+        assert await refusal(a["id"], outsider["id"]) == "Вы не являетесь игроком этой комнаты"
+        # Spend Bob's three cards on fresh rounds, then he has none left
+        for n in range(3):
+            r = await dbmod.set_question(room["id"], f"Q{n}")
+            x = await dbmod.submit_answer(r["id"], u1["id"], "x")
+            res = await dbmod.reveal_answer(r["id"], x["id"], u2["id"])
+            assert res == Answer(x["id"], "x", 1, "Alice")
+        r = await dbmod.set_question(room["id"], "Q last")
+        x = await dbmod.submit_answer(r["id"], u1["id"], "x")
+        with pytest.raises(ValueError, match="У вас нет супер-карт"):
+            await dbmod.reveal_answer(r["id"], x["id"], u2["id"])
+        state = await dbmod.get_room_state(room["id"])
+        assert [p["super_cards"] for p in state["players"]] == [3, 0]
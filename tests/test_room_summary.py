@@ -0,0 +1,83 @@
+import json, os, tempfile
+import pytest
+from database import db as dbmod
+from database.engine import RoomEngine
+from database.lifecycle import RoomLifecycle
+
+def _plain(obj):
+    return json.loads(json.dumps(obj, default=lambda r: r.as_dict()))
+
+async def _counters(room_id):
+    s = await dbmod.get_room_summary(room_id)
+    return s.player_count, s.current_round_id, s.round_status, s.answer_count, s.revealed_count
+
+@pytest.mark.asyncio
+async def test_json_views_match_records_and_summary_follows_writes():
+    with tempfile.TemporaryDirectory() as td:
+        dbmod.set_db_path(os.path.join(td, "t.db"))
+        await dbmod.ensure_initialized()
+        u1 = await dbmod.get_or_create_user("6001", "Аня")
+        u2 = await dbmod.get_or_create_user("6002", "Bob \"B\"")
+        room = await dbmod.create_room(u1["id"])
+        assert await _counters(room["id"]) == (1, None, None, 0, 0)
+        assert json.loads(await dbmod.get_room_state_json(room["id"])) == _plain(await dbmod.get_room_state(room["id"]))
+
+        await dbmod.join_room(room["code"], u2["id"])
+        await dbmod.join_room(room["code"], u2["id"])  # already in: not counted twice
+        rd = await dbmod.set_question(room["id"], "Q?")
+        a1 = await dbmod.submit_answer(rd["id"], u1["id"], "ответ")
+        await dbmod.submit_answer(rd["id"], u2["id"], "other")
+        await dbmod.reveal_answer(rd["id"], a1["id"], u2["id"])
+        assert await _counters(room["id"]) == (2, rd["id"], "collecting", 2, 1)
+
+        assert json.loads(await dbmod.get_room_state_json(room["id"])) == _plain(await dbmod.get_room_state(room["id"]))
+        version, body = await dbmod.get_room_snapshot_json(room["id"])
+        snap = await dbmod.get_room_snapshot(room["id"])
+        assert version == snap["version"]
+        assert json.loads(body) == _plain(snap)
+        assert json.loads(await dbmod.get_answers_json(rd["id"])) == _plain(await dbmod.get_answers(rd["id"]))
+        with pytest.raises(ValueError):
+            await dbmod.get_room_state_json(999)
+
+        await dbmod.close_round(room["id"])
+        assert (await _counters(room["id"]))[2] == "discussion"
+        rd2 = await dbmod.set_question(room["id"], "Q2?")
+        assert await _counters(room["id"]) == (2, rd2["id"], "collecting", 0, 0)
+        assert json.loads(await dbmod.get_answers_json(rd2["id"])) == []
+        assert [s.room_id for s in await dbmod.list_active_rooms()] == [room["id"]]
+
+        # Archiving deletes the room and, by cascade, its summary row
+        async with dbmod._connect(write=True) as db:
+            await db.execute("UPDATE rooms SET status='closed', closed_at=0, updated_at=0 WHERE id=?", (room["id"],))
+            await db.commit()
+        assert await RoomLifecycle(archive_after=0).archive_closed() == [room["id"]]
+        assert await dbmod.get_room_summary(room["id"]) is None
+        assert await dbmod.list_active_rooms() == []
+
+@pytest.mark.asyncio
+async def test_engine_summary_matches_flushed_table():
+    with tempfile.TemporaryDirectory() as td:
+        dbmod.set_db_path(os.path.join(td, "t.db"))
+        await dbmod.ensure_initialized()
+        u1 = await dbmod.get_or_create_user("6101", "Alice")
+        u2 = await dbmod.get_or_create_user("6102", "Bob")
+        room = await dbmod.create_room(u1["id"])
+        engine = await RoomEngine(flush_interval=60).start()
+        try:
+            await engine.join_room(room["code"], u2["id"])
+            rd = await engine.set_question(room["id"], "Q?")
+            a1 = await engine.submit_answer(rd["id"], u1["id"], "one")
+            await engine.submit_answer(rd["id"], u2["id"], "two")
+            await engine.reveal_answer(rd["id"], a1["id"], u2["id"])
+            live = await engine.get_room_summary(room["id"])
+            await engine.flush()
+            assert await dbmod.get_room_summary(room["id"]) == live
+            assert (live.player_count, live.answer_count, live.revealed_count) == (2, 2, 1)
+            assert json.loads(await engine.get_room_state_json(room["id"])) == \
+                json.loads(await dbmod.get_room_state_json(room["id"]))
+            assert json.loads((await engine.get_room_snapshot_json(room["id"]))[1]) == \
+                json.loads((await dbmod.get_room_snapshot_json(room["id"]))[1])
+            assert json.loads(await engine.get_answers_json(rd["id"])) == \
+                json.loads(await dbmod.get_answers_json(rd["id"]))
+        finally:
+            await engine.stop()
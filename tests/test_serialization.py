@@ -0,0 +1,25 @@
+import json
+from api import serialization
+
+def test_fast_encoder_matches_stdlib_output():
+    payload = {"room_id": 1, "players": [{"name": "Аня \"Кошка\"", "super_cards": 3}], "current_round": None, "ok": True}
+    expected = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    assert serialization.dumps_str(payload) == expected
+    assert serialization.dumps(payload) == expected.encode()
+    assert serialization.loads(expected) == payload
+
+def test_json_response_renders_raw_content():
+    r = serialization.json_response([{"answer_id": 1, "text": "ё"}], headers={"ETag": '"r1v2"'})
+    assert r.media_type == "application/json"
+    assert r.headers["etag"] == '"r1v2"'
+    assert json.loads(r.body) == [{"answer_id": 1, "text": "ё"}]
+
+def test_records_encode_like_dicts():
+    from database.records import Answer, Round
+    payload = {"current_round": Round(7, 1, "Вопрос?", "collecting", "2024-01-01 00:00:00"),
+               "answers": [Answer(1, "ё", 1, "Аня"), Answer(2, "нет", 0, None)]}
+    plain = {"current_round": dict(payload["current_round"]), "answers": [a.as_dict() for a in payload["answers"]]}
+    expected = json.dumps(plain, ensure_ascii=False, separators=(",", ":"))
+    assert serialization.dumps_str(payload) == expected
+    # What the stdlib fallback produces
+    assert json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=serialization._default) == expected
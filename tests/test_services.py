@@ -0,0 +1,30 @@
+import os, tempfile
+import pytest
+from types import SimpleNamespace
+from database import db as dbmod
+from bot.services import GameError, LocalGameService
+
+class RecordingWS:
+    def __init__(self):
+        self.events = []
+
+    async def broadcast(self, room_id, message):
+        self.events.append((room_id, message["type"]))
+
+@pytest.mark.asyncio
+async def test_local_service_matches_http_payloads():
+    with tempfile.TemporaryDirectory() as td:
+        dbmod.set_db_path(os.path.join(td, "t.db"))
+        await dbmod.ensure_initialized()
+        ws = RecordingWS()
+        game = LocalGameService(SimpleNamespace(state=SimpleNamespace(ws_manager=ws, room_engine=None)))
+
+        created = await game.create_room("1001", "Alice")
+        joined = await game.join_room(created["room_code"], "1002", "Bob")
+        assert joined["room_id"] == created["room_id"]
+        assert joined["super_cards"] == 3
+        assert ws.events == [(created["room_id"], "player_joined")]
+
+        with pytest.raises(GameError) as err:
+            await game.join_room("ZZZZZZ", "1003", "Carol")
+        assert err.value.detail
@@ -0,0 +1,57 @@
+import os, tempfile
+import httpx
+import pytest
+from fastapi import FastAPI
+from api.routes import rooms
+from database import db as dbmod
+
+@pytest.mark.asyncio
+async def test_snapshot_and_version_track_writes():
+    with tempfile.TemporaryDirectory() as td:
+        dbmod.set_db_path(os.path.join(td, "t.db"))
+        await dbmod.ensure_initialized()
+        u1 = await dbmod.get_or_create_user("6001", "Alice")
+        u2 = await dbmod.get_or_create_user("6002", "Bob")
+        room = await dbmod.create_room(u1["id"])
+        v0 = await dbmod.get_room_version(room["id"])
+        await dbmod.join_room(room["code"], u2["id"])
+        await dbmod.join_room(room["code"], u2["id"])  # no-op join keeps the version
+        v1 = await dbmod.get_room_version(room["id"])
+        assert v1 == v0 + 1
+        rd = await dbmod.set_question(room["id"], "Q?")
+        a = await dbmod.submit_answer(rd["id"], u1["id"], "Alice's text")
+        await dbmod.reveal_answer(rd["id"], a["id"], u2["id"])
+        snap = await dbmod.get_room_snapshot(room["id"])
+        assert snap["version"] == v1 + 3
+        assert [p["user_id"] for p in snap["players"]] == [u1["id"], u2["id"]]
+        assert snap["current_round"]["id"] == rd["id"]
+        assert snap["answers"] == await dbmod.get_answers(rd["id"])
+        assert await dbmod.get_room_version(10**6) is None
+
+@pytest.mark.asyncio
+async def test_snapshot_route_revalidates_with_etag():
+    with tempfile.TemporaryDirectory() as td:
+        dbmod.set_db_path(os.path.join(td, "t.db"))
+        await dbmod.ensure_initialized()
+        u1 = await dbmod.get_or_create_user("6101", "Alice")
+        u2 = await dbmod.get_or_create_user("6102", "Bob")
+        room = await dbmod.create_room(u1["id"])
+        app = FastAPI()
+        app.include_router(rooms.router)
+        url = f"/rooms/{room['id']}/snapshot"
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as http:
+            first = await http.get(url)
+            assert first.status_code == 200
+            etag = first.headers["etag"]
+            assert first.json()["version"] == await dbmod.get_room_version(room["id"])
+            for inm in (etag, f"W/{etag}", f'"stale", {etag}', "*"):
+                r = await http.get(url, headers={"If-None-Match": inm})
+                assert r.status_code == 304 and r.headers["etag"] == etag and r.content == b""
+            assert (await http.get(url, headers={"If-None-Match": '"stale"'})).status_code == 200
+
+            await dbmod.join_room(room["code"], u2["id"])
+            changed = await http.get(url, headers={"If-None-Match": etag})
+            assert changed.status_code == 200
+            assert changed.headers["etag"] != etag
+            assert [p["user_id"] for p in changed.json()["players"]] == [u1["id"], u2["id"]]
+            assert (await http.get("/rooms/999/snapshot", headers={"If-None-Match": "*"})).status_code == 404
@@ -0,0 +1,237 @@
+import asyncio, json
+import pytest
+from api.ws import WSManager
+
+class FakeSocket:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.frames = []
+        self.closed = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        await asyncio.sleep(self.delay)
+        frame = json.loads(text)
+        if frame["type"] != "hello":
+            frame.pop("seq", None)
+            self.frames.append(frame)
+
+    async def close(self, code: int = 1000):
+        self.closed = code
+
+@pytest.mark.asyncio
+async def test_broadcast_reaches_fast_sockets_and_evicts_slow():
+    mgr = WSManager(send_timeout=0.05)
+    fast, slow = FakeSocket(), FakeSocket(delay=1.0)
+    await mgr.connect(7, fast)
+    await mgr.connect(7, slow)
+    await mgr.broadcast(7, {"type": "round_closed", "payload": {}})
+    await mgr.drained()
+    assert fast.frames == [{"type": "round_closed", "payload": {}}]
+    assert slow.closed is not None
+    assert mgr.rooms[7] == {fast}
+    await mgr.close()
+
+@pytest.mark.asyncio
+async def test_full_queue_coalesces_answer_events():
+    mgr = WSManager(queue_size=2, overflow="coalesce")
+    ws = FakeSocket(delay=0.01)
+    await mgr.connect(1, ws)
+    for i in range(5):
+        await mgr.broadcast(1, {"type": "answer_added", "payload": {"answer_id": i}})
+    await mgr.drained()
+    ids = []
+    for f in ws.frames:
+        ids += [a["answer_id"] for a in f["payload"]["answers"]] if f["type"] == "answers_snapshot" else [f["payload"]["answer_id"]]
+    assert sorted(ids) == list(range(5))
+    assert len(ws.frames) < 5
+    await mgr.close()
+
+@pytest.mark.asyncio
+async def test_coalesced_snapshot_keeps_seq_order():
+    mgr = WSManager(queue_size=3, overflow="coalesce")
+    ws = FakeSocket(delay=0.01)
+    sent = []  # (seq, frame) as the client sees them
+    send = ws.send_text
+
+    async def send_text(text):
+        frame = json.loads(text)
+        if frame["type"] != "hello":
+            sent.append((frame["seq"], frame))
+        await send(text)
+    ws.send_text = send_text
+    await mgr.connect(1, ws)
+    await asyncio.sleep(0)  # the writer takes hello
+    await mgr.broadcast(1, {"type": "answer_added", "payload": {"answer_id": 1}})
+    await mgr.broadcast(1, {"type": "answer_added", "payload": {"answer_id": 2}})
+    await mgr.broadcast(1, {"type": "player_joined", "payload": {"user_id": 3}})
+    # Overflows: 1 and 2 fold into a snapshot that must still go out before player 3
+    await mgr.broadcast(1, {"type": "answer_added", "payload": {"answer_id": 4}})
+    await mgr.drained()
+    # What socket.js applies: frames whose seq is above the last one
+    applied, last = [], 0
+    for seq, frame in sent:
+        if seq > last:
+            applied.append(frame)
+            last = seq
+    assert [seq for seq, _ in sent] == sorted(seq for seq, _ in sent)
+    ids = [a["answer_id"] for f in applied if f["type"] == "answers_snapshot" for a in f["payload"]["answers"]]
+    ids += [f["payload"]["answer_id"] for f in applied if f["type"] == "answer_added"]
+    assert sorted(ids) == [1, 2, 4]
+    assert [f["payload"]["user_id"] for f in applied if f["type"] == "player_joined"] == [3]
+    assert any(f["type"] == "answers_snapshot" for f in applied)
+    await mgr.close()
+
+@pytest.mark.asyncio
+async def test_full_queue_disconnect_policy():
+    mgr = WSManager(queue_size=1, overflow="disconnect")
+    ws = FakeSocket(delay=0.05)
+    await mgr.connect(1, ws)
+    for i in range(3):
+        await mgr.broadcast(1, {"type": "answer_added", "payload": {"answer_id": i}})
+    await asyncio.sleep(0)
+    assert 1 not in mgr.rooms
+    assert mgr.evicted == 1
+
+def test_bus_backend_must_implement_publish():
+    from api.bus import EventBus, InMemoryBus
+
+    class Silent(EventBus):
+        pass
+
+    with pytest.raises(TypeError):
+        Silent()
+    assert InMemoryBus().epoch is None
+
+@pytest.mark.asyncio
+async def test_sqlite_bus_fans_out_across_managers():
+    import os, tempfile
+    from database import db as dbmod
+    from api.bus import SQLiteBus
+    with tempfile.TemporaryDirectory() as td:
+        path = os.path.join(td, "t.db")
+        dbmod.set_db_path(path)
+        await dbmod.ensure_initialized()
+        # Two managers stand in for two uvicorn workers
+        a, b = WSManager(), WSManager()
+        await a.attach_bus(SQLiteBus(path, poll_interval=0.01))
+        await b.attach_bus(SQLiteBus(path, poll_interval=0.01))
+        wa, wb = FakeSocket(), FakeSocket()
+        await a.connect(3, wa)
+        await b.connect(3, wb)
+        try:
+            await a.broadcast(3, {"type": "round_closed", "payload": {}})
+            for _ in range(100):
+                if wb.frames:
+                    break
+                await asyncio.sleep(0.01)
+            assert wa.frames == wb.frames == [{"type": "round_closed", "payload": {}}]
+            # A worker that never saw the event replays it from the shared table
+            c, wc = WSManager(), FakeSocket()
+            await c.attach_bus(SQLiteBus(path))
+            try:
+                await c.connect(3, wc, since=0, epoch="sqlite")
+                await c.drained()
+                assert wc.frames == wa.frames
+            finally:
+                await c.close()
+        finally:
+            await a.close()
+            await b.close()
+
+@pytest.mark.asyncio
+async def test_sqlite_bus_delivers_in_seq_order_across_workers():
+    import os, tempfile
+    from database import db as dbmod
+    from api.bus import SQLiteBus
+    with tempfile.TemporaryDirectory() as td:
+        path = os.path.join(td, "t.db")
+        dbmod.set_db_path(path)
+        await dbmod.ensure_initialized()
+        # No background polls: worker A has not seen B's event when it publishes its own
+        a, b = WSManager(), WSManager()
+        bus_a, bus_b = SQLiteBus(path, poll_interval=60), SQLiteBus(path, poll_interval=60)
+        await a.attach_bus(bus_a)
+        await b.attach_bus(bus_b)
+        wa, wb = FakeSocket(), FakeSocket()
+        await a.connect(4, wa)
+        await b.connect(4, wb)
+        try:
+            await b.broadcast(4, {"type": "player_joined", "payload": {"user_id": 1}})
+            await a.broadcast(4, {"type": "player_joined", "payload": {"user_id": 2}})
+            await bus_a.poll()
+            await bus_b.poll()
+            await a.drained()
+            await b.drained()
+            expected = [{"type": "player_joined", "payload": {"user_id": i}} for i in (1, 2)]
+            assert wa.frames == wb.frames == expected
+            assert [seq for seq, _ in a.history[4]] == [1, 2]
+        finally:
+            await a.close()
+            await b.close()
+
+@pytest.mark.asyncio
+async def test_sqlite_bus_waits_for_locks_and_never_fails_a_committed_publish():
+    import os, sqlite3, tempfile
+    from database import db as dbmod
+    from database.pool import profile_pragmas
+    from api.bus import SQLiteBus
+    with tempfile.TemporaryDirectory() as td:
+        path = os.path.join(td, "t.db")
+        dbmod.set_db_path(path)
+        await dbmod.ensure_initialized()
+        mgr = WSManager()
+        bus = SQLiteBus(path, poll_interval=60, pragmas=profile_pragmas("default"))
+        await mgr.attach_bus(bus)
+        try:
+            cur = await bus._db.execute("PRAGMA busy_timeout")
+            assert (await cur.fetchone())[0] == 5000
+            ws = FakeSocket()
+            await mgr.connect(5, ws)
+            # Another worker's event is committed but not yet polled; then reading it fails
+            other = SQLiteBus(path, poll_interval=60)
+            await other.start(lambda room_id, message: asyncio.sleep(0))
+            await other.publish(5, {"type": "player_joined", "payload": {"user_id": 1}})
+            await other.close()
+            real_execute = bus._db.execute
+            async def busy(*args):
+                raise sqlite3.OperationalError("database is locked")
+            bus._db.execute = busy
+            await mgr.broadcast(5, {"type": "player_joined", "payload": {"user_id": 2}})
+            bus._db.execute = real_execute
+            await bus.poll()
+            await mgr.drained()
+            assert ws.frames == [{"type": "player_joined", "payload": {"user_id": i}} for i in (1, 2)]
+        finally:
+            await mgr.close()
+
+@pytest.mark.asyncio
+async def test_reconnect_replays_only_missed_events():
+    mgr = WSManager(history_size=3)
+    for i in range(5):
+        await mgr.broadcast(2, {"type": "answer_added", "payload": {"answer_id": i}})
+    assert mgr.latest[2] == 5
+
+    resumed, stale, foreign = FakeSocket(), FakeSocket(), FakeSocket()
+    await mgr.connect(2, resumed, since=3, epoch=mgr.epoch)
+    await mgr.connect(2, stale, since=1, epoch=mgr.epoch)  # older than the ring buffer
+    await mgr.connect(2, foreign, since=3, epoch="other")  # server restarted meanwhile
+    await mgr.drained()
+    assert [f["payload"]["answer_id"] for f in resumed.frames] == [3, 4]
+    assert [f["type"] for f in stale.frames] == ["resync"]
+    assert [f["type"] for f in foreign.frames] == ["resync"]
+    await mgr.close()
+
+@pytest.mark.asyncio
+async def test_forget_closes_sockets_and_drops_history():
+    mgr = WSManager()
+    ws = FakeSocket()
+    await mgr.connect(5, ws)
+    await mgr.broadcast(5, {"type": "room_closed", "payload": {"room_id": 5}})
+    await mgr.drained()
+    mgr.forget(5)
+    await mgr.close()
+    assert ws.closed == 1000
+    assert 5 not in mgr.rooms and 5 not in mgr.history and 5 not in mgr.latest
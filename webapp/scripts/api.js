@@ -38,6 +38,13 @@ export async function getRoom(room_id) {
   return data;
 }
 
+// Room + round + answers in one request; the browser revalidates it with ETag (304 when unchanged)
+export async function getSnapshot(room_id) {
+  const data = await j('GET', `/rooms/${room_id}/snapshot`);
+  setRoom({ id: data.room_id, code: data.room_code, status: data.status, round: data.current_round });
+  return data;
+}
+
 export async function setQuestion(room_id, text) {
   return j('POST', `/rooms/${room_id}/question`, { text });
 }
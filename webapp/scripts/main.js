@@ -1,5 +1,5 @@
-import { State, setUser, setRoom } from './state.js';
-import { upsertUser, createRoom, joinRoom, getRoom, getQuestion, setQuestion, sendAnswer, listAnswers } from './api.js';
+import { State, setUser, setRoom, resetAnswers, currentAnswers, applyEvent, isSupported } from './state.js';
+import { upsertUser, createRoom, joinRoom, getSnapshot, setQuestion, sendAnswer } from './api.js';
 import { toast, renderAnswers } from './ui.js';
 import { connectWS } from './socket.js';
 
@@ -78,32 +78,40 @@ if (!isRoomPage) {
   const btnA = document.getElementById('btnSendAnswer');
   const list = document.getElementById('answersList');
 
-  (async () => {
-    await upsertUser(State.user.tg_user_id, State.user.name);
-    const room = await getRoom(roomId);
-    elCode.textContent = `Код: ${room.room_code}`;
-    elStatus.textContent = room.status === 'active' ? '• активна' : '• закрыта';
-    State.user.super_cards = room.players.find(p => p.user_id === room.players.user_id)?.super_cards ?? State.user.super_cards;
+  async function loadRoom() {
+    const snap = await getSnapshot(roomId);
+    elCode.textContent = `Код: ${snap.room_code}`;
+    elStatus.textContent = snap.status === 'active' ? '• активна' : '• закрыта';
+    State.user.super_cards = snap.players.find(p => p.user_id === State.user.user_id)?.super_cards ?? State.user.super_cards;
     elSuper.textContent = String(State.user.super_cards);
 
-    const q = await getQuestion(roomId);
-    State.room.round = q.round_id ? { id: q.round_id, text: q.text, status: q.status } : null;
-    elQ.textContent = q.text || 'Пока вопрос не задан';
+    const rd = snap.current_round;
+    State.room.round = rd ? { id: rd.id, text: rd.question, status: rd.status } : null;
+    elQ.textContent = rd?.question || 'Пока вопрос не задан';
 
-    if (State.room.round?.id) {
-      const data = await listAnswers(roomId, State.room.round.id);
-      await renderAnswers(list, data);
-    }
+    resetAnswers(rd?.id ?? null, snap.answers);
+    await renderAnswers(list, currentAnswers());
+  }
+
+  (async () => {
+    await upsertUser(State.user.tg_user_id, State.user.name);
+    await loadRoom();
   })();
 
+  setRoom({ id: roomId });
   connectWS(async (msg) => {
-    if (msg.type === 'answer_added' && State.room.round?.id) {
-      const data = await listAnswers(roomId, State.room.round.id);
-      await renderAnswers(list, data);
+    if (msg.type === 'resync' || !isSupported(msg)) {
+      await loadRoom();
+      return;
+    }
+    if (msg.type === 'room_closed') {
+      toast('Комната закрыта из-за неактивности');
+      return;
     }
-    if (msg.type === 'answer_revealed' && State.room.round?.id) {
-      const data = await listAnswers(roomId, State.room.round.id);
-      await renderAnswers(list, data);
+    // Events are self-contained: apply in place, no REST round trip
+    if (applyEvent(msg)) {
+      if (msg.type === 'question_set') elQ.textContent = State.room.round.text || '—';
+      await renderAnswers(list, currentAnswers());
     }
   });
 
@@ -112,11 +120,12 @@ if (!isRoomPage) {
       const text = (inQ.value || '').trim();
       if (!text) { toast('Введите вопрос'); return; }
       const res = await setQuestion(roomId, text);
-      State.room.round = { id: res.round_id, text: res.text, status: res.status };
-      document.getElementById('questionBlock').textContent = res.text;
+      // Same payload as the question_set event (which may already have arrived)
+      if (applyEvent({ type: 'question_set', payload: res })) {
+        elQ.textContent = res.text;
+        await renderAnswers(list, currentAnswers());
+      }
       inQ.value = '';
-      const data = await listAnswers(roomId, State.room.round.id);
-      await renderAnswers(list, data);
       toast('Вопрос установлен. Сбор ответов!');
     } catch (e) {
       toast(e.message || 'Ошибка установки вопроса');
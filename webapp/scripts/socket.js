@@ -1,36 +1,54 @@
 import { State } from './state.js';
 import { toast } from './ui.js';
-import { renderAnswers } from './ui.js';
-import { getQuestion, listAnswers } from './api.js';
 
 let ws;
+let pingTimer;
+let retryDelay = 500;
+// Resume position: server epoch + last seen event seq
+let epoch = null;
+let lastSeq = null;
 
 export function connectWS(onMessage) {
   if (!State.room.id) return;
   const proto = location.protocol === 'https:' ? 'wss' : 'ws';
-  ws = new WebSocket(`${proto}://${location.host}/ws/rooms/${State.room.id}`);
+  const resume = lastSeq !== null ? `?since=${lastSeq}&epoch=${encodeURIComponent(epoch)}` : '';
+  ws = new WebSocket(`${proto}://${location.host}/ws/rooms/${State.room.id}${resume}`);
   ws.onopen = () => {
+    retryDelay = 500;
     // keepalive ping every 25s
-    setInterval(() => ws?.readyState === 1 && ws.send('ping'), 25000);
+    clearInterval(pingTimer);
+    pingTimer = setInterval(() => ws?.readyState === 1 && ws.send('ping'), 25000);
   };
-  ws.onmessage = async (ev) => {
+  ws.onmessage = (ev) => {
     const msg = JSON.parse(ev.data);
+    if (msg.type === 'hello') {
+      if (lastSeq === null) { epoch = msg.payload.epoch; lastSeq = msg.payload.seq; }
+      return;
+    }
+    if (msg.type === 'resync') {
+      // Missed events are gone: caller reloads state over REST
+      epoch = msg.payload.epoch;
+      lastSeq = msg.payload.seq;
+      onMessage?.(msg);
+      return;
+    }
+    if (msg.seq !== undefined) {
+      if (lastSeq !== null && msg.seq <= lastSeq) return;  // already applied
+      lastSeq = msg.seq;
+    }
     onMessage?.(msg);
     if (msg.type === 'player_joined') {
       toast(`Подключился игрок: ${msg.payload.name}`);
-    } else if (msg.type === 'question_set') {
-      const q = await getQuestion(State.room.id);
-      document.getElementById('questionBlock').textContent = q.text || '—';
-    } else if (msg.type === 'answer_added') {
-      // optimistic update will also refresh answers list
-    } else if (msg.type === 'answer_revealed') {
-      // UI layer will flip the card
     } else if (msg.type === 'round_closed') {
       toast('Раунд закрыт. Начните новый вопрос.');
     }
   };
   ws.onclose = () => {
-    toast('Соединение потеряно. Попробуйте обновить страницу.');
+    clearInterval(pingTimer);
+    // Reconnect with backoff; the server replays what we missed
+    setTimeout(() => connectWS(onMessage), retryDelay);
+    if (retryDelay >= 4000) toast('Соединение потеряно. Переподключаемся…');
+    retryDelay = Math.min(retryDelay * 2, 15000);
   };
 }
 
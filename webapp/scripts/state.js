@@ -23,3 +23,53 @@ export function setUser(u) {
 export function setRoom(r) {
   State.room = { ...State.room, ...r };
 }
+
+// ---- Answers of the current round, kept up to date from WS events ----
+// Events carry full rows (see api/events.py), so nothing is re-listed over REST.
+
+// Newest event schema this client understands; newer events mean "reload the snapshot"
+export const SCHEMA_VERSION = 1;
+
+const answers = { roundId: null, byId: new Map() };
+
+export function resetAnswers(roundId, rows = []) {
+  answers.roundId = roundId;
+  answers.byId = new Map(rows.map(a => [a.answer_id, { ...a }]));
+}
+
+export function upsertAnswer(row) {
+  if (row.round_id !== undefined && row.round_id !== answers.roundId) return false;
+  const cur = answers.byId.get(row.answer_id);
+  answers.byId.set(row.answer_id, cur ? { ...cur, ...row } : { ...row });
+  return true;
+}
+
+export function currentAnswers() {
+  return [...answers.byId.values()].sort((a, b) => a.answer_id - b.answer_id);
+}
+
+export function isSupported(msg) {
+  return (msg.v ?? 1) <= SCHEMA_VERSION;
+}
+
+// Apply a room event to the store; true when the answers list changed
+export function applyEvent(msg) {
+  const p = msg.payload || {};
+  switch (msg.type) {
+    case 'question_set':
+      State.room.round = { id: p.round_id, text: p.text, status: p.status };
+      if (answers.roundId !== p.round_id) resetAnswers(p.round_id);
+      return true;
+    case 'round_closed':
+      if (State.room.round) State.room.round.status = p.status || 'discussion';
+      return false;
+    case 'answer_added':
+    case 'answer_revealed':
+      return upsertAnswer(p);
+    case 'answers_snapshot':
+      // Coalesced answer events, oldest first
+      return p.answers.map(upsertAnswer).some(Boolean);
+    default:
+      return false;
+  }
+}
@@ -1,5 +1,5 @@
-import { State } from './state.js';
-import { reveal, listAnswers } from './api.js';
+import { State, upsertAnswer, currentAnswers } from './state.js';
+import { reveal } from './api.js';
 
 export function toast(text) {
   const c = document.getElementById('toastContainer');
@@ -67,9 +67,9 @@ export async function renderAnswers(container, answers) {
           // Flip animation
           card.classList.add('flip');
           back.innerHTML = `<b>Автор:</b> ${escapeHtml(res.author_display)}`;
-          // Refresh list to update other buttons
-          const data = await listAnswers(State.room.id, State.room.round.id);
-          await renderAnswers(container, data);
+          // The reveal result is the delta; the answer_revealed event repeats it harmlessly
+          upsertAnswer({ answer_id: res.answer_id, revealed: 1, author_display: res.author_display });
+          await renderAnswers(container, currentAnswers());
         } catch (e) {
           toast(e.message || 'Ошибка');
         }